@@ -0,0 +1,197 @@
+"""
+Chat History Benchmark
+Input tokens per turn over a 50-turn synthetic Polar Wear conversation,
+with and without history compaction, against a stubbed Anthropic client.
+The system prompt, replies and tool results (hourly forecast rows, knowledge
+base passages) are sized like production ones, so the default budget (the
+production CHAT_HISTORY_TOKEN_BUDGET) is exceeded and compaction kicks in.
+Exits non-zero if a compacted turn goes over the budget.
+
+Usage:
+    python benchmarks/chat_history_bench.py [--turns 50] [--budget 6000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chat.history import ChatHistoryManager, estimate_tokens, message_tokens  # noqa: E402
+
+
+QUESTIONS = [
+    "Do I need a jacket if I walk the dog at 7pm tonight?",
+    "What about tomorrow morning around 8, is it going to rain on my commute?",
+    "I'm going for a 10k run after work. What fabrics should I avoid when it's this humid?",
+    "Would the navy wool sweater you mentioned be too warm by lunchtime?",
+    "My kid has soccer practice at 5. Shorts or leggings?",
+]
+
+
+SYSTEM_PROMPT = """You are Polar Wear, a friendly polar bear weather-and-clothing assistant.
+Keep replies short, warm, and practical. Two or three sentences is usually enough.
+You can use tools to look up the forecast further ahead or search a clothing knowledge base.
+
+Current conditions:
+- Temperature: 43.1°F (feels like 37.6°F)
+- Conditions: Rain, Partially cloudy
+- Humidity: 86%, Wind: 14.2 mph
+- Precipitation chance: 70%
+
+The outfit you already suggested to the user:
+- Summary: A warm, water-resistant layered look for a raw, drizzly afternoon with a stiff breeze.
+- Items: Navy wool crewneck sweater, Olive waxed-cotton field jacket, Dark wash straight-leg jeans, Brown leather Chelsea boots
+Reference this outfit when relevant — don't re-suggest a whole new one unless asked.
+
+General guidance for these conditions (precomputed):
+- Cold and wet: insulate, and keep the outer layer waterproof rather than just warm.
+- Layers: moisture-wicking base layer, fleece or wool mid layer, waterproof shell
+- Tips: Wind makes it feel several degrees colder than the thermometer says. Waterproof footwear matters more than an extra sweater. Pack a hat; a lot of heat escapes from an uncovered head."""
+
+REPLY = ("Polar Wear here! Around then it'll feel like the upper 30s with a steady breeze off the lake, "
+         "so the waxed field jacket over your wool sweater is the right call. Showers are likely on and off, "
+         "so keep the hood handy and swap the Chelsea boots for something fully waterproof if you'll be on "
+         "grass. Gloves are optional, but you'll be glad of a hat once the sun goes down.")
+
+HOURLY_FIELDS = {"temp": 43.1, "feelslike": 37.6, "humidity": 86.2, "dew": 39.2, "precip": 0.04,
+                 "precipprob": 70, "snow": 0, "snowdepth": 0, "preciptype": ["rain"], "windgust": 24.8,
+                 "windspeed": 14.2, "winddir": 290, "pressure": 1008.4, "visibility": 8.1, "cloudcover": 88.3,
+                 "uvindex": 1, "conditions": "Rain, Overcast", "icon": "rain"}
+
+PASSAGE = ("Merino wool stays warm when damp and resists odour, which makes it a good base or mid layer for "
+           "cold, wet days. Cotton is the opposite: it soaks up water, dries slowly and pulls heat from the "
+           "body, so avoid cotton next to the skin when rain or heavy sweat is likely. For the outer layer, a "
+           "waterproof-breathable shell beats a heavier insulated coat in drizzle above freezing, because "
+           "insulation that gets wet stops working. Seal gaps at the wrists and neck to keep the wind out.")
+
+
+def forecast_result(hours):
+    """A get_forecast range result: one row per hour with the Visual Crossing fields"""
+    return json.dumps([dict(HOURLY_FIELDS, datetime=f"{17 + h:02d}:00:00", datetimeEpoch=1760900400 + h * 3600)
+                       for h in range(hours)])
+
+
+def knowledge_result(top_k=3):
+    """A search_clothing_knowledge result with top_k passages"""
+    return json.dumps({"results": [{"title": f"Layering in cold rain ({i + 1})", "source": "layering.md",
+                                    "text": PASSAGE, "score": round(0.8 - i * 0.1, 2)} for i in range(top_k)]})
+
+
+class StubMessages:
+    """Stand-in for anthropic_client.messages that records input token estimates"""
+
+    def __init__(self):
+        self.input_tokens = []
+
+    def create(self, system, messages, **kwargs):
+        tokens = estimate_tokens(system) + sum(message_tokens(m) for m in messages)
+        self.input_tokens.append(tokens)
+        reply = REPLY
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='text', text=reply)],
+            stop_reason='end_turn',
+            usage=SimpleNamespace(input_tokens=tokens, output_tokens=len(reply) // 4),
+        )
+
+
+def run(turns, manager):
+    client = SimpleNamespace(messages=StubMessages())
+    system_prompt = SYSTEM_PROMPT
+    history = []
+    compact_seconds = 0.0
+
+    for turn in range(turns):
+        history.append({"role": "user", "content": QUESTIONS[turn % len(QUESTIONS)]})
+        messages = list(history)
+
+        # Tool loops like production ones: every third turn looks up a forecast range and
+        # then searches the knowledge base, the next one just checks the forecast
+        forecast = ("get_forecast", {"hours_ahead": 2, "range_hours": 6}, forecast_result(6))
+        search = ("search_clothing_knowledge", {"query": "layers for cold rain"}, knowledge_result())
+        for step, (name, tool_input, result) in enumerate({0: [forecast, search], 1: [forecast]}.get(turn % 3, [])):
+            tool_id = f"toolu_{turn}_{step}"
+            messages.append({"role": "assistant", "content": [
+                {"type": "tool_use", "id": tool_id, "name": name, "input": tool_input},
+            ]})
+            messages.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": tool_id, "content": result},
+            ]})
+
+        system, send = system_prompt, messages
+        if manager:
+            start = time.perf_counter()
+            system, send = manager.compact(system_prompt, messages)
+            compact_seconds += time.perf_counter() - start
+
+        response = client.messages.create(system=system, messages=send)
+        history.append({"role": "assistant", "content": response.content[0].text})
+
+    return client.messages.input_tokens, compact_seconds
+
+
+def check_inflight_tool_loop():
+    """
+    Compacting in the middle of a multi-step tool loop must keep the question
+    that opened it and every tool_use/tool_result pair after it
+
+    Returns:
+        bool: Whether the compacted transcript is well formed
+    """
+    messages = []
+    for turn in range(10):
+        messages.append({"role": "user", "content": f"question {turn} " + "about the weather " * 10})
+        messages.append({"role": "assistant", "content": "Polar Wear answer " * 10})
+    messages.append({"role": "user", "content": "final q"})
+    for step in range(2):
+        messages.append({"role": "assistant", "content": [
+            {"type": "tool_use", "id": f"toolu_{step}", "name": "get_forecast", "input": {"hours_ahead": step}},
+        ]})
+        messages.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": f"toolu_{step}", "content": "{}"},
+        ]})
+
+    manager = ChatHistoryManager(token_budget=300, keep_recent=2, summary_token_cap=600)
+    _, kept = manager.compact("You are Polar Wear.", messages)
+    ok = kept[0] == {"role": "user", "content": "final q"} and kept == messages[-len(kept):] \
+        and len(kept) == 5
+    print(f"in-flight tool loop: kept {[m['role'] for m in kept]} -> {'ok' if ok else 'BROKEN'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--budget', type=int, default=6000)
+    args = parser.parse_args()
+
+    baseline, _ = run(args.turns, None)
+    compacted, seconds = run(args.turns, ChatHistoryManager(token_budget=args.budget, keep_recent=6))
+
+    print(f"{'turn':>4} {'full':>8} {'compacted':>10}")
+    for i, (full, comp) in enumerate(zip(baseline, compacted), start=1):
+        print(f"{i:>4} {full:>8} {comp:>10}")
+
+    print()
+    print(f"total input tokens: full={sum(baseline)} compacted={sum(compacted)} "
+          f"saved={100 * (1 - sum(compacted) / sum(baseline)):.1f}%")
+    print(f"max per-turn tokens: full={max(baseline)} compacted={max(compacted)} budget={args.budget}")
+    print(f"turns compacted: {sum(full != comp for full, comp in zip(baseline, compacted))} of {args.turns}")
+    print(f"compaction overhead: {1000 * seconds / args.turns:.3f} ms/turn")
+    print()
+
+    ok = check_inflight_tool_loop()
+    over = [(i, tokens) for i, tokens in enumerate(compacted, start=1) if tokens > args.budget]
+    if max(baseline) <= args.budget:
+        print(f"budget {args.budget} was never exceeded; compaction was not exercised")
+        ok = False
+    for turn, tokens in over:
+        print(f"turn {turn}: {tokens} input tokens, over the {args.budget} budget")
+    return 0 if ok and not over else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Cold Start Benchmark
+Import time of main.py (lazy provider SDKs vs importing them eagerly as the
+app used to), then time from launching gunicorn to the first served page and
+the latency of the first request that needs the Anthropic client, with and
+without a preloading master. Anthropic calls go to the local stub server.
+
+The database need not be running; the schema check fails fast and the app
+carries on without it.
+
+Usage:
+    python benchmarks/cold_start_bench.py [--runs 5] [--workers 2]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stubs import anthropic_stub  # noqa: E402
+
+WEATHER = {"temp": 48, "feelslike": 44, "conditions": "Rain", "windspeed": 12, "humidity": 80,
+           "precipprob": 70, "uvindex": 1}
+# 1x1 PNG
+PIXEL = bytes.fromhex('89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+                      '0000000d4944415478da63f8cfc0f01f0005000201d5a4b4a70000000049454e44ae426082')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def app_env(stub_port):
+    env = dict(os.environ)
+    env.update({
+        'ANTHROPIC_API_KEY': 'stub',
+        'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{stub_port}",
+        'DATABASE_URL': '127.0.0.1',
+        'DATABASE_PORT': str(free_port()),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def import_time(env, eager):
+    prelude = "import anthropic, boto3, twilio.rest; " if eager else ""
+    code = ("import time, logging; logging.disable(logging.CRITICAL); t = time.perf_counter(); "
+            f"{prelude}import main; print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=SRC, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def gunicorn_run(env, workers, preload):
+    port = free_port()
+    env = dict(env, GUNICORN_BIND=f"127.0.0.1:{port}", SERVER_NAME=f"127.0.0.1:{port}",
+               GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD='true' if preload else 'false')
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+                            cwd=SRC, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                # The socket is bound before workers exist, so this can block until one is up
+                if requests.get(f"{base}/terms", timeout=30).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.02)
+        first_page = time.perf_counter() - started
+
+        t = time.perf_counter()
+        response = requests.post(f"{base}/api/fashion-suggestions",
+                                 files={'image': ('closet.png', io.BytesIO(PIXEL), 'image/png')},
+                                 data={'weather_data': json.dumps(WEATHER)}, timeout=30)
+        first_llm = time.perf_counter() - t
+        if response.status_code != 200:
+            raise RuntimeError(f"fashion request failed: {response.status_code} {response.text[:200]}")
+        return first_page, first_llm
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    stub = anthropic_stub.serve(port=0, latency_ms=0)
+    env = app_env(stub.server_address[1])
+
+    print(f"{'import main.py':34} {'median ms':>10}")
+    for label, eager in (('eager SDK imports (old)', True), ('lazy SDK imports', False)):
+        times = [import_time(env, eager) for _ in range(args.runs)]
+        print(f"{label:34} {statistics.median(times) * 1000:10.0f}")
+
+    print(f"\n{'gunicorn (' + str(args.workers) + ' workers)':34} {'first page ms':>14} {'first LLM req ms':>17}")
+    for label, preload in (('no preload (lazy in worker)', False), ('preload + warm imports', True)):
+        runs = [gunicorn_run(env, args.workers, preload) for _ in range(args.runs)]
+        print(f"{label:34} {statistics.median(r[0] for r in runs) * 1000:14.0f} "
+              f"{statistics.median(r[1] for r in runs) * 1000:17.0f}")
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Visual Crossing Payloads
+Deterministic timeline API responses shaped like the real ones (the fields
+get_hourly_data reads plus the bulk it ignores), for 1 to 15 days. A recorded
+response saved as JSON can be used instead wherever a payload is accepted.
+"""
+
+import json
+import math
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+
+CONDITIONS = ["Clear", "Partially cloudy", "Overcast", "Rain, Overcast", "Rain", "Snow, Overcast"]
+ICONS = ["clear-day", "partly-cloudy-day", "cloudy", "rain", "snow"]
+
+
+def _hour(rng, day_start, h, base_temp, tzoffset):
+    moment = day_start + timedelta(hours=h)
+    temp = round(base_temp + 9 * math.sin((h - 9) / 24 * 2 * math.pi) + rng.uniform(-2, 2), 1)
+    precipprob = rng.choice([0, 0, 0, 5, 15, 40, 70, 90])
+    return {
+        "datetime": moment.strftime('%H:%M:%S'),
+        "datetimeEpoch": int((moment - timedelta(hours=tzoffset)).replace(tzinfo=timezone.utc).timestamp()),
+        "temp": temp,
+        "feelslike": round(temp - rng.uniform(0, 6), 1),
+        "humidity": round(rng.uniform(35, 95), 1),
+        "dew": round(temp - rng.uniform(3, 12), 1),
+        "precip": round(rng.uniform(0, 0.2), 2) if precipprob > 30 else 0.0,
+        "precipprob": precipprob,
+        "snow": 0.0,
+        "snowdepth": 0.0,
+        "preciptype": ["rain"] if precipprob > 30 else None,
+        "windgust": round(rng.uniform(5, 30), 1),
+        "windspeed": round(rng.uniform(0, 20), 1),
+        "winddir": round(rng.uniform(0, 360), 1),
+        "pressure": round(rng.uniform(1000, 1030), 1),
+        "visibility": 9.9,
+        "cloudcover": round(rng.uniform(0, 100), 1),
+        "solarradiation": max(0, round(600 * math.sin((h - 6) / 12 * math.pi), 1)),
+        "solarenergy": 0.0,
+        "uvindex": max(0, round(7 * math.sin((h - 6) / 12 * math.pi))),
+        "severerisk": 10,
+        "conditions": rng.choice(CONDITIONS),
+        "icon": rng.choice(ICONS),
+        "stations": ["KGRR", "D6279"],
+        "source": "fcst",
+    }
+
+
+def make_payload(location="grand rapids mi", days=15, start=None, tzoffset=-4.0):
+    """
+    A timeline response starting at midnight of start's day (default today)
+
+    Args:
+        location (str): Resolved address; also seeds the generator
+        days (int): Days in the forecast (the API returns 15)
+        start (datetime, optional): Any moment on the first day, in local time
+        tzoffset (float): Hours from UTC
+
+    Returns:
+        dict: The payload
+    """
+    rng = random.Random(zlib.crc32(location.encode()))
+    start = start or datetime.now(timezone(timedelta(hours=tzoffset))).replace(tzinfo=None)
+    first = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    base_temp = rng.uniform(30, 75)
+
+    day_list = []
+    for d in range(days):
+        day_start = first + timedelta(days=d)
+        hours = [_hour(rng, day_start, h, base_temp, tzoffset) for h in range(24)]
+        temps = [h["temp"] for h in hours]
+        day_list.append({
+            "datetime": day_start.strftime('%Y-%m-%d'),
+            "datetimeEpoch": hours[0]["datetimeEpoch"],
+            "tempmax": max(temps),
+            "tempmin": min(temps),
+            "temp": round(sum(temps) / 24, 1),
+            "conditions": rng.choice(CONDITIONS),
+            "description": "Partly cloudy throughout the day.",
+            "icon": rng.choice(ICONS),
+            "sunrise": "07:52:10",
+            "sunset": "18:40:02",
+            "hours": hours,
+        })
+
+    return {
+        "queryCost": 1,
+        "latitude": 42.9634,
+        "longitude": -85.6681,
+        "resolvedAddress": location.title(),
+        "address": location,
+        "timezone": "America/Detroit",
+        "tzoffset": tzoffset,
+        "days": day_list,
+        "alerts": [],
+        "currentConditions": dict(day_list[0]["hours"][start.hour], datetime=start.strftime('%H:%M:%S')),
+    }
+
+
+def load_payload(path):
+    """A recorded response saved with e.g. curl ... > payload.json"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,212 @@
+"""
+Hot Path Microbenchmarks
+Time and memory per call for the pure functions every request runs:
+get_hourly_data over 1-15 day payloads, parse_claude_suggestions over clean
+and malformed model output, build_chat_system_prompt, dispatch_chat_tool
+against the in-memory forecast store, and JSON encoding of the hourly
+response. Results are compared against a stored baseline.
+
+Time is the best of 10 x --repeat short timed batches (per call). Memory is the peak
+traced by tracemalloc during one call and the blocks it leaves allocated.
+Baseline comparisons scale times by a fixed calibration loop timed in both
+runs, so a slower or busier machine doesn't read as a regression.
+
+Usage:
+    python benchmarks/hot_path_bench.py [--repeat 7] [--filter NAME] [--payload recorded.json]
+        [--baseline benchmarks/baselines/hot_path.json] [--save-baseline] [--max-regression 0.3]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import timeit
+import logging
+import argparse
+import platform
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'hot_path.json')
+MODEL_OUTPUTS = os.path.join(ROOT, 'benchmarks', 'fixtures', 'model_outputs.json')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def import_app():
+    """Import main with nothing listening on its database port, so startup fails fast"""
+    os.environ.setdefault('DATABASE_URL', '127.0.0.1')
+    os.environ.setdefault('DATABASE_PORT', str(_free_port()))
+    logging.disable(logging.CRITICAL)
+    import main
+    return main
+
+
+def build_cases(main, payload_path=None):
+    """{name: zero-argument callable}"""
+    from fixtures.visual_crossing import make_payload, load_payload
+    from chat.tools import dispatch_chat_tool
+    from utils.data_processor import get_hourly_data
+    from utils.forecast import forecast_store
+
+    cases = {}
+    payloads = {f"{days}d": make_payload('grand rapids mi', days=days) for days in (1, 3, 7, 15)}
+    if payload_path:
+        payloads['recorded'] = load_payload(payload_path)
+
+    # The hourly endpoint asks for FORECAST_HOURS; a 1-day payload has fewer
+    for label, payload in payloads.items():
+        cases[f"get_hourly_data[{label}]"] = lambda p=payload: get_hourly_data(p, datetime, hours=main.FORECAST_HOURS)
+
+    hourly = get_hourly_data(payloads['15d'], datetime, hours=main.FORECAST_HOURS)
+    chart = hourly[:main.CHART_HOURS]
+    # jsonify needs an app context; keep one pushed for the whole run
+    main.app.app_context().push()
+    cases['json_encode[chart]'] = lambda: main.app.json.dumps(chart)
+    cases['json_encode[72h cache row]'] = lambda: json.dumps(hourly)
+    cases['jsonify[chart]'] = lambda: main.app.json.response(chart)
+
+    with open(MODEL_OUTPUTS, encoding='utf-8') as f:
+        outputs = json.load(f)
+    for label, text in outputs.items():
+        cases[f"parse_claude_suggestions[{label}]"] = lambda t=text: main.parse_claude_suggestions(t)
+
+    suggestions = json.loads(outputs['clean'])
+    weather = {"temp": 48, "feelslike": 44, "conditions": "Rain", "windspeed": 12, "humidity": 80,
+               "precipprob": 70, "uvindex": 1}
+    cases['build_chat_system_prompt[weather]'] = lambda: main.build_chat_system_prompt(weather, {})
+    cases['build_chat_system_prompt[weather+outfit]'] = lambda: main.build_chat_system_prompt(weather, suggestions)
+
+    forecast_store.put('bench-zip', hourly)
+    cases['dispatch_chat_tool[get_forecast at]'] = lambda: dispatch_chat_tool(
+        'get_forecast', {'hours_ahead': 6}, 'bench-zip')
+    cases['dispatch_chat_tool[get_forecast range]'] = lambda: dispatch_chat_tool(
+        'get_forecast', {'hours_ahead': 0, 'range_hours': 12}, 'bench-zip')
+    cases['dispatch_chat_tool[unknown tool]'] = lambda: dispatch_chat_tool('nope', {}, 'bench-zip')
+    return cases
+
+
+def _calibration_loop():
+    total = 0
+    for i in range(2000):
+        total += len(str(i))
+    return sorted({'k%d' % (i % 97): i for i in range(500)}.items())
+
+
+def _best_per_call(func, repeat):
+    """Fastest of many ~20ms batches; short batches let the minimum dodge noisy neighbours"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, number // 10)
+    return min(timer.repeat(repeat=repeat * 10, number=number)) / number, number * repeat * 10
+
+
+def calibrate(repeat):
+    """µs per call of a fixed pure-Python loop, the yardstick for this machine"""
+    return _best_per_call(_calibration_loop, repeat)[0] * 1e6
+
+
+def measure(func, repeat):
+    """Best per-call time (µs), peak traced bytes and retained blocks for one call"""
+    best, calls = _best_per_call(func, repeat)
+
+    tracemalloc.start()
+    try:
+        before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+        tracemalloc.reset_peak()
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+        del result
+    finally:
+        tracemalloc.stop()
+    return {
+        'us_per_call': round(best * 1e6, 2),
+        'calls_timed': calls,
+        'peak_kib': round((peak - baseline_bytes) / 1024, 1),
+        'blocks_retained': after_blocks - before_blocks,
+    }
+
+
+def compare(results, calibration_us, baseline, max_regression):
+    """Print changes against the baseline; returns the cases that regressed"""
+    regressed = []
+    # Express the baseline's times in this machine's units
+    scale = calibration_us / baseline['meta']['calibration_us']
+    print(f"\n{'vs baseline (scaled x' + format(scale, '.2f') + ')':48} {'base us':>10} {'us':>10} "
+          f"{'time':>7} {'peak':>7}")
+    for name, r in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f"{name:48.48} {'(new)':>10} {r['us_per_call']:10.2f}")
+            continue
+        base_us = base['us_per_call'] * scale
+        time_change = r['us_per_call'] / base_us - 1 if base_us else 0.0
+        peak_change = r['peak_kib'] / base['peak_kib'] - 1 if base['peak_kib'] else 0.0
+        flag = ''
+        if time_change > max_regression or peak_change > max_regression:
+            flag = '  REGRESSED'
+            regressed.append(name)
+        print(f"{name:48.48} {base_us:10.2f} {r['us_per_call']:10.2f} "
+              f"{time_change:+7.0%} {peak_change:+7.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--filter', help="Only cases whose name contains this")
+    parser.add_argument('--payload', help="A recorded Visual Crossing response to add as a case")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--max-regression', type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = {}
+    out = sys.stdout
+    print(f"{'case':48} {'us/call':>10} {'peak KiB':>9} {'blocks':>7}")
+    # Keep anything the functions print off the terminal
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        cases = build_cases(import_app(), args.payload)
+        if args.filter:
+            cases = {name: func for name, func in cases.items() if args.filter in name}
+        calibration_us = calibrate(args.repeat)
+        for name, func in cases.items():
+            results[name] = measure(func, args.repeat)
+            r = results[name]
+            print(f"{name:48.48} {r['us_per_call']:10.2f} {r['peak_kib']:9.1f} {r['blocks_retained']:7}",
+                  file=out)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                         'machine': platform.machine(), 'calibration_us': round(calibration_us, 2)},
+                'results': results,
+            }, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressed = compare(results, calibration_us, json.load(f), args.max_regression)
+        if regressed:
+            print(f"\n{len(regressed)} case(s) regressed by more than {args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
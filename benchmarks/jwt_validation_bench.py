@@ -0,0 +1,134 @@
+"""
+JWT Validation Benchmark
+Per-check cost of local Cognito token validation (signature verify vs
+claims-cache hit) using locally generated RSA keys in place of Cognito, plus
+checks that bad tokens are rejected and key rotation triggers one refetch.
+
+Usage:
+    python benchmarks/jwt_validation_bench.py [--tokens 200] [--checks 20000] [--jwks-latency-ms 80]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from auth.jwt_validator import CognitoTokenValidator, TokenValidationError  # noqa: E402
+
+REGION = 'us-east-2'
+POOL_ID = 'us-east-2_localtest'
+CLIENT_ID = 'local-client-id'
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{POOL_ID}"
+
+
+class LocalPool:
+    """Signs Cognito-shaped tokens and serves the matching JWKS"""
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.keys = {}
+        self.fetches = 0
+        self.rotate()
+
+    def rotate(self):
+        kid = uuid.uuid4().hex[:12]
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.current_kid = kid
+        return kid
+
+    def fetch_jwks(self, url):
+        self.fetches += 1
+        time.sleep(self.latency)
+        keys = []
+        for kid, private_key in self.keys.items():
+            jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            keys.append({**jwk, 'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+        return {'keys': keys}
+
+    def token(self, token_use='access', ttl=3600, **overrides):
+        now = int(time.time())
+        claims = {
+            'sub': str(uuid.uuid4()),
+            'iss': ISSUER,
+            'token_use': token_use,
+            'iat': now,
+            'exp': now + ttl,
+        }
+        if token_use == 'access':
+            claims['client_id'] = CLIENT_ID
+        else:
+            claims['aud'] = CLIENT_ID
+            claims['phone_number'] = '+16165550100'
+        claims.update(overrides)
+        kid = overrides.pop('kid', None) or self.current_kid
+        claims.pop('kid', None)
+        return jwt.encode(claims, self.keys[kid], algorithm='RS256', headers={'kid': kid})
+
+
+def expect_rejected(validator, label, token, token_use='access'):
+    try:
+        validator.validate(token, token_use)
+    except TokenValidationError:
+        return
+    raise AssertionError(f"{label} token was accepted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=200, help="Distinct signed-in users")
+    parser.add_argument('--checks', type=int, default=20000, help="Session checks to time")
+    parser.add_argument('--jwks-latency-ms', type=float, default=80)
+    args = parser.parse_args()
+
+    pool = LocalPool(args.jwks_latency_ms)
+    validator = CognitoTokenValidator(REGION, POOL_ID, CLIENT_ID, fetch_jwks=pool.fetch_jwks, leeway=0)
+    tokens = [pool.token() for _ in range(args.tokens)]
+
+    started = time.perf_counter()
+    validator.validate(tokens[0])
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for token in tokens[1:]:
+        validator.validate(token)
+    verify = (time.perf_counter() - started) / max(1, len(tokens) - 1)
+
+    started = time.perf_counter()
+    for i in range(args.checks):
+        validator.validate(tokens[i % len(tokens)])
+    cached = (time.perf_counter() - started) / args.checks
+
+    print(f"first check (JWKS fetch + verify): {cold * 1000:8.2f} ms")
+    print(f"signature verify:                  {verify * 1e6:8.1f} us")
+    print(f"claims-cache hit:                  {cached * 1e6:8.1f} us")
+    print(f"JWKS fetches: {pool.fetches}   stats: {validator.stats}")
+
+    # Rejections
+    expect_rejected(validator, "expired", pool.token(ttl=-10))
+    expect_rejected(validator, "wrong client", pool.token(client_id='someone-else'))
+    expect_rejected(validator, "wrong issuer", pool.token(iss='https://example.com/pool'))
+    expect_rejected(validator, "id-as-access", pool.token('id'))
+    expect_rejected(validator, "access-as-id", pool.token(), 'id')
+    head, body, sig = pool.token().split('.')
+    expect_rejected(validator, "tampered", f"{head}.{body}.{sig[:-4]}AAAA")
+    expect_rejected(validator, "garbage", "not-a-jwt")
+    assert validator.validate(pool.token('id'), 'id')['phone_number'] == '+16165550100'
+
+    # Rotation: a new kid is only fetched once the set is older than the refetch floor
+    fetches = pool.fetches
+    rotated = pool.token(kid=pool.rotate())
+    expect_rejected(validator, "rotated (within refetch floor)", rotated)
+    validator._keys_loaded_at -= 61
+    validator.validate(rotated)
+    assert pool.fetches == fetches + 1, "rotation should refetch exactly once"
+    print("rejection and rotation checks passed")
+
+
+if __name__ == '__main__':
+    main()
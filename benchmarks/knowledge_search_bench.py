@@ -0,0 +1,104 @@
+"""
+Knowledge Search Benchmark
+Query latency of the clothing knowledge index in flat, quantized and IVF modes
+over a synthetic corpus built from the shipped documents.
+
+Usage:
+    python benchmarks/knowledge_search_bench.py [--rows 50000] [--queries 200]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from knowledge.index import VectorIndex  # noqa: E402
+from knowledge.ingest import chunk_document, iter_corpus  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), '..', 'src', 'knowledge', 'corpus')
+
+QUERIES = [
+    "what should I wear running when it is 25 degrees",
+    "is merino better than cotton for hiking",
+    "do I need an umbrella at 40 percent chance of rain",
+    "fabrics for hot humid weather",
+    "how to layer for wind chill",
+    "waterproof vs water resistant jacket",
+    "gloves or mittens for cycling in the cold",
+    "uv index 8 clothing",
+]
+
+
+def synthetic_chunks(rows, seed=0):
+    """Shuffle words within real chunks to grow the corpus to the requested size"""
+    base = []
+    for path, text in iter_corpus(CORPUS_DIR):
+        base.extend(chunk_document(text, path))
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(rows):
+        chunk = dict(base[i % len(base)])
+        if i >= len(base):
+            words = chunk['text'].split()
+            rng.shuffle(words)
+            chunk['text'] = " ".join(words)
+        chunks.append(chunk)
+    return chunks
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def bench(label, index, queries, **kwargs):
+    index.search(queries[:1], 3, **kwargs)  # warm the page cache
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search([query], 3, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    index.search(queries, 3, **kwargs)
+    batched = (time.perf_counter() - start) * 1000 / len(queries)
+
+    print(f"{label:<18} p50={percentile(samples, 50):7.3f}ms p95={percentile(samples, 95):7.3f}ms "
+          f"p99={percentile(samples, 99):7.3f}ms batched={batched:7.3f}ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nlist', type=int, default=256)
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.rows)
+    texts = [f"{c['title']}. {c['text']}" for c in chunks]
+    queries = [QUERIES[i % len(QUERIES)] + f" {i}" for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        flat = VectorIndex.create(os.path.join(tmp, 'flat'))
+        flat.append(texts, chunks)
+        print(f"built {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        quantized = VectorIndex.create(os.path.join(tmp, 'int8'), quantize=True)
+        quantized.append(texts, chunks)
+
+        ivf = VectorIndex.create(os.path.join(tmp, 'ivf'), quantize=True)
+        ivf.append(texts, chunks)
+        ivf.build_ivf(args.nlist)
+
+        bench("flat float32", flat, queries)
+        bench("flat int8", quantized, queries)
+        bench("ivf int8 nprobe=4", ivf, queries, nprobe=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+"""
+End-to-End Load Test
+Runs the app under gunicorn against local stand-ins for every external
+service (Visual Crossing, Anthropic, Twilio, and a throwaway Postgres) and
+drives mixed workloads through real HTTP:
+
+    cache-hit   /api/hourly-data for a few warm locations
+    cold-miss   /api/hourly-data for a new location every request
+    chat        signed-in /api/chat; most questions take a tool turn
+    fashion     /api/fashion-suggestions image uploads
+    mixed       all of the above, weighted like production traffic
+
+Throughput and p50/p95/p99 per workload and endpoint go to a JSON report.
+With --baseline, the run fails if any endpoint's p95 regressed by more than
+--max-regression against an earlier report.
+
+Usage:
+    python benchmarks/load_test.py [--duration 20] [--concurrency 8] [--workers 4] [--worker-class sync]
+        [--workloads cache-hit,cold-miss,chat,fashion,mixed] [--database HOST:PORT]
+        [--weather-latency-ms 300] [--llm-latency-ms 800] [--payload-dir DIR]
+        [--output FILE] [--baseline FILE] [--max-regression 0.2]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import itertools
+import subprocess
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stubs import anthropic_stub, twilio_stub, weather_stub  # noqa: E402
+from stubs.throwaway_postgres import throwaway_postgres  # noqa: E402
+
+HOT_LOCATIONS = ['49503', '10001', '60614', '94110', '98101']
+WEATHER = {"temp": 48, "feelslike": 44, "conditions": "Rain", "windspeed": 12, "humidity": 80,
+           "precipprob": 70, "uvindex": 1}
+# 1x1 PNG
+PIXEL = bytes.fromhex('89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+                      '0000000d4944415478da63f8cfc0f01f0005000201d5a4b4a70000000049454e44ae426082')
+CHAT_QUESTIONS = [
+    # Escalated to the model; the time words make the stand-in request a forecast tool turn
+    ("Which fabric is best for a run tomorrow morning?", 3),
+    ("I'm hiking this afternoon, merino or synthetic?", 2),
+    ("Compare the rain shell and the wool coat for this evening", 2),
+    # Answered by the rules fast path
+    ("Do I need a jacket?", 2),
+    ("Will it rain?", 1),
+]
+MIX = [('cache-hit', 60), ('cold-miss', 10), ('chat', 20), ('fashion', 10)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def weighted(choices):
+    population, weights = zip(*choices)
+    return lambda rng: rng.choices(population, weights)[0]
+
+
+# Workloads: each call makes one request and returns (endpoint label, response)
+
+def hit_request(client, rng, _counter):
+    zipcode = rng.choice(HOT_LOCATIONS)
+    return 'GET /api/hourly-data (hit)', client.get(f"{client.base}/api/hourly-data",
+                                                    params={'zipcode': zipcode}, timeout=30)
+
+
+def miss_request(client, rng, counter):
+    zipcode = f"cold-{client.run_id}-{next(counter)}"
+    return 'GET /api/hourly-data (miss)', client.get(f"{client.base}/api/hourly-data",
+                                                     params={'zipcode': zipcode}, timeout=30)
+
+
+pick_question = weighted(CHAT_QUESTIONS)
+
+
+def chat_request(client, rng, _counter):
+    payload = {
+        "messages": [{"role": "user", "content": pick_question(rng)}],
+        "weather": WEATHER,
+        "zipcode": rng.choice(HOT_LOCATIONS),
+    }
+    return 'POST /api/chat', client.post(f"{client.base}/api/chat", json=payload, timeout=60)
+
+
+def fashion_request(client, rng, _counter):
+    return 'POST /api/fashion-suggestions', client.post(
+        f"{client.base}/api/fashion-suggestions",
+        files={'image': ('closet.png', io.BytesIO(PIXEL), 'image/png')},
+        data={'weather_data': json.dumps(WEATHER)}, timeout=60)
+
+
+WORKLOADS = {
+    'cache-hit': hit_request,
+    'cold-miss': miss_request,
+    'chat': chat_request,
+    'fashion': fashion_request,
+}
+pick_mixed = weighted(MIX)
+WORKLOADS['mixed'] = lambda client, rng, counter: WORKLOADS[pick_mixed(rng)](client, rng, counter)
+
+
+class Recorder:
+    """Thread-safe latency samples per endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, label, status, seconds):
+        with self.lock:
+            self.samples.setdefault(label, []).append((status, seconds))
+
+    def summary(self, elapsed):
+        endpoints, total = {}, 0
+        for label, samples in sorted(self.samples.items()):
+            latencies = sorted(s for _, s in samples)
+            statuses = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors = sum(n for status, n in statuses.items() if not status.startswith(('2', '3')))
+            total += len(samples)
+            endpoints[label] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'errors': errors,
+                'status_counts': statuses,
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': round(latencies[-1] * 1000, 1),
+            }
+        return {'duration_s': round(elapsed, 2), 'requests': total,
+                'throughput_rps': round(total / elapsed, 2), 'endpoints': endpoints}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile in ms"""
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return round(sorted_values[index] * 1000, 1)
+
+
+def run_workload(name, clients, duration, seed):
+    """Drive one workload with every client concurrently for duration seconds"""
+    recorder = Recorder()
+    make_request = WORKLOADS[name]
+    counter = itertools.count()
+    deadline = time.monotonic() + duration
+
+    def loop(client, rng):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                label, response = make_request(client, rng, counter)
+                status = response.status_code
+            except requests.RequestException as e:
+                label, status = f"{name} (transport)", type(e).__name__
+            recorder.add(label, status, time.perf_counter() - started)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=loop, args=(client, random.Random(seed + i)), daemon=True)
+               for i, client in enumerate(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.summary(time.monotonic() - started)
+
+
+@contextmanager
+def running_app(env, workers, log_path):
+    """Start gunicorn on a free port and wait until /ready passes"""
+    port = free_port()
+    env = dict(env, GUNICORN_BIND=f"127.0.0.1:{port}", SERVER_NAME=f"127.0.0.1:{port}",
+               GUNICORN_WORKERS=str(workers))
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+                                cwd=SRC, env=env, stdout=log, stderr=subprocess.STDOUT)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 90
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"gunicorn exited during startup; see {log_path}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"/ready never passed; see {log_path}")
+                try:
+                    if requests.get(f"{base}/ready", timeout=30).status_code == 200:
+                        break
+                except requests.ConnectionError:
+                    pass
+                time.sleep(0.2)
+            yield base
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def sign_in(base, run_id, index, twilio_base):
+    """A requests.Session logged in through the OTP flow"""
+    client = requests.Session()
+    client.base, client.run_id = base, run_id
+    phone = f"+1555{random.randrange(10 ** 7):07d}"
+    response = client.post(f"{base}/otp/login", json={'phone_number': phone}, timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"login for user {index} failed: {response.status_code} {response.text[:200]}")
+
+    # Codes are delivered by a background job; wait for the stand-in to see it
+    deadline = time.monotonic() + 15
+    while True:
+        code = requests.get(f"{twilio_base}/_stub/codes/{phone}", timeout=5).json().get('code')
+        if code:
+            break
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"no code delivered for user {index}")
+        time.sleep(0.05)
+
+    response = client.post(f"{base}/otp/verify", json={'code': code}, timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"verify for user {index} failed: {response.status_code} {response.text[:200]}")
+    return client
+
+
+def app_env(db_host, db_port, stubs, metrics_dir):
+    anthropic, weather, twilio = stubs
+    env = dict(os.environ)
+    env.update({
+        'API_BASE_URL': f"http://127.0.0.1:{weather.server_address[1]}/VisualCrossingWebServices/rest/services/timeline",
+        'API_KEY': 'stub',
+        'ANTHROPIC_API_KEY': 'stub',
+        'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{anthropic.server_address[1]}",
+        'OTP_PROVIDER': 'twilio',
+        'TWILIO_ACCOUNT_SID': 'AC' + '0' * 32,
+        'TWILIO_AUTH_TOKEN': 'stub',
+        'TWILIO_PHONE_NUMBER': '+15550000000',
+        'TWILIO_BASE_URL': f"http://127.0.0.1:{twilio.server_address[1]}",
+        'DATABASE_URL': db_host,
+        'DATABASE_PORT': str(db_port),
+        'DATABASE_USER': 'postgres',
+        'DATABASE_PASSWORD': '',
+        'DATABASE_NAME': 'postgres',
+        'APP_SECRET_KEY': uuid.uuid4().hex,
+        # Every virtual user signs in from 127.0.0.1
+        'OTP_SENDS_PER_IP_HOUR': '1000000',
+        'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+        'TRACE_SAMPLE_RATE': '0',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path, max_regression):
+    """Print p95 changes against a baseline report; returns the regressions"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\n{'vs baseline':44} {'base p95':>9} {'p95':>9} {'change':>8}")
+    for name, result in report['workloads'].items():
+        base_endpoints = baseline.get('workloads', {}).get(name, {}).get('endpoints', {})
+        for label, stats in result['endpoints'].items():
+            base = base_endpoints.get(label)
+            if not base or not base['p95_ms']:
+                continue
+            change = stats['p95_ms'] / base['p95_ms'] - 1
+            flag = '  REGRESSED' if change > max_regression else ''
+            print(f"{name + ' ' + label:44.44} {base['p95_ms']:9.1f} {stats['p95_ms']:9.1f} {change:+8.0%}{flag}")
+            if flag:
+                regressions.append((name, label, change))
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{'workload / endpoint':44} {'req':>6} {'rps':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, result in report['workloads'].items():
+        print(f"{name:44} {result['requests']:6} {result['throughput_rps']:7.1f}")
+        for label, s in result['endpoints'].items():
+            print(f"  {label:42.42} {s['requests']:6} {s['throughput_rps']:7.1f} {s['errors']:5} "
+                  f"{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per workload")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--worker-class', default='sync', choices=('sync', 'gevent'))
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--database', help="HOST:PORT of an existing empty Postgres (default: start one)")
+    parser.add_argument('--weather-latency-ms', type=float, default=300)
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--sms-latency-ms', type=float, default=150)
+    parser.add_argument('--payload-dir', help="Recorded Visual Crossing responses (<location>.json)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Report path (default benchmarks/results/load-<time>.json)")
+    parser.add_argument('--baseline', help="Earlier report to compare p95 against")
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    workloads = [w.strip() for w in args.workloads.split(',') if w.strip()]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    random.seed(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with ExitStack() as stack:
+        stubs = (
+            anthropic_stub.serve(port=0, latency_ms=args.llm_latency_ms),
+            weather_stub.serve(port=0, latency_ms=args.weather_latency_ms, payload_dir=args.payload_dir),
+            twilio_stub.serve(port=0, latency_ms=args.sms_latency_ms),
+        )
+        for stub in stubs:
+            stack.callback(stub.shutdown)
+
+        if args.database:
+            db_host, db_port = args.database.rsplit(':', 1)
+        else:
+            db_host, db_port = stack.enter_context(throwaway_postgres())
+
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='weather-app-load-'))
+        metrics_dir = os.path.join(work_dir, 'metrics')
+        log_path = os.path.join(work_dir, 'app.log')
+        env = dict(app_env(db_host, db_port, stubs, metrics_dir), GUNICORN_WORKER_CLASS=args.worker_class)
+        base = stack.enter_context(running_app(env, args.workers, log_path))
+        print(f"App at {base} ({args.workers} {args.worker_class} workers); signing in {args.concurrency} users")
+
+        twilio_base = f"http://127.0.0.1:{stubs[2].server_address[1]}"
+        clients = [sign_in(base, run_id, i, twilio_base) for i in range(args.concurrency)]
+        # Warm the hot locations so cache-hit measures hits
+        for zipcode in HOT_LOCATIONS:
+            clients[0].get(f"{base}/api/hourly-data", params={'zipcode': zipcode}, timeout=30)
+
+        report = {
+            'meta': {
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'workers': args.workers,
+                'worker_class': args.worker_class,
+                'concurrency': args.concurrency,
+                'duration_s': args.duration,
+                'stub_latency_ms': {'weather': args.weather_latency_ms, 'anthropic': args.llm_latency_ms,
+                                    'twilio': args.sms_latency_ms},
+                'recorded_payloads': bool(args.payload_dir),
+            },
+            'workloads': {},
+        }
+        for i, name in enumerate(workloads):
+            print(f"Running {name} for {args.duration:.0f}s ...")
+            report['workloads'][name] = run_workload(name, clients, args.duration, args.seed * 1000 + i * 100)
+        report['meta']['upstream_calls'] = {'weather': stubs[1].state.calls, 'twilio': stubs[2].state.messages}
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nReport written to {output}")
+
+    if args.baseline:
+        regressions = compare(report, args.baseline, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed by more than {args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
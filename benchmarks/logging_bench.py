@@ -0,0 +1,97 @@
+"""
+Logging Benchmark
+Caller-side latency of logger.info() with the old synchronous stdout handler
+versus the queued BackgroundHandler, writing to a fast sink and to a slow one
+(every write stalls, like a throttled k8s log pipe). Also the cost of a
+cache-miss get_hourly_data call, which used to print every skipped hour.
+
+Usage:
+    python benchmarks/logging_bench.py [--records 2000] [--stall-ms 2]
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+import contextlib
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from utils.log import BackgroundHandler, JsonFormatter, RateLimitFilter  # noqa: E402
+from utils.data_processor import get_hourly_data  # noqa: E402
+from fixtures.visual_crossing import make_payload  # noqa: E402
+
+
+class SlowSink(io.StringIO):
+    """A stream whose every write stalls"""
+
+    def __init__(self, stall):
+        super().__init__()
+        self.stall = stall
+
+    def write(self, s):
+        time.sleep(self.stall)
+        return super().write(s)
+
+
+def caller_latency(handler, records):
+    logger = logging.getLogger(f"bench.{id(handler)}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    timings = []
+    for i in range(records):
+        started = time.perf_counter()
+        logger.info("Cache hit for location=%s", i)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return statistics.median(timings) * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def sync_handler(stream):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    return handler
+
+
+def background_handler(stream, records):
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    handler = BackgroundHandler(target, max_queue=records * 2)
+    handler.addFilter(RateLimitFilter(limit=0, window=10))
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--stall-ms', type=float, default=2)
+    args = parser.parse_args()
+
+    print(f"{'logger.info() caller latency':36} {'p50 us':>9} {'p99 us':>9}")
+    for sink_label, make_sink in (('fast sink', io.StringIO), ('slow sink', lambda: SlowSink(args.stall_ms / 1000))):
+        for label, make in (('sync StreamHandler', sync_handler),
+                            ('BackgroundHandler', lambda s: background_handler(s, args.records))):
+            handler = make(make_sink())
+            p50, p99 = caller_latency(handler, args.records)
+            handler.close()
+            print(f"{label + ', ' + sink_label:36} {p50:9.1f} {p99:9.1f}")
+
+    # What a cache miss used to cost in stdout writes alone
+    payload = make_payload(days=15)
+    sink = SlowSink(args.stall_ms / 1000)
+    with contextlib.redirect_stdout(sink):
+        started = time.perf_counter()
+        get_hourly_data(payload, datetime, hours=72)
+        elapsed = (time.perf_counter() - started) * 1000
+    print(f"\nget_hourly_data on a slow stdout: {elapsed:.1f} ms ({sink.getvalue().count(chr(10))} lines printed)")
+
+
+if __name__ == '__main__':
+    main()
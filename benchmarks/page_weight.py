@@ -0,0 +1,216 @@
+"""
+Page Weight Report
+Renders each page through the Flask test client, works out which static
+files a browser would download (the srcset/sizes candidate it would pick for
+a mobile and a desktop profile, the .br copy of text assets) and totals them
+against what the same page cost before the asset build: the unminified,
+uncompressed sources and the full-size PNGs. Lazy images are counted
+separately from the first load.
+
+Run the asset build first, or pass --build.
+
+Usage:
+    python benchmarks/page_weight.py [--build] [--budget-kb 150] [--output FILE]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from html.parser import HTMLParser
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from hot_path_bench import import_app  # noqa: E402
+
+STATIC = os.path.join(ROOT, 'src', 'static')
+# path, signed in
+PAGES = [('/', False), ('/weather-to-wear', True), ('/terms', False)]
+PROFILES = {
+    'mobile': {'viewport': 390, 'dpr': 3, 'types': ('image/avif', 'image/webp')},
+    'desktop': {'viewport': 1280, 'dpr': 1, 'types': ('image/avif', 'image/webp')},
+}
+PX = re.compile(r'^\s*(\d+(?:\.\d+)?)px\s*$')
+
+
+class AssetParser(HTMLParser):
+    """Stylesheets, scripts and images (with their <picture> sources) referenced by a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.assets = []
+        self._sources = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and attrs.get('rel') == 'stylesheet' and attrs.get('href'):
+            self.assets.append({'kind': 'css', 'url': attrs['href'], 'lazy': False})
+        elif tag == 'script' and attrs.get('src'):
+            self.assets.append({'kind': 'js', 'url': attrs['src'], 'lazy': False})
+        elif tag == 'picture':
+            self._sources = []
+        elif tag == 'source' and self._sources is not None:
+            self._sources.append(attrs)
+        elif tag == 'img' and attrs.get('src'):
+            self.assets.append({'kind': 'img', 'url': attrs['src'], 'srcset': attrs.get('srcset'),
+                                'sizes': attrs.get('sizes'), 'sources': self._sources or [],
+                                'lazy': attrs.get('loading') == 'lazy'})
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self._sources = None
+
+
+def parse_srcset(srcset):
+    candidates = []
+    for part in srcset.split(','):
+        url, _, descriptor = part.strip().partition(' ')
+        if descriptor.strip().endswith('w'):
+            candidates.append((int(descriptor.strip()[:-1]), url))
+    return sorted(candidates)
+
+
+def pick(asset, profile):
+    """The URL a browser with this profile would fetch for an image"""
+    for source in asset['sources']:
+        if source.get('type') in profile['types'] and source.get('srcset'):
+            srcset, sizes = source['srcset'], source.get('sizes')
+            break
+    else:
+        srcset, sizes = asset.get('srcset'), asset.get('sizes')
+    if not srcset:
+        return asset['url']
+    match = PX.match(sizes or '')
+    needed = (float(match.group(1)) if match else profile['viewport']) * profile['dpr']
+    candidates = parse_srcset(srcset)
+    return next((url for width, url in candidates if width >= needed), candidates[-1][1])
+
+
+def static_path(url):
+    if not url.startswith('/static/'):
+        return None
+    return os.path.join(STATIC, url[len('/static/'):].split('?')[0])
+
+
+def transfer_bytes(path):
+    """What the proxy sends: the .br copy when the build wrote one"""
+    for suffix in ('.br', '.gz', ''):
+        if os.path.exists(path + suffix):
+            return os.path.getsize(path + suffix)
+    return None
+
+
+def source_index(manifest):
+    """Built path -> source path for every fingerprinted file and image variant"""
+    index = {}
+    for source, built in manifest.entries.items():
+        index[built] = source
+    for source, entry in manifest.images.items():
+        for variants in entry['sources'].values():
+            for variant in variants:
+                index[variant['path']] = source
+        index[entry['fallback']['path']] = source
+    return index
+
+
+def page_weight(html, manifest, profile):
+    parser = AssetParser()
+    parser.feed(html)
+    sources = source_index(manifest)
+    seen = set()
+    rows = []
+    for asset in parser.assets:
+        url = pick(asset, profile) if asset['kind'] == 'img' else asset['url']
+        if url in seen:
+            continue
+        seen.add(url)
+        path = static_path(url)
+        if path is None:
+            rows.append({'url': url, 'external': True})
+            continue
+        built = url[len('/static/build/'):] if url.startswith('/static/build/') else None
+        source = sources.get(built, built) if built else url[len('/static/'):]
+        before_path = os.path.join(STATIC, source)
+        rows.append({
+            'url': url,
+            'source': source,
+            'lazy': asset['lazy'],
+            'before': os.path.getsize(before_path) if os.path.exists(before_path) else None,
+            'after': transfer_bytes(path),
+        })
+    return rows
+
+
+def totals(rows):
+    counted = [r for r in rows if not r.get('external') and r['before'] is not None and r['after'] is not None]
+    # Before the build every size of an image was the one cached source file
+    before = {r['source']: r['before'] for r in counted}
+    return {
+        'before': sum(before.values()),
+        'first_load': sum(r['after'] for r in counted if not r['lazy']),
+        'deferred': sum(r['after'] for r in counted if r['lazy']),
+        'missing': [r['url'] for r in rows if not r.get('external') and r['after'] is None],
+        'external': [r['url'] for r in rows if r.get('external')],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--build', action='store_true', help="Run the asset build first")
+    parser.add_argument('--budget-kb', type=float, help="Fail if any page's first load exceeds this")
+    parser.add_argument('--output', help="Write the per-asset report as JSON")
+    args = parser.parse_args()
+
+    if args.build:
+        from assets.build import build
+        build(STATIC)
+
+    main_module = import_app()
+    app, manifest = main_module.app, main_module.asset_manifest
+    if not manifest.load(app.static_folder):
+        print("No asset build found; run python -m assets.build static (from src/) or pass --build")
+        return 1
+
+    report, over_budget = {}, []
+    print(f"{'page':20} {'profile':8} {'before KB':>10} {'first load KB':>14} {'deferred KB':>12} {'saved':>7}")
+    for path, signed_in in PAGES:
+        client = app.test_client()
+        if signed_in:
+            with client.session_transaction() as session:
+                session['logged_in'] = True
+        response = client.get(path)
+        if response.status_code != 200:
+            print(f"{path:20} HTTP {response.status_code}; skipped")
+            continue
+        html = response.get_data(as_text=True)
+        report[path] = {}
+        for name, profile in PROFILES.items():
+            rows = page_weight(html, manifest, profile)
+            t = totals(rows)
+            report[path][name] = {'totals': t, 'assets': rows}
+            after = t['first_load'] + t['deferred']
+            saved = 1 - after / t['before'] if t['before'] else 0.0
+            print(f"{path:20} {name:8} {t['before'] / 1024:10.1f} {t['first_load'] / 1024:14.1f} "
+                  f"{t['deferred'] / 1024:12.1f} {saved:7.1%}")
+            for url in t['missing']:
+                print(f"{'':20} {'':8} missing from the build: {url}")
+            if args.budget_kb and t['first_load'] / 1024 > args.budget_kb:
+                over_budget.append((path, name, t['first_load'] / 1024))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if over_budget:
+        for path, name, kb in over_budget:
+            print(f"{path} ({name}) first load is {kb:.1f} KB, over the {args.budget_kb:.0f} KB budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Anthropic API Stand-in
+Local HTTP server implementing the parts of the Messages and Message Batches
+APIs this app uses, with configurable latency. Point the SDK at it with
+ANTHROPIC_BASE_URL=http://127.0.0.1:8701 ANTHROPIC_API_KEY=stub.
+
+Usage:
+    python benchmarks/stubs/anthropic_stub.py [--port 8701] [--latency-ms 800] [--batch-seconds 2]
+"""
+
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    # Hundreds of clients may connect at once; the default listen backlog of 5 drops them
+    request_queue_size = 1024
+
+
+SUGGESTIONS = {
+    "summary": "Layer a light sweater under a rain shell to stay dry and comfortable.",
+    "outfit": [
+        {"item": "Grey merino sweater", "description": "Crew neck, mid-weight", "reason": "Warm without bulk"},
+        {"item": "Navy rain shell", "description": "Hooded, packable", "reason": "Blocks wind and showers"},
+        {"item": "Dark jeans", "description": "Straight leg", "reason": "Durable for a cool day"},
+    ],
+    "accessories": [{"item": "Umbrella", "reason": "Showers are likely this afternoon"}],
+    "tips": ["Start with the shell zipped; open it once you warm up.", "Wool socks keep feet warm if they get damp."],
+}
+
+GUIDANCE = {
+    "summary": "Dress in breathable layers you can remove as the day warms.",
+    "layers": ["Moisture-wicking base layer", "Light fleece", "Wind-resistant shell"],
+    "accessories": ["Light gloves"],
+    "tips": ["Dress for the coldest hour you'll be outside.", "Avoid cotton if you'll be active."],
+}
+
+TOOL_TRIGGER = re.compile(r"\b(tonight|tomorrow|later|morning|afternoon|evening|\d{1,2}\s*(am|pm))\b", re.I)
+
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _text_of(content):
+    if isinstance(content, str):
+        return content
+    return " ".join(b.get('text', '') for b in content if b.get('type') == 'text')
+
+
+def make_message(params):
+    """Build a Messages API response for a request body"""
+    messages = params.get('messages', [])
+    last = messages[-1] if messages else {'content': ''}
+    prompt = _text_of(last.get('content', ''))
+    last_is_tool_result = isinstance(last.get('content'), list) and any(
+        b.get('type') == 'tool_result' for b in last['content'])
+
+    content, stop_reason = None, 'end_turn'
+    if 'fashion advisor' in prompt:
+        content = [{"type": "text", "text": json.dumps(SUGGESTIONS)}]
+    elif 'generic outfit guidance' in prompt:
+        content = [{"type": "text", "text": json.dumps(GUIDANCE)}]
+    elif params.get('tools') and not last_is_tool_result and TOOL_TRIGGER.search(prompt):
+        content = [{
+            "type": "tool_use",
+            "id": f"toolu_{uuid.uuid4().hex[:20]}",
+            "name": "get_forecast",
+            "input": {"hours_ahead": 6},
+        }]
+        stop_reason = 'tool_use'
+    else:
+        content = [{"type": "text", "text": "Polar Wear here! A light jacket over a long-sleeve shirt will do nicely."}]
+
+    input_tokens = len(json.dumps(messages)) // 4 + len(str(params.get('system', ''))) // 4
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get('model', 'stub-model'),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": 60},
+    }
+
+
+class StubState:
+    def __init__(self, latency_ms, batch_seconds):
+        self.latency = latency_ms / 1000.0
+        self.batch_seconds = batch_seconds
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('request-id', f"req_{uuid.uuid4().hex[:16]}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _batch_view(self, batch):
+        ended = time.time() >= batch['ends_at']
+        count = len(batch['requests'])
+        host = self.headers.get('Host', '127.0.0.1')
+        return {
+            "id": batch['id'],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0, "canceled": 0, "expired": 0,
+            },
+            "created_at": _iso(batch['created_at']),
+            "expires_at": _iso(batch['created_at'] + timedelta(days=1)),
+            "ended_at": _iso(datetime.now(timezone.utc)) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def do_POST(self):
+        state = self.state
+        if self.path.startswith('/v1/messages/batches'):
+            body = self._body()
+            batch = {
+                'id': f"msgbatch_{uuid.uuid4().hex[:24]}",
+                'requests': body.get('requests', []),
+                'created_at': datetime.now(timezone.utc),
+                'ends_at': time.time() + state.batch_seconds,
+            }
+            with state.lock:
+                state.batches[batch['id']] = batch
+            return self._send(200, self._batch_view(batch))
+
+        if self.path.startswith('/v1/messages'):
+            body = self._body()
+            with state.lock:
+                state.calls += 1
+            time.sleep(state.latency)
+            return self._send(200, make_message(body))
+
+        self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_GET(self):
+        state = self.state
+        match = re.match(r'^/v1/messages/batches/([\w-]+)(/results)?$', self.path.split('?')[0])
+        batch = state.batches.get(match.group(1)) if match else None
+        if not batch:
+            return self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        if not match.group(2):
+            return self._send(200, self._batch_view(batch))
+
+        lines = [
+            json.dumps({
+                "custom_id": req['custom_id'],
+                "result": {"type": "succeeded", "message": make_message(req['params'])},
+            })
+            for req in batch['requests']
+        ]
+        self._send(200, ("\n".join(lines) + "\n").encode(), 'application/binary')
+
+
+def serve(port=8701, latency_ms=800, batch_seconds=2.0, host='127.0.0.1'):
+    """Start the stub in a background thread; returns the server"""
+    handler = type('BoundHandler', (Handler,), {'state': StubState(latency_ms, batch_seconds)})
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='anthropic-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8701)
+    parser.add_argument('--latency-ms', type=float, default=800)
+    parser.add_argument('--batch-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.batch_seconds)
+    print(f"Anthropic stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
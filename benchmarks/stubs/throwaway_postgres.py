@@ -0,0 +1,89 @@
+"""
+Throwaway PostgreSQL
+Starts an empty Postgres for a benchmark run and removes it afterwards:
+initdb/pg_ctl from PATH (or PG_BIN) when available, otherwise a docker
+container. Trust authentication, user postgres, database postgres.
+
+    with throwaway_postgres() as (host, port):
+        ...
+"""
+
+import os
+import time
+import shutil
+import socket
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+DOCKER_IMAGE = os.getenv('PG_DOCKER_IMAGE', 'postgres:16-alpine')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_accepting(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            import psycopg2
+            psycopg2.connect(host='127.0.0.1', port=port, user='postgres', dbname='postgres',
+                             connect_timeout=2).close()
+            return
+        except Exception:
+            time.sleep(0.25)
+    raise RuntimeError(f"Postgres on port {port} did not come up within {timeout}s")
+
+
+def _binary(name):
+    pg_bin = os.getenv('PG_BIN')
+    return os.path.join(pg_bin, name) if pg_bin else shutil.which(name)
+
+
+@contextmanager
+def _local_cluster():
+    port = _free_port()
+    data_dir = tempfile.mkdtemp(prefix='weather-app-pg-')
+    try:
+        subprocess.run([_binary('initdb'), '-D', data_dir, '-U', 'postgres', '-A', 'trust'],
+                       check=True, capture_output=True)
+        subprocess.run([_binary('pg_ctl'), '-D', data_dir, '-l', os.path.join(data_dir, 'server.log'), '-w',
+                        '-o', f"-p {port} -k {data_dir} -c listen_addresses=127.0.0.1 -c fsync=off", 'start'],
+                       check=True, capture_output=True)
+        try:
+            _wait_accepting(port)
+            yield '127.0.0.1', port
+        finally:
+            subprocess.run([_binary('pg_ctl'), '-D', data_dir, '-m', 'fast', 'stop'], capture_output=True)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+@contextmanager
+def _docker_container():
+    port = _free_port()
+    container = subprocess.run(
+        ['docker', 'run', '-d', '--rm', '-p', f"127.0.0.1:{port}:5432",
+         '-e', 'POSTGRES_HOST_AUTH_METHOD=trust', DOCKER_IMAGE, '-c', 'fsync=off'],
+        check=True, capture_output=True, text=True).stdout.strip()
+    try:
+        _wait_accepting(port)
+        yield '127.0.0.1', port
+    finally:
+        subprocess.run(['docker', 'stop', container], capture_output=True)
+
+
+@contextmanager
+def throwaway_postgres():
+    """Yield (host, port) of a fresh, empty Postgres"""
+    if _binary('initdb') and _binary('pg_ctl'):
+        with _local_cluster() as address:
+            yield address
+    elif shutil.which('docker'):
+        with _docker_container() as address:
+            yield address
+    else:
+        raise RuntimeError("No initdb/pg_ctl on PATH (set PG_BIN) and no docker; pass --database HOST:PORT")
@@ -0,0 +1,108 @@
+"""
+Trace Collector Stand-in
+Local HTTP server that accepts the app's trace exports (TRACE_EXPORT_URL) and
+prints a per-span latency summary. Run the app with
+TRACE_EXPORT_URL=http://127.0.0.1:8702/v1/traces TRACE_SAMPLE_RATE=1.
+
+GET /v1/traces returns the most recent traces as JSON.
+
+Usage:
+    python benchmarks/stubs/trace_collector.py [--port 8702] [--report-seconds 10]
+"""
+
+import json
+import argparse
+import threading
+import statistics
+from collections import deque, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CollectorState:
+    def __init__(self, keep=1000):
+        self.traces = deque(maxlen=keep)
+        self.lock = threading.Lock()
+
+    def add(self, traces):
+        with self.lock:
+            self.traces.extend(traces)
+
+    def summary(self):
+        """{(trace name, span name): [durations ms]}"""
+        durations = defaultdict(list)
+        with self.lock:
+            traces = list(self.traces)
+        for trace in traces:
+            durations[(trace['name'], 'total')].append(trace['duration_ms'])
+            for span in trace['spans']:
+                durations[(trace['name'], span['name'])].append(span.get('duration_ms', 0.0))
+        return durations
+
+
+class Handler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != '/v1/traces':
+            return self._send(404, {"error": self.path})
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        self.state.add(body.get('traces', []))
+        self._send(200, {"accepted": len(body.get('traces', []))})
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/v1/traces':
+            return self._send(404, {"error": self.path})
+        with self.state.lock:
+            self._send(200, {"traces": list(self.state.traces)})
+
+
+def serve(port=8702, host='127.0.0.1'):
+    """Start the collector in a background thread; returns the server (state on server.state)"""
+    state = CollectorState()
+    handler = type('BoundHandler', (Handler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='trace-collector', daemon=True).start()
+    return server
+
+
+def print_summary(state):
+    rows = sorted(state.summary().items())
+    print(f"{'trace':32} {'span':28} {'n':>5} {'p50 ms':>9} {'max ms':>9}")
+    for (trace_name, span_name), values in rows:
+        print(f"{trace_name[:32]:32} {span_name[:28]:28} {len(values):5} "
+              f"{statistics.median(values):9.1f} {max(values):9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8702)
+    parser.add_argument('--report-seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    server = serve(args.port)
+    print(f"Trace collector listening on http://127.0.0.1:{server.server_address[1]}/v1/traces")
+    stop = threading.Event()
+    try:
+        while not stop.wait(args.report_seconds):
+            print_summary(server.state)
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Twilio API Stand-in
+Local HTTP server for the Messages and Verify calls the app makes. Codes sent
+by SMS (or issued by Verify) are kept so a load test can complete the login:
+GET /_stub/codes/<phone number> returns the latest one. Point the app at it
+with TWILIO_BASE_URL=http://127.0.0.1:8704.
+
+Usage:
+    python benchmarks/stubs/twilio_stub.py [--port 8704] [--latency-ms 150]
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from urllib.parse import parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    # Hundreds of clients may connect at once; the default listen backlog of 5 drops them
+    request_queue_size = 1024
+
+
+CODE_PATTERN = re.compile(r'\b(\d{6})\b')
+
+
+class TwilioState:
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.codes = {}
+        self.lock = threading.Lock()
+        self.messages = 0
+
+    def remember(self, phone_number, code):
+        with self.lock:
+            self.codes[phone_number] = code
+            self.messages += 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+
+    def do_POST(self):
+        state = self.state
+        form = self._form()
+        time.sleep(state.latency)
+        path = self.path.split('?')[0]
+
+        if path.endswith('/Messages.json'):
+            match = CODE_PATTERN.search(form.get('Body', ''))
+            if match:
+                state.remember(form.get('To'), match.group(1))
+            return self._send(201, {
+                "sid": f"SM{uuid.uuid4().hex}",
+                "account_sid": path.split('/')[3],
+                "to": form.get('To'),
+                "from": form.get('From'),
+                "body": form.get('Body'),
+                "status": "queued",
+                "num_segments": "1",
+                "direction": "outbound-api",
+                "api_version": "2010-04-01",
+            })
+
+        if path.endswith('/Verifications'):
+            state.remember(form.get('To'), f"{random.randrange(1000000):06d}")
+            return self._send(201, {
+                "sid": f"VE{uuid.uuid4().hex}",
+                "to": form.get('To'),
+                "channel": form.get('Channel', 'sms'),
+                "status": "pending",
+                "valid": False,
+            })
+
+        if path.endswith('/VerificationCheck'):
+            with state.lock:
+                approved = state.codes.get(form.get('To')) == form.get('Code')
+            return self._send(200, {
+                "sid": f"VE{uuid.uuid4().hex}",
+                "to": form.get('To'),
+                "status": "approved" if approved else "pending",
+                "valid": approved,
+            })
+
+        self._send(404, {"code": 20404, "message": f"The requested resource {path} was not found", "status": 404})
+
+    def do_GET(self):
+        match = re.match(r'^/_stub/codes/(.+)$', self.path)
+        if not match:
+            return self._send(404, {"code": 20404, "message": "Not found", "status": 404})
+        with self.state.lock:
+            code = self.state.codes.get(unquote(match.group(1)))
+        self._send(200 if code else 404, {"code": code})
+
+
+def serve(port=8704, latency_ms=150, host='127.0.0.1'):
+    """Start the stub in a background thread; returns the server (state on server.state)"""
+    state = TwilioState(latency_ms)
+    handler = type('BoundHandler', (Handler,), {'state': state})
+    server = StubServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='twilio-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8704)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms)
+    print(f"Twilio stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
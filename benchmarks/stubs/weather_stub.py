@@ -0,0 +1,105 @@
+"""
+Visual Crossing API Stand-in
+Local HTTP server for the timeline endpoint the app calls. Serves recorded
+payloads from --payload-dir (<location>.json, or any file round-robin) or
+generated ones, after a configurable latency. Point the app at it with
+API_BASE_URL=http://127.0.0.1:8703 API_KEY=stub.
+
+A location of 'invalid' gets the API's 400 response.
+
+Usage:
+    python benchmarks/stubs/weather_stub.py [--port 8703] [--latency-ms 300] [--payload-dir DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import itertools
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fixtures.visual_crossing import make_payload, load_payload  # noqa: E402
+
+
+class StubServer(ThreadingHTTPServer):
+    # Hundreds of clients may connect at once; the default listen backlog of 5 drops them
+    request_queue_size = 1024
+
+
+class WeatherState:
+    def __init__(self, latency_ms, payload_dir=None, days=15):
+        self.latency = latency_ms / 1000.0
+        self.days = days
+        self.recorded = {}
+        if payload_dir:
+            for name in sorted(os.listdir(payload_dir)):
+                if name.endswith('.json'):
+                    self.recorded[name[:-5]] = json.dumps(load_payload(os.path.join(payload_dir, name))).encode()
+        self._rotation = itertools.cycle(list(self.recorded.values())) if self.recorded else None
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def body_for(self, location):
+        with self._lock:
+            self.calls += 1
+            if location in self.recorded:
+                return self.recorded[location]
+            if self._rotation is not None:
+                return next(self._rotation)
+        return json.dumps(make_payload(location, days=self.days)).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        location = unquote(self.path.split('?')[0].rstrip('/').rsplit('/', 1)[-1])
+        time.sleep(self.state.latency)
+        if location.lower() == 'invalid':
+            body, status, content_type = b'Bad API Request:Invalid location parameter value.', 400, 'text/plain'
+        else:
+            body, status, content_type = self.state.body_for(location), 200, 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=8703, latency_ms=300, payload_dir=None, days=15, host='127.0.0.1'):
+    """Start the stub in a background thread; returns the server (state on server.state)"""
+    state = WeatherState(latency_ms, payload_dir, days)
+    handler = type('BoundHandler', (Handler,), {'state': state})
+    server = StubServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='weather-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8703)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--payload-dir')
+    parser.add_argument('--days', type=int, default=15)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.payload_dir, args.days)
+    print(f"Visual Crossing stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
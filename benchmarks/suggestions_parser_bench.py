@@ -0,0 +1,163 @@
+"""
+Suggestions Parser Benchmark
+Parse success rate and per-call time for the tolerant suggestions parser
+against the previous split-and-json.loads parser, over a generated fuzz
+corpus: clean JSON, code fences, surrounding prose, truncation at every
+offset, wrong field types and plain garbage.
+
+Usage:
+    python benchmarks/suggestions_parser_bench.py [--seed 7] [--repeat 5]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.json_parser import compile_schema, extract_json_object  # noqa: E402
+
+# Same shape as SUGGESTIONS_SCHEMA in main.py (importing main needs Flask and the DB)
+SCHEMA = compile_schema({
+    "summary": str,
+    "outfit": [{"item": str, "description": str, "reason": str}],
+    "accessories": [{"item": str, "reason": str}],
+    "tips": [str],
+})
+
+SAMPLE = {
+    "summary": "Layer a light sweater under a rain shell to stay dry and comfortable.",
+    "outfit": [
+        {"item": "Grey merino sweater", "description": "Crew neck, mid-weight", "reason": "Warm without bulk"},
+        {"item": "Navy rain shell", "description": "Hooded, packable", "reason": "Blocks wind and showers"},
+        {"item": "Dark jeans", "description": "Straight leg", "reason": "Durable for a cool day"},
+        {"item": "Brown leather boots", "description": "Ankle height, \"waterproofed\"", "reason": "Puddles"},
+    ],
+    "accessories": [
+        {"item": "Umbrella", "reason": "Showers are likely this afternoon"},
+        {"item": "Wool beanie", "reason": "Wind chill near 40°F"},
+    ],
+    "tips": [
+        "Start with the shell zipped; open it once you warm up.",
+        "Wool socks keep feet warm if they get damp.",
+        "Check the radar before leaving {just in case}.",
+    ],
+}
+
+
+def legacy_parse(raw_response):
+    """The parser main.py used before utils.json_parser"""
+    cleaned = raw_response.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[1]
+        cleaned = cleaned.rsplit("```", 1)[0].strip()
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError:
+        return None
+    try:
+        return {
+            "summary": data.get("summary", ""),
+            "outfit": [{"item": i.get("item", ""), "description": i.get("description", ""),
+                        "reason": i.get("reason", "")} for i in data.get("outfit", [])],
+            "accessories": [{"item": a.get("item", ""), "reason": a.get("reason", "")}
+                            for a in data.get("accessories", [])],
+            "tips": data.get("tips", []),
+        }
+    except (AttributeError, TypeError):
+        # The endpoint would have returned a 500 here
+        return None
+
+
+def tolerant_parse(raw_response):
+    data, _ = extract_json_object(raw_response)
+    return SCHEMA(data) if data is not None else None
+
+
+def build_corpus(rng):
+    """(category, text, expect_json) cases"""
+    clean = json.dumps(SAMPLE, indent=2, ensure_ascii=False)
+    compact = json.dumps(SAMPLE, ensure_ascii=False)
+    cases = [
+        ('clean', clean, True),
+        ('clean', compact, True),
+        ('fence', f"```json\n{clean}\n```", True),
+        ('fence', f"```\n{compact}```", True),
+        ('fence', f"  ```json\n{clean}\n```\n", True),
+        ('prose', f"Here's an outfit for today:\n\n{clean}\n\nStay warm!", True),
+        ('prose', f"Sure! {{Based on the photo}}, here you go:\n```json\n{clean}\n```", True),
+        ('prose', f"Looking at your closet I see lots of options.\n{compact}", True),
+    ]
+
+    # Truncation at every offset past the summary, as when max_tokens is hit
+    for cut in range(compact.index('"outfit"'), len(compact) - 1):
+        cases.append(('truncated', compact[:cut], True))
+    for cut in range(clean.index('"outfit"'), len(clean) - 1, 7):
+        cases.append(('truncated-fence', "```json\n" + clean[:cut], True))
+
+    wrong = [
+        {**SAMPLE, "tips": "Bring an umbrella."},
+        {**SAMPLE, "outfit": ["Grey sweater", "Rain shell"]},
+        {**SAMPLE, "accessories": None, "summary": 42},
+        {**SAMPLE, "outfit": [None, {"item": "Jeans"}, 3]},
+        {"summary": "Only a summary"},
+    ]
+    cases.extend(('wrong-types', json.dumps(w), True) for w in wrong)
+
+    alphabet = 'abc {}[]":,\n`'
+    for _ in range(200):
+        cases.append(('garbage', ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 120))), False))
+    cases.append(('garbage', "I'm sorry, I can't make out the clothes in this photo.", False))
+    cases.append(('garbage', '', False))
+    return cases
+
+
+def time_parser(parse, cases, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _, text, _ in cases:
+            parse(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = build_corpus(random.Random(args.seed))
+    categories = sorted({c for c, _, _ in cases})
+
+    # Fuzz check: the tolerant parser must never raise and must always return the full shape
+    for category, text, _ in cases:
+        result = tolerant_parse(text)
+        if result is not None:
+            assert set(result) == {"summary", "outfit", "accessories", "tips"}, category
+            assert all(isinstance(t, str) for t in result["tips"]), category
+            # A repair cut just after '{' must not leave a blank item card
+            assert all(any(entry.values()) for entry in result["outfit"] + result["accessories"]), category
+
+    print(f"{len(cases)} cases\n")
+    print(f"{'category':16} {'cases':>6} {'legacy ok':>10} {'tolerant ok':>12}")
+    for category in categories:
+        subset = [c for c in cases if c[0] == category]
+        legacy_ok = sum((legacy_parse(t) is not None) == expect for _, t, expect in subset)
+        tolerant_ok = sum((tolerant_parse(t) is not None) == expect for _, t, expect in subset)
+        print(f"{category:16} {len(subset):6d} {legacy_ok:10d} {tolerant_ok:12d}")
+
+    clean = [c for c in cases if c[0] in ('clean', 'fence')]
+    print(f"\n{'per call (us)':16} {'legacy':>10} {'tolerant':>12}")
+    for label, subset in (('clean+fence', clean), ('all', cases)):
+        legacy = time_parser(legacy_parse, subset, args.repeat) * 1e6
+        tolerant = time_parser(tolerant_parse, subset, args.repeat) * 1e6
+        print(f"{label:16} {legacy:10.1f} {tolerant:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
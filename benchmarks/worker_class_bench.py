@@ -0,0 +1,164 @@
+"""
+Worker Class Benchmark
+Sync versus gevent gunicorn workers on the I/O-bound mix: the same stand-ins,
+Postgres and workload as load_test.py, driven by a few hundred concurrent
+users. Nearly every request waits on Postgres, Visual Crossing, Anthropic or
+Twilio, so a sync worker sits idle holding one request while a gevent
+worker serves many.
+
+Under sync workers the bulkheads (utils.bulkhead) shed most LLM calls at
+this concurrency; shed requests are counted separately from errors, and
+throughput is counted from successful responses only.
+
+Usage:
+    python benchmarks/worker_class_bench.py [--classes sync,gevent] [--concurrency 200]
+        [--duration 20] [--workers 4] [--workload mixed] [--database HOST:PORT]
+        [--weather-latency-ms 300] [--llm-latency-ms 800] [--output FILE]
+"""
+
+import os
+import sys
+import json
+import uuid
+import random
+import argparse
+import platform
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from load_test import (  # noqa: E402
+    HOT_LOCATIONS, WORKLOADS, app_env, git_revision, run_workload, running_app, sign_in,
+)
+from stubs import anthropic_stub, twilio_stub, weather_stub  # noqa: E402
+from stubs.throwaway_postgres import throwaway_postgres  # noqa: E402
+
+
+def outcome_totals(result):
+    """Successful, shed (503) and failed requests across every endpoint"""
+    ok = shed = failed = 0
+    for stats in result['endpoints'].values():
+        for status, count in stats['status_counts'].items():
+            if status.startswith(('2', '3')):
+                ok += count
+            elif status == '503':
+                shed += count
+            else:
+                failed += count
+    return ok, shed, failed
+
+
+def run_class(worker_class, args, db, stubs, work_dir):
+    """Start the app with one worker class, sign users in and run the workload"""
+    metrics_dir = os.path.join(work_dir, f"metrics-{worker_class}")
+    env = dict(app_env(*db, stubs, metrics_dir),
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_WORKER_CONNECTIONS=str(args.worker_connections),
+               BULKHEAD_STATE_FILE=os.path.join(work_dir, f"bulkheads-{worker_class}"),
+               # A code per virtual user goes through the dispatch queue during sign-in
+               SMS_QUEUE_DEPTH=str(max(64, args.concurrency)))
+    log_path = os.path.join(work_dir, f"app-{worker_class}.log")
+    with running_app(env, args.workers, log_path) as base:
+        run_id = uuid.uuid4().hex[:8]
+        twilio_base = f"http://127.0.0.1:{stubs[2].server_address[1]}"
+        print(f"{worker_class}: app at {base}; signing in {args.concurrency} users")
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            clients = list(pool.map(lambda i: sign_in(base, run_id, i, twilio_base), range(args.concurrency)))
+        for zipcode in HOT_LOCATIONS:
+            clients[0].get(f"{base}/api/hourly-data", params={'zipcode': zipcode}, timeout=30)
+
+        print(f"{worker_class}: running {args.workload} for {args.duration:.0f}s ...")
+        result = run_workload(args.workload, clients, args.duration, args.seed)
+        for client in clients:
+            client.close()
+
+    ok, shed, failed = outcome_totals(result)
+    result['ok_rps'] = round(ok / result['duration_s'], 2)
+    result['shed'] = shed
+    result['failed'] = failed
+    return result
+
+
+def print_comparison(results):
+    classes = list(results)
+    print(f"\n{'':30}" + ''.join(f"{c:>22}" for c in classes))
+    for label, key in (('ok req/s', 'ok_rps'), ('shed (503)', 'shed'), ('failed', 'failed')):
+        print(f"{label:30}" + ''.join(f"{results[c][key]:>22}" for c in classes))
+
+    endpoints = sorted({label for r in results.values() for label in r['endpoints']})
+    print(f"\n{'p50 / p95 ms':30}" + ''.join(f"{c:>22}" for c in classes))
+    for label in endpoints:
+        cells = []
+        for c in classes:
+            s = results[c]['endpoints'].get(label)
+            cells.append(f"{s['p50_ms']:.0f} / {s['p95_ms']:.0f}" if s else '-')
+        print(f"{label:30.30}" + ''.join(f"{cell:>22}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--classes', default='sync,gevent')
+    parser.add_argument('--concurrency', type=int, default=200, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per worker class")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--worker-connections', type=int, default=200, help="Greenlets per gevent worker")
+    parser.add_argument('--workload', default='mixed', choices=sorted(WORKLOADS))
+    parser.add_argument('--database', help="HOST:PORT of an existing empty Postgres (default: start one)")
+    parser.add_argument('--weather-latency-ms', type=float, default=300)
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--sms-latency-ms', type=float, default=150)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Report path (default benchmarks/results/workers-<time>.json)")
+    args = parser.parse_args()
+
+    classes = [c.strip() for c in args.classes.split(',') if c.strip()]
+    random.seed(args.seed)
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"workers-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with ExitStack() as stack:
+        stubs = (
+            anthropic_stub.serve(port=0, latency_ms=args.llm_latency_ms),
+            weather_stub.serve(port=0, latency_ms=args.weather_latency_ms),
+            twilio_stub.serve(port=0, latency_ms=args.sms_latency_ms),
+        )
+        for stub in stubs:
+            stack.callback(stub.shutdown)
+
+        if args.database:
+            db_host, db_port = args.database.rsplit(':', 1)
+        else:
+            db_host, db_port = stack.enter_context(throwaway_postgres())
+
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='weather-app-workers-'))
+        results = {c: run_class(c, args, (db_host, db_port), stubs, work_dir) for c in classes}
+
+    report = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'workers': args.workers,
+            'worker_connections': args.worker_connections,
+            'concurrency': args.concurrency,
+            'workload': args.workload,
+            'duration_s': args.duration,
+            'stub_latency_ms': {'weather': args.weather_latency_ms, 'anthropic': args.llm_latency_ms,
+                                'twilio': args.sms_latency_ms},
+        },
+        'classes': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_comparison(results)
+    print(f"\nReport written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,12 @@
+import os
+import time
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils.green import cooperative
+from utils.metrics import UPSTREAM_SECONDS
+from utils.tracing import span
 
 logger = logging.getLogger('weather-app.api')
 
@@ -7,11 +14,40 @@ class ApiClient:
     def __init__(self, api_key, base_url):
         self.api_key = api_key
         self.base_url = base_url
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        # Keep-alive pool per process; sockets must not be shared across a fork
+        if self._pid != os.getpid():
+            self._session = requests.Session()
+            # Enough keep-alive connections for every greenlet that may be fetching at once
+            adapter = HTTPAdapter(pool_maxsize=int(os.getenv('HTTP_POOL_SIZE', '100' if cooperative() else '10')))
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+            self._pid = os.getpid()
+        return self._session
+
+    def reset(self):
+        """Drop the connection pool (called in a freshly forked worker)"""
+        self._session = None
+        self._pid = None
 
     def fetch_data(self, endpoint):
         url = f"{self.base_url}/{endpoint}&key={self.api_key}&contentType=json"
-        logger.info("Fetching weather data from API for endpoint=%s", endpoint.split('?')[0])
-        response = requests.get(url)
-        logger.info("API response status=%s for endpoint=%s", response.status_code, endpoint.split('?')[0])
+        started = time.perf_counter()
+        with span('upstream.visual_crossing') as s:
+            try:
+                response = self.session.get(url)
+            except requests.RequestException:
+                UPSTREAM_SECONDS.labels('visual_crossing', 'error').observe(time.perf_counter() - started)
+                raise
+            s.set(status=response.status_code, bytes=len(response.content))
+        UPSTREAM_SECONDS.labels('visual_crossing', str(response.status_code)).observe(
+            time.perf_counter() - started)
+        logger.info("Weather API status=%s for endpoint=%s in %.0fms", response.status_code,
+                    endpoint.split('?')[0], (time.perf_counter() - started) * 1000)
         response.raise_for_status()
-        return response.json()
+        with span('upstream.decode'):
+            return response.json()
@@ -0,0 +1,165 @@
+"""
+Static Asset Build CLI
+Minifies JS, fingerprints every static file with a hash of its contents and
+writes gzip and brotli variants of the text assets, so nginx can serve them
+precompressed with year-long immutable caching. Output goes to
+static/build/ with a manifest.json mapping source paths to fingerprinted
+ones; the app's asset_url() template helper reads it (see assets.manifest).
+Resized AVIF/WebP variants of the images are written alongside
+(assets.images) for the picture() helper.
+
+Run after Tailwind has written css/output.css.
+
+Usage (from src/):
+    python -m assets.build static
+    python -m assets.build static --no-minify --no-images
+"""
+
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+
+from assets.images import build_variants
+
+logger = logging.getLogger('weather-app.assets.build')
+
+BUILD_DIR = 'build'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+# Inputs that are never served (the Tailwind source compiles to css/output.css)
+SKIP = {'css/style.css'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map', '.html'}
+# Below this a compressed copy isn't worth a separate file
+MIN_COMPRESS_BYTES = 256
+
+
+def minify_js(source):
+    """Strip comments and whitespace; license (/*!) comments are kept"""
+    try:
+        import rjsmin
+    except ImportError:
+        raise RuntimeError("JS minification needs rjsmin (pip install rjsmin) or --no-minify")
+    return rjsmin.jsmin(source, keep_bang_comments=True)
+
+
+def fingerprint(relpath, content):
+    """css/output.css -> css/output.<hash>.css"""
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(relpath)
+    return f"{stem}.{digest}{ext}"
+
+
+def compressed_variants(content):
+    """
+    gzip and brotli encodings of content, each only if it is smaller
+
+    Returns:
+        dict: Suffix ('.gz', '.br') to bytes
+    """
+    variants = {}
+    # mtime=0 keeps the .gz bytes identical across builds of the same input
+    gz = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gz) < len(content):
+        variants['.gz'] = gz
+    try:
+        import brotli
+    except ImportError:
+        logger.warning("brotli not installed; skipping .br variants")
+        return variants
+    br = brotli.compress(content, quality=11)
+    if len(br) < len(content):
+        variants['.br'] = br
+    return variants
+
+
+def iter_sources(static_dir):
+    """Relative paths of the files to build, skipping earlier build output"""
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != os.path.join(static_dir, BUILD_DIR))
+        for name in sorted(files):
+            relpath = os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+            if relpath not in SKIP and not name.startswith('.'):
+                yield relpath
+
+
+def build(static_dir, minify=True, images=True):
+    """
+    Build static_dir/build/ from the files under static_dir
+
+    Args:
+        static_dir (str): The Flask static folder
+        minify (bool): Minify JS
+        images (bool): Write responsive image variants
+
+    Returns:
+        dict: The manifest (source path -> fingerprinted path under build/)
+    """
+    out_dir = os.path.join(static_dir, BUILD_DIR)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+
+    manifest = {}
+    totals = {'source': 0, 'built': 0, 'gz': 0, 'br': 0}
+    for relpath in iter_sources(static_dir):
+        with open(os.path.join(static_dir, relpath), 'rb') as f:
+            content = f.read()
+        totals['source'] += len(content)
+        ext = os.path.splitext(relpath)[1].lower()
+        if minify and ext == '.js':
+            content = minify_js(content.decode('utf-8')).encode('utf-8')
+
+        hashed = fingerprint(relpath, content)
+        target = os.path.join(out_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+        totals['built'] += len(content)
+        manifest[relpath] = hashed
+
+        sizes = ''
+        if ext in COMPRESSIBLE and len(content) >= MIN_COMPRESS_BYTES:
+            for suffix, data in compressed_variants(content).items():
+                with open(target + suffix, 'wb') as f:
+                    f.write(data)
+                totals[suffix[1:]] += len(data)
+                sizes += f" {suffix[1:]}={len(data)}"
+        logger.info("%s -> %s (%d bytes%s)", relpath, hashed, len(content), sizes)
+
+    if images:
+        build_variants(static_dir, out_dir)
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info("Built %d assets into %s: %d -> %d bytes (gz %d, br %d for text assets)",
+                len(manifest), out_dir, totals['source'], totals['built'], totals['gz'], totals['br'])
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets")
+    parser.add_argument('static_dir', help="Static folder (src/static)")
+    parser.add_argument('--no-minify', action='store_true', help="Copy JS as is")
+    parser.add_argument('--no-images', action='store_true', help="Skip responsive image variants")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    if not os.path.isdir(args.static_dir):
+        logger.error("No such directory: %s", args.static_dir)
+        return 1
+    try:
+        build(args.static_dir, minify=not args.no_minify, images=not args.no_images)
+    except RuntimeError as e:
+        logger.error("%s", e)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Responsive Image Variants
+Resizes every PNG/JPEG under static/images/ to a few widths and encodes each
+as AVIF and WebP, plus one small PNG for browsers that take neither. Output
+goes to static/build/images/ with an images.json index that the picture()
+template helper turns into <picture>/srcset markup (see assets.manifest).
+
+Variant names hash the source bytes and the encoder settings, not the
+encoded output, so the app and proxy images agree on names even if an
+encoder isn't byte-for-byte reproducible. Runs offline with Pillow only.
+"""
+
+import os
+import io
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger('weather-app.assets.images')
+
+IMAGES_INDEX = 'images.json'
+IMAGE_DIR = 'images'
+RASTER_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# CSS widths run from a 40px chat avatar to the 90px header mascot; 288 covers that at 3x
+WIDTHS = (48, 96, 144, 192, 288)
+FALLBACK_WIDTH = 192
+
+# type attribute -> (Pillow format, extension, save options); listed in preference order
+FORMATS = (
+    ('image/avif', 'AVIF', 'avif', {'quality': 55, 'speed': 4}),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 6}),
+)
+FALLBACK_FORMAT = ('image/png', 'PNG', 'png', {'optimize': True})
+
+
+def _supported(pil_format):
+    from PIL import features
+    return features.check(pil_format.lower())
+
+
+def _resize(image, width):
+    from PIL import Image
+
+    size = (width, round(image.height * width / image.width))
+    if image.mode == 'RGBA':
+        # Premultiplied alpha keeps transparent pixels' colour out of the edges
+        return image.convert('RGBa').resize(size, Image.Resampling.LANCZOS).convert('RGBA')
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def _variant_name(relpath, source, width, ext, options):
+    settings = f"{width}:{ext}:{sorted(options.items())}".encode()
+    digest = hashlib.sha256(source + settings).hexdigest()[:12]
+    stem = os.path.splitext(relpath)[0]
+    return f"{stem}-{width}w.{digest}.{ext}"
+
+
+def _encode(image, pil_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(static_dir, out_dir):
+    """
+    Write resized AVIF/WebP/PNG variants of static/images/* into out_dir
+
+    Args:
+        static_dir (str): The Flask static folder
+        out_dir (str): The build folder (static/build)
+
+    Returns:
+        dict: The images.json index, keyed by source path; empty without Pillow
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow not installed; skipping responsive image variants")
+        return {}
+
+    formats = []
+    for fmt in FORMATS:
+        if _supported(fmt[1]):
+            formats.append(fmt)
+        else:
+            logger.warning("This Pillow build can't write %s; skipping those variants", fmt[1])
+
+    index = {}
+    image_root = os.path.join(static_dir, IMAGE_DIR)
+    if not os.path.isdir(image_root):
+        return index
+
+    for name in sorted(os.listdir(image_root)):
+        if os.path.splitext(name)[1].lower() not in RASTER_EXTENSIONS:
+            continue
+        relpath = f"{IMAGE_DIR}/{name}"
+        with open(os.path.join(static_dir, relpath), 'rb') as f:
+            source = f.read()
+        image = Image.open(io.BytesIO(source))
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        widths = [w for w in WIDTHS if w < image.width] or [image.width]
+        resized = {w: _resize(image, w) for w in widths}
+        entry = {'width': image.width, 'height': image.height, 'bytes': len(source), 'sources': {}}
+
+        def write(width, pil_format, ext, options, source_image):
+            hashed = _variant_name(relpath, source, width, ext, options)
+            data = _encode(source_image, pil_format, options)
+            target = os.path.join(out_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            return {'width': width, 'height': source_image.height, 'path': hashed, 'bytes': len(data)}
+
+        for type_, pil_format, ext, options in formats:
+            entry['sources'][type_] = [write(w, pil_format, ext, options, resized[w]) for w in widths]
+
+        fallback_width = min(FALLBACK_WIDTH, image.width)
+        fallback_image = resized.get(fallback_width) or _resize(image, fallback_width)
+        type_, pil_format, ext, options = FALLBACK_FORMAT
+        entry['fallback'] = write(fallback_width, pil_format, ext, options, fallback_image)
+        index[relpath] = entry
+
+        sizes = ', '.join(f"{t.split('/')[1]} {sum(v['bytes'] for v in vs) // len(vs)}B avg"
+                          for t, vs in entry['sources'].items())
+        logger.info("%s (%d bytes, %dx%d) -> %d widths: %s; fallback png %d bytes", relpath, len(source),
+                    image.width, image.height, len(widths), sizes, entry['fallback']['bytes'])
+
+    with open(os.path.join(out_dir, IMAGES_INDEX), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    return index
@@ -0,0 +1,115 @@
+"""
+Static Asset Manifest
+Resolves static paths to the fingerprinted files written by assets.build, so
+templates link to names that change whenever the content does and nginx can
+let browsers cache them for a year. Without a build (local development) the
+plain static path is used.
+
+picture() renders the responsive AVIF/WebP variants from assets.images as a
+<picture> element, lazy-loaded unless told the image is above the fold.
+
+In templates:
+    <link rel="stylesheet" href="{{ asset_url('css/output.css') }}">
+    {{ picture('images/mascot-polar-bear-shorts.png', 'Polar Wear', sizes='40px') }}
+"""
+
+import os
+import json
+import logging
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+from assets.build import BUILD_DIR, MANIFEST_NAME
+from assets.images import IMAGES_INDEX
+
+logger = logging.getLogger('weather-app.assets')
+
+
+class AssetManifest:
+    """Source path -> fingerprinted path, loaded from static/build/manifest.json"""
+
+    def __init__(self):
+        self.entries = {}
+        self.images = {}
+
+    def load(self, static_folder):
+        """
+        Read the manifest from a static folder
+
+        Returns:
+            bool: Whether a manifest was found
+        """
+        path = os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries, self.images = {}, {}
+            logger.info("No asset manifest at %s; serving unfingerprinted static files", path)
+            return False
+        try:
+            with open(os.path.join(static_folder, BUILD_DIR, IMAGES_INDEX), encoding='utf-8') as f:
+                self.images = json.load(f)
+        except FileNotFoundError:
+            self.images = {}
+        logger.info("Loaded %d fingerprinted assets and %d responsive images from %s",
+                    len(self.entries), len(self.images), path)
+        return True
+
+    def url(self, filename):
+        """URL of a static file, fingerprinted when the build has one for it"""
+        hashed = self.entries.get(filename)
+        if hashed:
+            return self._build_url(hashed)
+        return url_for('static', filename=filename)
+
+    def _build_url(self, path):
+        return url_for('static', filename=f"{BUILD_DIR}/{path}")
+
+    def picture(self, filename, alt, sizes, css_class=None, lazy=True):
+        """
+        <picture> markup for an image with AVIF/WebP candidates at each built width
+
+        Args:
+            filename: Source path under static/, e.g. 'images/mascot-polar-bear-shorts.png'
+            alt: Alt text
+            sizes: The sizes attribute, i.e. the CSS width the image is shown at ('90px')
+            css_class: Class for the <img>
+            lazy: Defer loading until the image nears the viewport; pass False above the fold
+
+        Returns:
+            Markup: A <picture>, or a plain <img> when the build has no variants
+        """
+        attrs = f' alt="{escape(alt)}"'
+        if css_class:
+            attrs += f' class="{escape(css_class)}"'
+        attrs += ' loading="lazy" decoding="async"' if lazy else ' decoding="async"'
+
+        variants = self.images.get(filename)
+        if not variants:
+            return Markup(f'<img src="{escape(self.url(filename))}"{attrs}>')
+
+        sources = ''.join(
+            f'<source type="{escape(type_)}" sizes="{escape(sizes)}" srcset="{escape(srcset)}">'
+            for type_, srcset in (
+                (type_, ', '.join(f"{self._build_url(v['path'])} {v['width']}w" for v in candidates))
+                for type_, candidates in variants['sources'].items()
+            )
+        )
+        fallback = variants['fallback']
+        # width/height give the aspect ratio, so the slot is reserved before the image arrives
+        return Markup(
+            f'<picture>{sources}<img src="{escape(self._build_url(fallback["path"]))}"'
+            f' width="{fallback["width"]}" height="{fallback["height"]}"{attrs}></picture>'
+        )
+
+    def init_app(self, app):
+        """Load the app's manifest and expose asset_url() and picture() to templates"""
+        self.load(app.static_folder)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.jinja_env.globals['picture'] = self.picture
+
+
+# Global asset manifest instance
+asset_manifest = AssetManifest()
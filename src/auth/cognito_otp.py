@@ -7,6 +7,8 @@ import os
 import boto3
 from botocore.exceptions import ClientError
 
+from auth.jwt_validator import CognitoTokenValidator, TokenValidationError
+
 
 class CognitoOTPAuth:
     """Handle Cognito authentication with OTP"""
@@ -21,6 +23,9 @@ class CognitoOTPAuth:
 
         self.client = boto3.client('cognito-idp', region_name=self.region)
 
+        # Verifies tokens locally; no Cognito round trip per request
+        self.validator = CognitoTokenValidator(self.region, self.user_pool_id, self.client_id)
+
     def sign_up(self, phone_number, password, name=None):
         """
         Sign up a new user with phone number
@@ -187,6 +192,48 @@ class CognitoOTPAuth:
                 'error_message': error_message
             }
 
+    def validate_token(self, token, token_use='access'):
+        """
+        Verify a Cognito token locally against the pool's cached JWKS
+
+        Args:
+            token (str): Access or ID token
+            token_use (str): 'access' or 'id'
+
+        Returns:
+            dict: Success status and verified claims
+        """
+        try:
+            return {
+                'success': True,
+                'claims': self.validator.validate(token, token_use)
+            }
+        except TokenValidationError as e:
+            return {
+                'success': False,
+                'error_code': 'InvalidToken',
+                'error_message': str(e)
+            }
+
+    def authenticate(self, session_user):
+        """
+        Resolve the signed-in user from the Flask session's user dict
+
+        Args:
+            session_user (dict): session['user'] as set at login
+
+        Returns:
+            dict: {'phone_number', 'sub'} or None if the tokens aren't valid
+        """
+        tokens = (session_user or {}).get('tokens') or {}
+        result = self.validate_token(tokens.get('access_token'))
+        if not result['success']:
+            return None
+        return {
+            'phone_number': session_user.get('phone_number'),
+            'sub': result['claims'].get('sub')
+        }
+
     def get_user_info(self, access_token):
         """
         Get user information from access token
@@ -0,0 +1,175 @@
+"""
+Cognito JWT Validation
+Verifies Cognito access and ID tokens locally against the user pool's JWKS,
+so checking a session doesn't need a round trip to Cognito. Keys are cached
+and refreshed periodically (or early when a token names an unknown key id),
+and decoded claims are kept in a small LRU until the token expires.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import jwt
+import requests
+
+logger = logging.getLogger('weather-app.auth.jwt')
+
+
+class TokenValidationError(Exception):
+    """Raised when a token is malformed, expired or not issued for this app"""
+
+
+class CognitoTokenValidator:
+    """Local RS256 verification of Cognito tokens"""
+
+    def __init__(self, region, user_pool_id, client_id, jwks_url=None,
+                 refresh_seconds=None, cache_size=None, leeway=None, fetch_jwks=None):
+        """
+        Args:
+            region (str): AWS region of the user pool
+            user_pool_id (str): Cognito user pool ID
+            client_id (str): App client ID tokens must be issued to
+            jwks_url (str, optional): Override the pool's JWKS URL
+            refresh_seconds (int, optional): Max age of the cached key set
+            cache_size (int, optional): Decoded-claims LRU size
+            leeway (int, optional): Allowed clock skew in seconds
+            fetch_jwks (callable, optional): url -> JWKS dict, replaces the HTTP fetch
+        """
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.client_id = client_id
+        self.jwks_url = jwks_url or f"{self.issuer}/.well-known/jwks.json"
+        self.refresh_seconds = refresh_seconds or int(os.getenv('JWKS_REFRESH_SECONDS', '3600'))
+        self.cache_size = cache_size or int(os.getenv('JWT_CLAIMS_CACHE_SIZE', '5000'))
+        self.leeway = leeway if leeway is not None else int(os.getenv('JWT_LEEWAY_SECONDS', '30'))
+        self._fetch_jwks = fetch_jwks or self._http_fetch_jwks
+
+        self._keys = {}
+        self._keys_loaded_at = None
+        # An unknown kid can't trigger more than one refetch per this interval
+        self._min_refetch_seconds = 60
+        self._keys_lock = threading.Lock()
+
+        self._claims = OrderedDict()
+        self._claims_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'jwks_fetches': 0, 'rejected': 0}
+
+    @staticmethod
+    def _http_fetch_jwks(url):
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def _load_keys(self):
+        jwks = self._fetch_jwks(self.jwks_url)
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk['kid']] = jwt.PyJWK(jwk).key
+            except (KeyError, jwt.exceptions.PyJWKError) as e:
+                logger.warning("Skipping unusable JWK %s: %s", jwk.get('kid'), e)
+        self._keys = keys
+        self._keys_loaded_at = time.monotonic()
+        self.stats['jwks_fetches'] += 1
+        logger.info("Loaded %d signing keys from %s", len(keys), self.jwks_url)
+
+    def _keys_age(self):
+        return None if self._keys_loaded_at is None else time.monotonic() - self._keys_loaded_at
+
+    def _signing_key(self, kid):
+        key = self._keys.get(kid)
+        age = self._keys_age()
+        if key is not None and age < self.refresh_seconds:
+            return key
+
+        # Stale set or unknown kid (key rotation); refetch at most once a minute
+        if age is None or age > self._min_refetch_seconds:
+            with self._keys_lock:
+                age = self._keys_age()
+                if age is None or age > self._min_refetch_seconds:
+                    try:
+                        self._load_keys()
+                    except Exception as e:
+                        # Keep serving with the keys we have if Cognito is unreachable
+                        if not self._keys:
+                            raise TokenValidationError(f"JWKS unavailable: {e}") from e
+                        logger.warning("JWKS refresh failed, keeping cached keys: %s", e)
+                        self._keys_loaded_at = time.monotonic()
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise TokenValidationError(f"Unknown signing key: {kid}")
+        return key
+
+    def _cached(self, token):
+        with self._claims_lock:
+            claims = self._claims.get(token)
+            if claims is None:
+                return None
+            if claims['exp'] + self.leeway <= time.time():
+                del self._claims[token]
+                return None
+            self._claims.move_to_end(token)
+            return claims
+
+    def _remember(self, token, claims):
+        with self._claims_lock:
+            self._claims[token] = claims
+            while len(self._claims) > self.cache_size:
+                self._claims.popitem(last=False)
+
+    def validate(self, token, token_use='access'):
+        """
+        Verify a token's signature, expiry, issuer, audience and token_use
+
+        Args:
+            token (str): Encoded JWT
+            token_use (str): 'access' or 'id'
+
+        Returns:
+            dict: Verified claims
+
+        Raises:
+            TokenValidationError: If the token is not valid for this app
+        """
+        if not token:
+            raise TokenValidationError("Missing token")
+
+        claims = self._cached(token)
+        if claims is not None and claims.get('token_use') == token_use:
+            self.stats['hits'] += 1
+            return claims
+        self.stats['misses'] += 1
+
+        try:
+            header = jwt.get_unverified_header(token)
+            key = self._signing_key(header.get('kid'))
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=['RS256'],
+                issuer=self.issuer,
+                # Access tokens carry client_id instead of aud; checked below
+                audience=self.client_id if token_use == 'id' else None,
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'iss', 'token_use'],
+                         'verify_aud': token_use == 'id'},
+            )
+        except jwt.PyJWTError as e:
+            self.stats['rejected'] += 1
+            raise TokenValidationError(str(e)) from e
+        except TokenValidationError:
+            self.stats['rejected'] += 1
+            raise
+
+        if claims.get('token_use') != token_use:
+            self.stats['rejected'] += 1
+            raise TokenValidationError(f"Expected a {token_use} token, got {claims.get('token_use')}")
+        if token_use == 'access' and claims.get('client_id') != self.client_id:
+            self.stats['rejected'] += 1
+            raise TokenValidationError("Token was issued to a different client")
+
+        self._remember(token, claims)
+        return claims
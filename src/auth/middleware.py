@@ -0,0 +1,51 @@
+"""
+Request Authentication Middleware
+Resolves the signed-in user once per API request into flask.g.user using the
+configured OTP provider (local JWT checks for Cognito, the shared session
+store for Twilio), and provides a login_required decorator for routes
+"""
+
+import logging
+from functools import wraps
+
+from flask import g, jsonify, request, session
+
+logger = logging.getLogger('weather-app.auth.middleware')
+
+
+class AuthMiddleware:
+    """before_request hook that sets g.user (None when not signed in)"""
+
+    def __init__(self, app=None, provider=None, path_prefixes=('/api/',)):
+        self.provider = provider
+        self.path_prefixes = tuple(path_prefixes)
+        if app is not None:
+            self.init_app(app, provider)
+
+    def init_app(self, app, provider=None):
+        if provider is not None:
+            self.provider = provider
+        app.before_request(self._load_user)
+
+    def _load_user(self):
+        g.user = None
+        # Pages and static files never need the check
+        if not request.path.startswith(self.path_prefixes):
+            return
+        session_user = session.get('user')
+        if not session_user or not self.provider:
+            return
+        try:
+            g.user = self.provider.authenticate(session_user)
+        except Exception as e:
+            logger.error("Session check failed: %s", e, exc_info=True)
+
+
+def login_required(view):
+    """Return 401 JSON unless the middleware resolved a user for this request"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not g.get('user'):
+            return jsonify({"error": "Login required"}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,112 @@
+"""
+OTP Send Limiter
+Sliding-window limits on verification code sends, shared across workers
+through the rate_events table: a short per-phone cool-down that suppresses
+duplicate sends, plus hourly caps per phone number and per client IP
+"""
+
+import os
+import logging
+
+from db.connection import db, sweep_expired
+
+logger = logging.getLogger('weather-app.auth.rate_limit')
+
+# Outcomes
+ALLOWED = 'allowed'
+COOLDOWN = 'cooldown'
+PHONE_LIMIT = 'phone_limit'
+IP_LIMIT = 'ip_limit'
+
+WINDOW_QUERY = '''
+    SELECT COUNT(*), COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at)), 0)
+    FROM rate_events
+    WHERE key = %s AND created_at > NOW() - make_interval(secs => %s)
+'''
+
+INSERT_QUERY = '''
+    INSERT INTO rate_events (key, expires_at)
+    VALUES (%s, NOW() + make_interval(secs => %s))
+    RETURNING id
+'''
+
+
+class SendLimiter:
+    """Check-and-record for code sends; one short transaction per attempt"""
+
+    def __init__(self, cooldown_seconds=None, per_phone_hour=None, per_ip_hour=None):
+        self.cooldown_seconds = cooldown_seconds or int(os.getenv('OTP_SEND_COOLDOWN_SECONDS', '30'))
+        self.per_phone_hour = per_phone_hour or int(os.getenv('OTP_SENDS_PER_PHONE_HOUR', '5'))
+        self.per_ip_hour = per_ip_hour or int(os.getenv('OTP_SENDS_PER_IP_HOUR', '20'))
+        self._attempts = 0
+
+    def _rules(self, phone_number, client_ip):
+        # (outcome, key, window seconds, max events in window); first violation wins
+        rules = [
+            (COOLDOWN, f"otp:phone:{phone_number}", self.cooldown_seconds, 1),
+            (PHONE_LIMIT, f"otp:phone:{phone_number}", 3600, self.per_phone_hour),
+        ]
+        if client_ip:
+            rules.append((IP_LIMIT, f"otp:ip:{client_ip}", 3600, self.per_ip_hour))
+        return rules
+
+    def hit(self, phone_number, client_ip):
+        """
+        Record a send attempt if every limit allows it
+
+        Args:
+            phone_number (str): Destination number
+            client_ip (str): Requesting client's IP
+
+        Returns:
+            dict: outcome (ALLOWED, COOLDOWN, PHONE_LIMIT or IP_LIMIT),
+                retry_after seconds, and event_ids to pass to release()
+        """
+        rules = self._rules(phone_number, client_ip)
+        keys = sorted({key for _, key, _, _ in rules})
+        try:
+            with db.get_connection() as conn:
+                cursor = conn.cursor()
+                # Serialize attempts on the same phone/IP across workers; sorted to avoid deadlocks
+                for key in keys:
+                    cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (key,))
+
+                for outcome, key, window, limit in rules:
+                    cursor.execute(WINDOW_QUERY, (key, window))
+                    count, oldest_age = cursor.fetchone()
+                    if count >= limit:
+                        return {
+                            'outcome': outcome,
+                            'retry_after': max(1, int(window - float(oldest_age)) + 1),
+                            'event_ids': [],
+                        }
+
+                event_ids = []
+                for key in keys:
+                    cursor.execute(INSERT_QUERY, (key, 3600))
+                    event_ids.append(cursor.fetchone()[0])
+        except Exception as e:
+            # Never lock people out of login because the limiter is down
+            logger.error("Send limiter unavailable, allowing send: %s", e)
+            return {'outcome': ALLOWED, 'retry_after': 0, 'event_ids': []}
+
+        self._attempts += 1
+        if self._attempts % 200 == 0:
+            try:
+                sweep_expired('rate_events')
+            except Exception as e:
+                logger.warning("Rate event sweep failed: %s", e)
+        return {'outcome': ALLOWED, 'retry_after': 0, 'event_ids': event_ids}
+
+    def release(self, event_ids):
+        """Forget recorded events for a send that was never dispatched"""
+        if not event_ids:
+            return
+        try:
+            db.execute_query('DELETE FROM rate_events WHERE id = ANY(%s)', (list(event_ids),))
+        except Exception as e:
+            logger.error("Failed to release rate events: %s", e)
+
+
+# Global send limiter instance
+send_limiter = SendLimiter()
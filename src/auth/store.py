@@ -0,0 +1,207 @@
+"""
+OTP and Session Stores
+Pluggable storage for pending SMS codes and login sessions. The Postgres
+store (default) is shared by every gunicorn worker and pod; the memory store
+keeps the old single-process behaviour for local development.
+
+Select with AUTH_STORE=postgres|memory.
+"""
+
+import os
+import time
+import hmac
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from db.connection import (
+    save_otp_code, get_otp_code, consume_otp_code,
+    create_user_session, get_user_session, delete_user_session, sweep_expired,
+)
+
+logger = logging.getLogger('weather-app.auth.store')
+
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', '600'))
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(24 * 3600)))
+
+# OTP check outcomes
+OTP_OK = 'ok'
+OTP_MISSING = 'missing'
+OTP_EXPIRED = 'expired'
+OTP_INVALID = 'invalid'
+
+
+def hash_code(phone_number, code):
+    """Codes are stored hashed so a table dump does not leak live codes"""
+    return hashlib.sha256(f"{phone_number}:{code}".encode('utf-8')).hexdigest()
+
+
+class MemoryAuthStore:
+    """Per-process dict store; codes sent by one worker can't be checked by another"""
+
+    def __init__(self):
+        self._otps = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.sweep_interval = float(os.getenv('AUTH_SWEEP_INTERVAL', '300'))
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        wall = time.time()
+        with self._lock:
+            for store in (self._otps, self._sessions):
+                for key in [k for k, v in store.items() if v[-1] <= wall]:
+                    del store[key]
+
+    def save_otp(self, phone_number, code, ttl_seconds=OTP_TTL_SECONDS):
+        self._maybe_sweep()
+        with self._lock:
+            self._otps[phone_number] = (hash_code(phone_number, code), time.time() + ttl_seconds)
+
+    def check_otp(self, phone_number, code):
+        with self._lock:
+            stored = self._otps.get(phone_number)
+            if not stored:
+                return OTP_MISSING
+            code_hash, expires_at = stored
+            if time.time() > expires_at:
+                del self._otps[phone_number]
+                return OTP_EXPIRED
+            if not hmac.compare_digest(code_hash, hash_code(phone_number, code)):
+                return OTP_INVALID
+            del self._otps[phone_number]
+            return OTP_OK
+
+    def create_session(self, phone_number, session_token, ttl_seconds=SESSION_TTL_SECONDS):
+        self._maybe_sweep()
+        with self._lock:
+            self._sessions[session_token] = (phone_number, time.time() + ttl_seconds)
+
+    def get_session(self, session_token):
+        with self._lock:
+            stored = self._sessions.get(session_token)
+            if not stored:
+                return None
+            if time.time() > stored[1]:
+                del self._sessions[session_token]
+                return None
+            return {'phone_number': stored[0]}
+
+    def delete_session(self, session_token):
+        with self._lock:
+            self._sessions.pop(session_token, None)
+
+
+class PostgresAuthStore:
+    """
+    Store backed by otp_codes, users and user_sessions
+
+    Session lookups go through a small LRU read-through cache; an entry lives
+    for at most cache_seconds (and never past the session's expiry), which
+    bounds how long a logout on another worker can go unnoticed here. A
+    per-process thread sweeps expired rows in batches.
+    """
+
+    def __init__(self, cache_seconds=None, cache_size=None, sweep_interval=None):
+        self.cache_seconds = cache_seconds or float(os.getenv('AUTH_SESSION_CACHE_SECONDS', '30'))
+        self.cache_size = cache_size or int(os.getenv('AUTH_SESSION_CACHE_SIZE', '10000'))
+        self.sweep_interval = sweep_interval or float(os.getenv('AUTH_SWEEP_INTERVAL', '300'))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        # The sweeper thread is per process; start it after gunicorn forks
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._cache = OrderedDict()
+            threading.Thread(target=self._run, name='auth-sweeper', daemon=True).start()
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def sweep(self):
+        """Delete expired codes and sessions; safe to run from every worker"""
+        for table in ('otp_codes', 'user_sessions'):
+            try:
+                deleted = sweep_expired(table)
+                if deleted:
+                    logger.info("Swept %d expired rows from %s", deleted, table)
+            except Exception as e:
+                logger.warning("Sweep of %s failed: %s", table, e)
+        now = time.monotonic()
+        with self._lock:
+            for token in [t for t, (_, until) in self._cache.items() if until <= now]:
+                del self._cache[token]
+
+    def save_otp(self, phone_number, code, ttl_seconds=OTP_TTL_SECONDS):
+        self._ensure_started()
+        save_otp_code(phone_number, hash_code(phone_number, code), ttl_seconds)
+
+    def check_otp(self, phone_number, code):
+        stored = get_otp_code(phone_number)
+        if not stored:
+            return OTP_MISSING
+        if stored['expired']:
+            consume_otp_code(phone_number)
+            return OTP_EXPIRED
+        code_hash = hash_code(phone_number, code)
+        if not hmac.compare_digest(stored['code_hash'], code_hash):
+            return OTP_INVALID
+        # The conditional delete makes a code single-use across workers
+        return OTP_OK if consume_otp_code(phone_number, code_hash) else OTP_MISSING
+
+    def create_session(self, phone_number, session_token, ttl_seconds=SESSION_TTL_SECONDS):
+        self._ensure_started()
+        create_user_session(phone_number, session_token, ttl_seconds)
+        self._remember(session_token, phone_number, ttl_seconds)
+
+    def _remember(self, session_token, phone_number, ttl_seconds):
+        until = time.monotonic() + min(self.cache_seconds, ttl_seconds)
+        with self._lock:
+            self._cache[session_token] = (phone_number, until)
+            self._cache.move_to_end(session_token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_session(self, session_token):
+        self._ensure_started()
+        with self._lock:
+            cached = self._cache.get(session_token)
+            if cached and cached[1] > time.monotonic():
+                self._cache.move_to_end(session_token)
+                return {'phone_number': cached[0]}
+
+        row = get_user_session(session_token)
+        if not row:
+            with self._lock:
+                self._cache.pop(session_token, None)
+            return None
+        self._remember(session_token, row['phone_number'], float(row['ttl_seconds']))
+        return {'phone_number': row['phone_number']}
+
+    def delete_session(self, session_token):
+        with self._lock:
+            self._cache.pop(session_token, None)
+        delete_user_session(session_token)
+
+
+def create_auth_store(kind=None):
+    """Build the store named by AUTH_STORE (default postgres)"""
+    kind = (kind or os.getenv('AUTH_STORE', 'postgres')).lower()
+    if kind == 'postgres':
+        return PostgresAuthStore()
+    if kind == 'memory':
+        return MemoryAuthStore()
+    raise ValueError(f"Invalid AUTH_STORE: {kind}. Must be 'postgres' or 'memory'")
@@ -4,16 +4,31 @@ Handles phone number authentication with SMS OTP verification using Twilio
 """
 
 import os
+import re
 import secrets
-from datetime import datetime, timedelta
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+
+from auth.store import create_auth_store, OTP_OK, OTP_MISSING, OTP_EXPIRED
+
+
+class RedirectingHttpClient(TwilioHttpClient):
+    """Sends every Twilio API call to base_url (a local stand-in for load tests)"""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        url = re.sub(r'^https://[\w.-]+\.twilio\.com', self.base_url, url)
+        return super().request(method, url, *args, **kwargs)
 
 
 class TwilioOTPAuth:
     """Handle OTP authentication using Twilio"""
 
-    def __init__(self):
+    def __init__(self, store=None):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.from_number = os.getenv('TWILIO_PHONE_NUMBER')
@@ -22,16 +37,16 @@ class TwilioOTPAuth:
         if not all([self.account_sid, self.auth_token]):
             raise ValueError("TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN must be set")
 
-        self.client = Client(self.account_sid, self.auth_token)
+        # TWILIO_BASE_URL points the client at a stand-in (benchmarks/stubs/twilio_stub.py)
+        base_url = os.getenv('TWILIO_BASE_URL')
+        http_client = RedirectingHttpClient(base_url) if base_url else None
+        self.client = Client(self.account_sid, self.auth_token, http_client=http_client)
 
         # Use Twilio Verify if service SID is provided, otherwise use SMS
         self.use_verify = bool(self.verify_service_sid)
 
-        # In-memory OTP storage (in production, use Redis or database)
-        self.otp_store = {}
-
-        # Session storage (in production, use database)
-        self.sessions = {}
+        # Pending codes and sessions, shared across workers (see auth.store)
+        self.store = store or create_auth_store()
 
     def _generate_otp(self):
         """Generate a 6-digit OTP"""
@@ -75,10 +90,7 @@ class TwilioOTPAuth:
             if verification_check.status == 'approved':
                 # Create session token
                 session_token = self._generate_session_token()
-                self.sessions[session_token] = {
-                    'phone_number': phone_number,
-                    'expires_at': datetime.now() + timedelta(hours=24)
-                }
+                self.store.create_session(phone_number, session_token)
 
                 return {
                     'success': True,
@@ -105,10 +117,7 @@ class TwilioOTPAuth:
             otp = self._generate_otp()
 
             # Store OTP with expiration
-            self.otp_store[phone_number] = {
-                'code': otp,
-                'expires_at': datetime.now() + timedelta(minutes=10)
-            }
+            self.store.save_otp(phone_number, otp)
 
             # Send SMS
             message = self.client.messages.create(
@@ -132,37 +141,29 @@ class TwilioOTPAuth:
 
     def verify_otp_sms(self, phone_number, code):
         """Verify OTP sent via SMS"""
-        stored = self.otp_store.get(phone_number)
+        # Checks expiry and the code, and consumes it on success
+        outcome = self.store.check_otp(phone_number, code)
 
-        if not stored:
+        if outcome == OTP_MISSING:
             return {
                 'success': False,
                 'error_message': 'No verification code found for this number'
             }
 
-        # Check expiration
-        if datetime.now() > stored['expires_at']:
-            del self.otp_store[phone_number]
+        if outcome == OTP_EXPIRED:
             return {
                 'success': False,
                 'error_message': 'Verification code expired'
             }
 
-        # Check code
-        if stored['code'] != code:
+        if outcome != OTP_OK:
             return {
                 'success': False,
                 'error_message': 'Invalid verification code'
             }
 
-        # Success - remove OTP and create session
-        del self.otp_store[phone_number]
-
         session_token = self._generate_session_token()
-        self.sessions[session_token] = {
-            'phone_number': phone_number,
-            'expires_at': datetime.now() + timedelta(hours=24)
-        }
+        self.store.create_session(phone_number, session_token)
 
         return {
             'success': True,
@@ -191,20 +192,13 @@ class TwilioOTPAuth:
 
     def get_session(self, session_token):
         """Get session information"""
-        session = self.sessions.get(session_token)
+        # Expired sessions are filtered out by the store
+        session = self.store.get_session(session_token)
 
         if not session:
             return {
                 'success': False,
-                'error_message': 'Invalid session token'
-            }
-
-        # Check expiration
-        if datetime.now() > session['expires_at']:
-            del self.sessions[session_token]
-            return {
-                'success': False,
-                'error_message': 'Session expired'
+                'error_message': 'Invalid or expired session token'
             }
 
         return {
@@ -212,10 +206,25 @@ class TwilioOTPAuth:
             'phone_number': session['phone_number']
         }
 
+    def authenticate(self, session_user):
+        """
+        Resolve the signed-in user from the Flask session's user dict
+
+        Args:
+            session_user (dict): session['user'] as set at login
+
+        Returns:
+            dict: {'phone_number'} or None if the session is gone or expired
+        """
+        session_token = (session_user or {}).get('session_token')
+        if not session_token:
+            return None
+        result = self.get_session(session_token)
+        return {'phone_number': result['phone_number']} if result['success'] else None
+
     def invalidate_session(self, session_token):
         """Invalidate a session (logout)"""
-        if session_token in self.sessions:
-            del self.sessions[session_token]
+        self.store.delete_session(session_token)
 
         return {
             'success': True,
@@ -0,0 +1,97 @@
+"""
+Precomputed Outfit Guidance
+Maps an hourly forecast entry to a coarse weather bucket and serves the
+guidance the nightly batch job generated for that bucket
+"""
+
+import os
+import time
+import logging
+import threading
+
+from db.connection import get_outfit_guidance
+
+logger = logging.getLogger('weather-app.chat.guidance')
+
+TEMP_BAND_F = 10
+WINDY_MPH = 15
+WET_PRECIP_PROB = 40
+WET_PRECIP_IN = 0.02
+HIGH_UV = 6
+
+
+def weather_bucket(entry):
+    """
+    Coarse bucket key for a forecast entry, e.g. 't40|wet|windy|uvlow'
+
+    Args:
+        entry (dict): Hourly entry from get_hourly_data
+
+    Returns:
+        str: Bucket key, or None when the entry has no temperature
+    """
+    temp = entry.get('feelslike')
+    if temp is None:
+        temp = entry.get('temp')
+    if temp is None:
+        return None
+
+    band = int(max(-20, min(100, temp)) // TEMP_BAND_F * TEMP_BAND_F)
+    conditions = (entry.get('conditions') or '').lower()
+    wet = ((entry.get('precipprob') or 0) >= WET_PRECIP_PROB
+           or (entry.get('precip') or 0) >= WET_PRECIP_IN
+           or any(word in conditions for word in ('rain', 'snow', 'shower', 'drizzle', 'storm')))
+    windy = (entry.get('windspeed') or 0) >= WINDY_MPH
+    high_uv = (entry.get('uvindex') or 0) >= HIGH_UV
+
+    return f"t{band}|{'wet' if wet else 'dry'}|{'windy' if windy else 'calm'}|{'uvhigh' if high_uv else 'uvlow'}"
+
+
+def describe_bucket(bucket):
+    """Plain-English description of a bucket key for prompts"""
+    band, wet, windy, uv = bucket.split('|')
+    low = int(band[1:])
+    return (f"feels-like temperature {low}-{low + TEMP_BAND_F - 1}°F, "
+            f"{'rain or snow likely' if wet == 'wet' else 'dry'}, "
+            f"{'windy (15+ mph)' if windy == 'windy' else 'light wind'}, "
+            f"{'high UV' if uv == 'uvhigh' else 'low to moderate UV'}")
+
+
+class GuidanceStore:
+    """In-memory copy of the outfit_guidance table, refreshed periodically"""
+
+    def __init__(self, refresh_seconds=None):
+        self.refresh_seconds = refresh_seconds or int(os.getenv('GUIDANCE_REFRESH_SECONDS', '3600'))
+        self._guidance = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+                return
+            try:
+                rows = get_outfit_guidance()
+                self._guidance = {row['bucket']: row['guidance'] for row in rows}
+                logger.info("Loaded outfit guidance for %d buckets", len(self._guidance))
+            except Exception as e:
+                logger.warning("Outfit guidance unavailable: %s", e)
+            # Retry a failed load on the next refresh cycle, not every request
+            self._loaded_at = now
+
+    def for_entry(self, entry):
+        """Guidance dict for a forecast entry's bucket, or None"""
+        if not entry:
+            return None
+        bucket = weather_bucket(entry)
+        if not bucket:
+            return None
+        self._refresh()
+        return self._guidance.get(bucket)
+
+
+# Global guidance store instance
+guidance_store = GuidanceStore()
@@ -0,0 +1,223 @@
+"""
+Polar Wear Chat History Manager
+Keeps the transcript sent to Claude under a token budget by collapsing older
+turns into a rolling summary
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('weather-app.chat.history')
+
+# Rough chars-per-token ratio for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Fixed per-message overhead (role markers, block framing)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Anthropic bills images by pixel area; a phone photo resized by the API lands near this
+IMAGE_TOKENS = 1600
+
+
+def _block_field(block, name, default=None):
+    """Read a field from a content block that may be a dict or an SDK object"""
+    if isinstance(block, dict):
+        return block.get(name, default)
+    return getattr(block, name, default)
+
+
+def estimate_tokens(content):
+    """Estimate the input tokens for a message content (string or block list)"""
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+
+    total = 0
+    for block in content:
+        block_type = _block_field(block, 'type')
+        if block_type == 'text':
+            total += len(_block_field(block, 'text', '')) // CHARS_PER_TOKEN + 1
+        elif block_type == 'tool_use':
+            total += len(json.dumps(_block_field(block, 'input', {}))) // CHARS_PER_TOKEN + 8
+        elif block_type == 'tool_result':
+            total += estimate_tokens(_block_field(block, 'content', '')) + 4
+        elif block_type == 'image':
+            total += IMAGE_TOKENS
+        elif block_type in ('thinking', 'redacted_thinking'):
+            total += len(_block_field(block, 'thinking', '') or '') // CHARS_PER_TOKEN + 1
+    return total
+
+
+def message_tokens(message):
+    """Estimate the input tokens for one message"""
+    return estimate_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS
+
+
+def message_text(message):
+    """Flatten a message into plain text for summarizing"""
+    content = message.get('content')
+    if isinstance(content, str):
+        return content
+
+    parts = []
+    for block in content or []:
+        block_type = _block_field(block, 'type')
+        if block_type == 'text':
+            parts.append(_block_field(block, 'text', ''))
+        elif block_type == 'tool_use':
+            parts.append(f"[looked up {_block_field(block, 'name', 'tool')} {json.dumps(_block_field(block, 'input', {}))}]")
+        elif block_type == 'tool_result':
+            result = _block_field(block, 'content', '')
+            parts.append(f"[tool result {result if isinstance(result, str) else message_text({'content': result})}]")
+    return " ".join(p for p in parts if p)
+
+
+def _has_tool_result(message):
+    content = message.get('content')
+    if isinstance(content, str):
+        return False
+    return any(_block_field(b, 'type') == 'tool_result' for b in content or [])
+
+
+def _starts_turn(message):
+    return message.get('role') == 'user' and not _has_tool_result(message)
+
+
+def extractive_summarizer(previous_summary, messages, max_chars=240):
+    """
+    Default summarizer: extend the previous summary with the first sentence of
+    each newly collapsed message. Cheap, deterministic and network free.
+
+    Args:
+        previous_summary (str): Summary of the turns collapsed so far
+        messages (list): Newly collapsed messages, oldest first
+        max_chars (int): Cap on the text kept per message
+
+    Returns:
+        str: The extended summary
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        text = " ".join(message_text(message).split())
+        if not text:
+            continue
+        sentence = text.split('. ', 1)[0]
+        if len(sentence) > max_chars:
+            sentence = sentence[:max_chars].rstrip() + '…'
+        speaker = 'User' if message.get('role') == 'user' else 'Polar Wear'
+        lines.append(f"- {speaker}: {sentence}")
+    return "\n".join(lines)
+
+
+class ChatHistoryManager:
+    """Enforce a token budget on the chat transcript sent to Claude"""
+
+    def __init__(self, token_budget=None, keep_recent=None, summarizer=None,
+                 summary_token_cap=None, cache_size=256):
+        self.token_budget = token_budget or int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '6000'))
+        self.keep_recent = keep_recent or int(os.getenv('CHAT_HISTORY_KEEP_RECENT', '6'))
+        self.summary_token_cap = summary_token_cap or int(os.getenv('CHAT_SUMMARY_TOKEN_CAP', '600'))
+        self.summarizer = summarizer or extractive_summarizer
+
+        # Rolling summaries keyed by a digest of the collapsed prefix, so each
+        # turn only summarizes the messages that were newly pushed out
+        self._summaries = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _prefix_digests(self, messages):
+        """Chained digests: digests[i] identifies messages[:i + 1]"""
+        digests = []
+        running = hashlib.sha1()
+        for message in messages:
+            running.update(message.get('role', '').encode())
+            running.update(message_text(message).encode())
+            digests.append(running.hexdigest())
+        return digests
+
+    def _cached_summary(self, digests, upto):
+        """Find the longest cached summary for a prefix of messages[:upto]"""
+        with self._lock:
+            for i in range(upto - 1, -1, -1):
+                summary = self._summaries.get(digests[i])
+                if summary is not None:
+                    self._summaries.move_to_end(digests[i])
+                    return i + 1, summary
+        return 0, ''
+
+    def _store_summary(self, digest, summary):
+        with self._lock:
+            self._summaries[digest] = summary
+            self._summaries.move_to_end(digest)
+            while len(self._summaries) > self._cache_size:
+                self._summaries.popitem(last=False)
+
+    def _split_point(self, messages, system_tokens):
+        """Index of the first message to keep verbatim"""
+        total = system_tokens + self.summary_token_cap
+        split = len(messages)
+
+        # Walk backwards, always keeping the newest turns
+        for i in range(len(messages) - 1, -1, -1):
+            cost = message_tokens(messages[i])
+            kept = len(messages) - i
+            if kept > self.keep_recent and total + cost > self.token_budget:
+                break
+            total += cost
+            split = i
+
+        # The kept transcript has to start with a user text turn (never a
+        # tool_result, which would orphan it from its tool_use). Landing inside
+        # the in-flight tool loop moves back to the question that opened it, so
+        # the latest question is never summarized away.
+        turn_starts = [i for i, m in enumerate(messages) if _starts_turn(m)]
+        if not turn_starts:
+            return 0
+        return next((i for i in turn_starts if i >= split), turn_starts[-1])
+
+    def compact(self, system_prompt, messages):
+        """
+        Fit the system prompt and messages into the token budget
+
+        Args:
+            system_prompt (str): System prompt for the request
+            messages (list): Full message list, oldest first
+
+        Returns:
+            tuple: (system_prompt, messages) to send to the API
+        """
+        system_tokens = estimate_tokens(system_prompt)
+        total = system_tokens + sum(message_tokens(m) for m in messages)
+        if total <= self.token_budget:
+            return system_prompt, messages
+
+        split = self._split_point(messages, system_tokens)
+        if split == 0:
+            return system_prompt, messages
+
+        collapsed = messages[:split]
+        digests = self._prefix_digests(collapsed)
+        start, summary = self._cached_summary(digests, split)
+        if start < split:
+            summary = self.summarizer(summary, collapsed[start:])
+            max_chars = self.summary_token_cap * CHARS_PER_TOKEN
+            if len(summary) > max_chars:
+                # Drop the oldest lines first; recent context matters more
+                summary = summary[-max_chars:].split("\n", 1)[-1]
+            self._store_summary(digests[-1], summary)
+
+        logger.info("Chat history compacted: collapsed=%d kept=%d est_tokens_before=%d",
+                    split, len(messages) - split, total)
+
+        compacted_system = (
+            f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+            if summary else system_prompt
+        )
+        return compacted_system, messages[split:]
+
+
+# Global history manager instance
+history_manager = ChatHistoryManager()
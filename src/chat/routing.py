@@ -0,0 +1,240 @@
+"""
+Polar Wear Model Router
+Picks the model and thinking settings for each chat turn from request
+features, falls back on errors or timeouts, and records per-model latency
+and token usage so the policy can be tuned. Every attempt, failed or not, also
+gets a usage ledger row.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from db.usage import usage_ledger
+from utils.lazy import lazy_import
+
+anthropic = lazy_import('anthropic')
+
+logger = logging.getLogger('weather-app.chat.routing')
+
+DEFAULT_POLICY = {
+    'tiers': {
+        'fast': {
+            'model': 'claude-haiku-4-5',
+            'max_tokens': 1024,
+            'thinking': None,
+            'timeout': 20,
+            'fallback': 'standard',
+        },
+        'standard': {
+            'model': 'claude-sonnet-4-5',
+            'max_tokens': 2048,
+            'thinking': None,
+            'timeout': 30,
+            'fallback': 'deep',
+        },
+        'deep': {
+            'model': 'claude-opus-4-7',
+            'max_tokens': 2048,
+            'thinking': {'type': 'adaptive'},
+            'timeout': 45,
+            'fallback': 'standard',
+        },
+    },
+    # Short, tool-free follow-ups go to the fast tier
+    'fast_max_chars': 80,
+    'fast_max_depth': 12,
+    # Long or open-ended questions, or long conversations, get the deep tier
+    'deep_min_chars': 280,
+    'deep_min_depth': 16,
+    'default_tier': 'standard',
+}
+
+TOOL_HINTS = re.compile(
+    r"\b(tonight|tomorrow|later|morning|afternoon|evening|weekend|hours?|forecast|"
+    r"\d{1,2}\s*(am|pm)|fabric|material|merino|wool|cotton|gear|running|hiking|cycling|ski)\b"
+)
+COMPLEX_HINTS = re.compile(
+    r"\b(why|explain|compare|versus|vs|plan|trip|pack(ing)?|itinerary|trade-?offs?|pros and cons)\b"
+)
+
+def _retryable_errors():
+    """Errors worth retrying on a different model (resolved late; the SDK imports lazily)"""
+    return (anthropic.APITimeoutError, anthropic.APIConnectionError, anthropic.RateLimitError,
+            anthropic.InternalServerError)
+
+
+def extract_features(history):
+    """
+    Routing features for a chat request
+
+    Args:
+        history (list): Client message history, ending with the user's message
+
+    Returns:
+        dict: chars, depth, tools_likely, complex
+    """
+    last = history[-1].get('content') if history else ''
+    text = last if isinstance(last, str) else ''
+    lowered = text.lower()
+    return {
+        'chars': len(text),
+        'depth': sum(1 for m in history if m.get('role') == 'user'),
+        'tools_likely': bool(TOOL_HINTS.search(lowered)),
+        'complex': bool(COMPLEX_HINTS.search(lowered)) or text.count('?') > 1,
+    }
+
+
+class ModelRouter:
+    """Choose a model tier per chat turn and call it with fallback"""
+
+    def __init__(self, policy=None, sample_size=500):
+        self.policy = json.loads(json.dumps(DEFAULT_POLICY))
+        config_path = os.getenv('CHAT_ROUTING_CONFIG')
+        if config_path:
+            with open(config_path) as f:
+                self._merge(json.load(f))
+        if policy:
+            self._merge(policy)
+
+        self._stats = {}
+        self._sample_size = sample_size
+        self._lock = threading.Lock()
+
+    def _merge(self, overrides):
+        for key, value in overrides.items():
+            if key == 'tiers':
+                for tier, settings in value.items():
+                    self.policy['tiers'].setdefault(tier, {}).update(settings)
+            else:
+                self.policy[key] = value
+
+    def choose(self, features):
+        """Tier name for a request's features"""
+        p = self.policy
+        if features['complex'] or features['chars'] >= p['deep_min_chars'] \
+                or features['depth'] >= p['deep_min_depth']:
+            return 'deep'
+        if features['chars'] <= p['fast_max_chars'] and not features['tools_likely'] \
+                and features['depth'] <= p['fast_max_depth']:
+            return 'fast'
+        return p['default_tier']
+
+    def _request_args(self, tier):
+        settings = self.policy['tiers'][tier]
+        args = {
+            'model': settings['model'],
+            'max_tokens': settings['max_tokens'],
+            'timeout': settings.get('timeout'),
+        }
+        if settings.get('thinking'):
+            args['thinking'] = settings['thinking']
+        return args
+
+    def create(self, client, tier, usage_context=None, **kwargs):
+        """
+        Call messages.create on the tier's model, falling back on retryable errors
+
+        Args:
+            client: Anthropic client
+            tier (str): Tier from choose()
+            usage_context (dict, optional): usage_ledger.record() fields for each
+                attempt (endpoint, tool_turns, user_ref, ...); endpoint defaults to 'chat'
+            **kwargs: system, tools, messages, ...
+
+        Returns:
+            tuple: (response, tier actually used)
+        """
+        context = dict({'endpoint': 'chat'}, **(usage_context or {}))
+        tried = []
+        while tier and tier not in tried:
+            tried.append(tier)
+            args = self._request_args(tier)
+            start = time.perf_counter()
+            try:
+                response = client.messages.create(**args, **kwargs)
+            except Exception as e:
+                seconds = time.perf_counter() - start
+                self._record(args['model'], seconds, error=True)
+                usage_ledger.record(model=args['model'], usage=None, wall_seconds=seconds,
+                                    error=type(e).__name__, **context)
+                if not isinstance(e, _retryable_errors()):
+                    raise
+                fallback = self.policy['tiers'][tier].get('fallback')
+                # Thinking blocks are tied to the model that wrote them, so a
+                # tool loop with thinking can't switch models partway through
+                if fallback and _in_tool_loop(kwargs.get('messages')) and \
+                        (args.get('thinking') or self.policy['tiers'][fallback].get('thinking')):
+                    raise
+                logger.warning("Chat model %s failed (%s), falling back to tier=%s",
+                               args['model'], type(e).__name__, fallback)
+                if not fallback or fallback in tried:
+                    raise
+                tier = fallback
+                continue
+
+            seconds = time.perf_counter() - start
+            self._record(args['model'], seconds, usage=response.usage)
+            usage_ledger.record(model=response.model, usage=response.usage, wall_seconds=seconds, **context)
+            return response, tier
+
+        raise RuntimeError("No chat model tier available")
+
+    def _record(self, model, seconds, usage=None, error=False):
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                'calls': 0,
+                'errors': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'latencies': deque(maxlen=self._sample_size),
+            })
+            stats['calls'] += 1
+            # Failed calls count toward latency too; timeouts are the slow tail
+            stats['latencies'].append(seconds)
+            if error:
+                stats['errors'] += 1
+                return
+            if usage is not None:
+                stats['input_tokens'] += getattr(usage, 'input_tokens', 0) or 0
+                stats['output_tokens'] += getattr(usage, 'output_tokens', 0) or 0
+
+    def stats(self):
+        """Per-model call counts, token totals and latency percentiles"""
+        with self._lock:
+            snapshot = {model: dict(s, latencies=sorted(s['latencies'])) for model, s in self._stats.items()}
+
+        report = {}
+        for model, s in snapshot.items():
+            latencies = s.pop('latencies')
+            report[model] = {
+                **s,
+                'p50_seconds': _percentile(latencies, 0.5),
+                'p95_seconds': _percentile(latencies, 0.95),
+            }
+        return report
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+def _in_tool_loop(messages):
+    """True when the transcript ends with tool results awaiting a reply"""
+    if not messages:
+        return False
+    content = messages[-1].get('content')
+    return isinstance(content, list) and any(
+        (b.get('type') if isinstance(b, dict) else getattr(b, 'type', None)) == 'tool_result'
+        for b in content
+    )
+
+
+# Global model router instance
+model_router = ModelRouter()
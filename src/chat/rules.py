@@ -0,0 +1,306 @@
+"""
+Polar Wear Rules Engine
+Answers simple "jacket / umbrella / sunscreen / what to wear" questions straight
+from the forecast with configurable thresholds; everything else goes to Claude
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger('weather-app.chat.rules')
+
+DEFAULT_THRESHOLDS = {
+    # Effective temperature (°F, after wind chill) -> garment layers, warmest first
+    'layers': [
+        [75, "a t-shirt and shorts"],
+        [62, "a light long-sleeve shirt or tee"],
+        [50, "a light jacket or sweater"],
+        [35, "a warm jacket"],
+        [20, "an insulated coat, hat and gloves"],
+        [-100, "a heavy winter coat, hat, gloves and scarf"],
+    ],
+    'jacket_below_f': 62,
+    'wind_chill_max_temp_f': 50,
+    'wind_chill_min_wind_mph': 3,
+    'umbrella_precip_prob': 40,
+    'umbrella_precip_in': 0.02,
+    'sunscreen_uv': 3,
+    'high_uv': 8,
+    # Messages longer than this are likely nuanced enough for the LLM
+    'max_message_chars': 120,
+    'log_every': 50,
+}
+
+INTENT_PATTERNS = [
+    ('jacket', re.compile(r"\b(jacket|coat|sweater|hoodie|layers?|bundle up)\b")),
+    ('umbrella', re.compile(r"\b(umbrella|rain(ing|y)?|raincoat|wet|showers?|drizzle)\b")),
+    ('sunscreen', re.compile(r"\b(sunscreen|sunblock|uv|sunburn|sun hat)\b")),
+    ('what_to_wear', re.compile(r"\bwhat (should|do) i wear\b|\bhow should i dress\b")),
+]
+
+# Anything that needs judgement beyond thresholds goes to the LLM
+ESCALATE_PATTERN = re.compile(
+    r"\b(why|fabric|material|merino|cotton|wool|run(ning)?|hik(e|ing)|bik(e|ing)|cycl(e|ing)|ski(ing)?|"
+    r"outfit|closet|photo|suggest(ed|ion)?|instead|compare|versus|vs|which|recommend|brand|kid|dog)\b"
+)
+
+# Negated or qualified questions ("too warm for a coat?", "do I not need...")
+# invert the threshold answer, so they go to the LLM as well
+NEGATION_PATTERN = re.compile(
+    r"\b(too|not|no|never|without|skip|ditch|leave)\b|n['’]t\b"
+)
+
+NOW_PATTERN = re.compile(r"\bnow\b")
+TIME_PATTERN = re.compile(r"\b(?:at|by|around)?\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b")
+IN_HOURS_PATTERN = re.compile(r"\bin (\d{1,2}) hours?\b")
+PERIODS = {
+    'morning': (6, 12),
+    'afternoon': (12, 17),
+    'evening': (17, 21),
+    'tonight': (18, 24),
+    'night': (18, 24),
+}
+
+
+def wind_chill(temp_f, wind_mph):
+    """NWS wind chill formula"""
+    return (35.74 + 0.6215 * temp_f - 35.75 * wind_mph ** 0.16
+            + 0.4275 * temp_f * wind_mph ** 0.16)
+
+
+SECONDS_PER_HOUR = 3600
+
+
+def _hour_of(entry):
+    try:
+        return int(str(entry.get('datetime', '')).split(':', 1)[0])
+    except ValueError:
+        return None
+
+
+class RulesEngine:
+    """Classify chat messages and answer the simple intents from the forecast"""
+
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        config_path = os.getenv('CHAT_RULES_CONFIG')
+        if config_path:
+            with open(config_path) as f:
+                self.thresholds.update(json.load(f))
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+        self.stats = {'total': 0, 'hits': 0, 'by_intent': {}}
+        self._lock = threading.Lock()
+
+    # -- classification -----------------------------------------------------
+
+    def classify(self, message):
+        """
+        Intent for a chat message, or None when it should go to the LLM
+
+        Args:
+            message (str): Latest user message
+
+        Returns:
+            str: One of jacket, umbrella, sunscreen, what_to_wear, or None
+        """
+        text = message.lower().strip()
+        if not text or len(text) > self.thresholds['max_message_chars'] or text.count('?') > 1:
+            return None
+        if ESCALATE_PATTERN.search(text) or NEGATION_PATTERN.search(text):
+            return None
+
+        intents = [name for name, pattern in INTENT_PATTERNS if pattern.search(text)]
+        return intents[0] if len(intents) == 1 else None
+
+    def _local_hour(self, forecast, now=None):
+        """
+        The location's current local hour, as counted by forecast.at(0)
+
+        Entries carry local wall-clock 'datetime' and UTC 'datetimeEpoch', so
+        the first one gives the location's UTC offset.
+        """
+        if forecast.positional:
+            return _hour_of(forecast.entries[0])
+        first = forecast.hours[0]
+        local = _hour_of(forecast.by_hour[first])
+        if local is None:
+            return None
+        offset = local - first % 24
+        return (int(now if now is not None else time.time()) // SECONDS_PER_HOUR + offset) % 24
+
+    def select_hours(self, message, forecast, now=None):
+        """
+        Forecast entries the message is asking about, in order
+
+        Hours are resolved by epoch through HourlyForecast.at()/window(), like
+        the get_forecast tool, so both paths agree on which hour "6pm" is.
+
+        Args:
+            message (str): Latest user message
+            forecast (HourlyForecast): Forecast for the user's location
+            now (float, optional): Epoch seconds to resolve against
+        """
+        text = message.lower()
+        if not forecast:
+            return []
+        local = self._local_hour(forecast, now)
+        if local is None:
+            return forecast.window(0, 3, now)
+
+        tomorrow = 'tomorrow' in text
+        # Hours from now until local midnight, where tomorrow starts
+        to_midnight = 24 - local
+
+        match = IN_HOURS_PATTERN.search(text)
+        if match:
+            entry = forecast.at(int(match.group(1)), now)
+            return [entry] if entry else []
+
+        match = TIME_PATTERN.search(text)
+        if match:
+            hour = int(match.group(1)) % 12 + (12 if match.group(3) == 'pm' else 0)
+            # The next time the clock shows that hour, unless tomorrow's was asked for
+            ahead = to_midnight + hour if tomorrow else (hour - local) % 24
+            entry = forecast.at(ahead, now)
+            return [entry] if entry else []
+
+        for period, (start, end) in PERIODS.items():
+            if period in text:
+                if tomorrow or local >= end:
+                    return forecast.window(to_midnight + start, end - start, now)
+                begin = max(start, local)
+                return forecast.window(begin - local, end - begin, now)
+
+        if tomorrow:
+            return forecast.window(to_midnight + 7, 15, now)
+        if 'today' in text:
+            return forecast.window(0, to_midnight, now)
+        if NOW_PATTERN.search(text):
+            entry = forecast.at(0, now)
+            return [entry] if entry else []
+        # Default: the next few hours
+        return forecast.window(0, 3, now)
+
+    # -- answering ----------------------------------------------------------
+
+    def effective_temp(self, entry):
+        temp = entry.get('feelslike')
+        if temp is None:
+            temp = entry.get('temp')
+        wind = entry.get('windspeed') or 0
+        if temp is None:
+            return None
+        t = self.thresholds
+        if entry.get('temp') is not None and entry['temp'] <= t['wind_chill_max_temp_f'] \
+                and wind > t['wind_chill_min_wind_mph']:
+            return min(temp, wind_chill(entry['temp'], wind))
+        return temp
+
+    def layers_for(self, temp_f):
+        for threshold, garment in self.thresholds['layers']:
+            if temp_f >= threshold:
+                return garment
+        return self.thresholds['layers'][-1][1]
+
+    def _wet(self, entry):
+        t = self.thresholds
+        prob = entry.get('precipprob')
+        if prob is not None and prob >= t['umbrella_precip_prob']:
+            return True
+        if (entry.get('precip') or 0) >= t['umbrella_precip_in']:
+            return True
+        conditions = (entry.get('conditions') or '').lower()
+        return any(word in conditions for word in ('rain', 'shower', 'drizzle', 'storm'))
+
+    def _when(self, hours):
+        if len(hours) == 1:
+            return f"at {hours[0].get('datetime', '')[:5]}"
+        return f"between {hours[0].get('datetime', '')[:5]} and {hours[-1].get('datetime', '')[:5]}"
+
+    def _answer(self, intent, hours, guidance_lookup=None):
+        temps = [t for t in (self.effective_temp(e) for e in hours) if t is not None]
+        when = self._when(hours)
+
+        if intent == 'umbrella':
+            wet = [e for e in hours if self._wet(e)]
+            if wet:
+                return (f"Yes, bring an umbrella or rain jacket — expect {wet[0].get('conditions', 'rain').lower()} "
+                        f"around {wet[0].get('datetime', '')[:5]}.")
+            return f"No umbrella needed — it looks dry {when}."
+
+        if intent == 'sunscreen':
+            readings = [e['uvindex'] for e in hours if e.get('uvindex') is not None]
+            if not readings:
+                return None
+            uv = max(readings)
+            if uv >= self.thresholds['high_uv']:
+                return f"Definitely — UV peaks at {uv} {when}. Sunscreen, sunglasses and a hat, please!"
+            if uv >= self.thresholds['sunscreen_uv']:
+                return f"Yes, UV reaches {uv} {when}, so sunscreen is a good idea."
+            return f"UV stays low ({uv}) {when}, so sunscreen is optional."
+
+        if not temps:
+            return None
+        coldest = min(temps)
+        layers = self.layers_for(coldest)
+
+        if intent == 'jacket':
+            if coldest < self.thresholds['jacket_below_f']:
+                return f"Yes — it feels like {round(coldest)}°F {when}, so grab {layers}."
+            return f"No jacket needed — it feels like {round(coldest)}°F {when}. {layers[0].upper()}{layers[1:]} is plenty."
+
+        if intent == 'what_to_wear':
+            extra = " Bring an umbrella too." if any(self._wet(e) for e in hours) else ""
+            guidance = guidance_lookup(hours[0]) if guidance_lookup else None
+            if guidance and guidance.get('tips'):
+                extra += f" Tip: {guidance['tips'][0]}"
+            return f"It feels like {round(coldest)}°F {when}, so go with {layers}.{extra}"
+
+        return None
+
+    def answer(self, message, forecast, guidance_lookup=None, now=None):
+        """
+        Answer a chat message from the forecast if it is a simple intent
+
+        Args:
+            message (str): Latest user message
+            forecast (HourlyForecast): Forecast for the user's location, or None
+            guidance_lookup (callable, optional): Precomputed guidance for an entry
+            now (float, optional): Epoch seconds to resolve hours against
+
+        Returns:
+            str: The reply, or None to escalate to the LLM
+        """
+        intent = self.classify(message) if isinstance(message, str) else None
+        reply = None
+        if intent:
+            hours = self.select_hours(message, forecast, now)
+            if hours:
+                reply = self._answer(intent, hours, guidance_lookup)
+
+        self._record(intent if reply else None)
+        return reply
+
+    def _record(self, intent):
+        with self._lock:
+            self.stats['total'] += 1
+            if intent:
+                self.stats['hits'] += 1
+                self.stats['by_intent'][intent] = self.stats['by_intent'].get(intent, 0) + 1
+            total, hits = self.stats['total'], self.stats['hits']
+
+        if intent:
+            logger.info("Rules fast path answered intent=%s", intent)
+        if total % self.thresholds['log_every'] == 0:
+            logger.info("Rules fast path hit rate=%.1f%% hits=%d total=%d by_intent=%s",
+                        100.0 * hits / total, hits, total, self.stats['by_intent'])
+
+
+# Global rules engine instance
+rules_engine = RulesEngine()
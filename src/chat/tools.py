@@ -0,0 +1,192 @@
+"""
+Polar Wear Chat Tools
+Tool schemas, dispatch, and the per-request tool runner used by the chat loop
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db.connection import get_cached_data
+from knowledge.retriever import search_knowledge
+from utils.forecast import forecast_store
+
+logger = logging.getLogger('weather-app.chat.tools')
+
+
+CHAT_TOOLS = [
+    {
+        "name": "get_forecast",
+        "description": (
+            "Get the weather forecast for the user's saved location at a specific hour offset, "
+            "or a min/max/mean summary over a range of hours. "
+            "Use this when the user asks about conditions later today, tonight, or tomorrow."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "hours_ahead": {
+                    "type": "integer",
+                    "description": "Hours from now. 0 = right now, 3 = 3 hours from now, 24 = same time tomorrow.",
+                    "minimum": 0,
+                    "maximum": 72,
+                },
+                "range_hours": {
+                    "type": "integer",
+                    "description": (
+                        "Optional. Summarize this many hours starting at hours_ahead, "
+                        "e.g. hours_ahead=0, range_hours=6 for 'the next 6 hours'."
+                    ),
+                    "minimum": 1,
+                    "maximum": 72,
+                },
+            },
+            "required": ["hours_ahead"],
+        },
+    },
+    {
+        "name": "search_clothing_knowledge",
+        "description": (
+            "Semantic search over a knowledge base of clothing, fabrics, layering, and activity-specific gear. "
+            "Use for questions where basic rules aren't enough: fabric breathability, cold-weather running gear, "
+            "wet-weather layering, sport-specific recommendations, etc."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Natural-language question about clothing, fabrics, or gear.",
+                },
+                "top_k": {"type": "integer", "default": 3, "minimum": 1, "maximum": 5},
+            },
+            "required": ["query"],
+        },
+    },
+]
+
+
+def dispatch_chat_tool(name, tool_input, zipcode, forecast_loader=None):
+    """
+    Run a single chat tool
+
+    Args:
+        name (str): Tool name from the tool_use block
+        tool_input (dict): Tool input from the tool_use block
+        zipcode (str): Location the conversation is about
+        forecast_loader (callable, optional): Returns the HourlyForecast for
+            the location; defaults to the in-memory forecast store
+
+    Returns:
+        dict: JSON-serializable tool result
+    """
+    if name == "get_forecast":
+        hours_ahead = int(tool_input.get("hours_ahead", 0))
+        range_hours = tool_input.get("range_hours")
+        if forecast_loader:
+            forecast = forecast_loader()
+        else:
+            forecast = load_forecast(zipcode)
+        if not forecast:
+            return {"error": "No forecast data available. The user may need to refresh the page."}
+
+        if range_hours:
+            summary = forecast.summarize(hours_ahead, int(range_hours))
+            if summary:
+                return summary
+        else:
+            entry = forecast.at(hours_ahead)
+            if entry:
+                return entry
+        return {"error": f"The forecast only covers the next {forecast.horizon_hours} hours."}
+
+    if name == "search_clothing_knowledge":
+        query = tool_input.get("query", "")
+        if not query:
+            return {"error": "A query is required."}
+        return search_knowledge(query, tool_input.get("top_k", 3))
+
+    return {"error": f"Unknown tool: {name}"}
+
+
+def load_forecast(zipcode):
+    """HourlyForecast for a location, from memory or a single cache read"""
+    if not zipcode:
+        return None
+    return forecast_store.get(zipcode, lambda: get_cached_data(zipcode))
+
+
+# Shared pool for tool calls; bounded so one chat can't starve the worker
+_tool_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('CHAT_TOOL_WORKERS', '4')),
+    thread_name_prefix='chat-tool',
+)
+
+
+class ChatToolSession:
+    """Run the tool calls for one chat request with memoized inputs and outputs"""
+
+    def __init__(self, zipcode, executor=None):
+        self.zipcode = zipcode
+        self.executor = executor or _tool_executor
+        self._results = {}
+        self._forecast = None
+        self._forecast_loaded = False
+        self._lock = threading.Lock()
+        self._forecast_lock = threading.Lock()
+
+    def _load_forecast(self):
+        """Load the cached forecast at most once per session"""
+        with self._forecast_lock:
+            if not self._forecast_loaded:
+                self._forecast = load_forecast(self.zipcode)
+                self._forecast_loaded = True
+            return self._forecast
+
+    def _memo_key(self, name, tool_input):
+        return name, json.dumps(tool_input, sort_keys=True, default=str)
+
+    def call(self, name, tool_input):
+        """Run one tool, returning the memoized result for repeated inputs"""
+        key = self._memo_key(name, tool_input)
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+
+        try:
+            result = dispatch_chat_tool(name, tool_input, self.zipcode,
+                                        forecast_loader=self._load_forecast)
+        except Exception as e:
+            logger.error("Chat tool %s failed: %s", name, e, exc_info=True)
+            return {"error": f"Tool {name} failed."}
+
+        with self._lock:
+            self._results[key] = result
+        return result
+
+    def run(self, tool_uses):
+        """
+        Run the tool_use blocks from one model turn concurrently
+
+        Args:
+            tool_uses (list): tool_use content blocks, in response order
+
+        Returns:
+            list: tool_result content blocks in the same order
+        """
+        if len(tool_uses) == 1:
+            results = [self.call(tool_uses[0].name, tool_uses[0].input)]
+        else:
+            futures = [self.executor.submit(self.call, block.name, block.input) for block in tool_uses]
+            results = [future.result() for future in futures]
+
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": json.dumps(result),
+            }
+            for block, result in zip(tool_uses, results)
+        ]
@@ -1,16 +1,82 @@
 """
 PostgreSQL Database Connection Module
+
+With DB_POOL_SIZE > 0 connections are kept open per process and reused;
+callers beyond the pool size wait up to DB_POOL_TIMEOUT seconds for one to
+come back. Waiting goes through queue/threading primitives, so under the
+gevent worker (where they are patched) a waiting greenlet yields instead of
+blocking the worker. The pool defaults to 20 there and to off (a connection
+per call) under sync workers, which only ever need one.
 """
 
 import os
+import time
+import queue
 import logging
+import threading
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
 
+from utils.metrics import DB_CONNECT_SECONDS, DB_QUERY_SECONDS, FORECAST_CACHE_LOOKUPS
+from utils.tracing import span
+from utils.green import cooperative
+
 logger = logging.getLogger('weather-app.db')
 
 
+class PoolTimeout(psycopg2.OperationalError):
+    """No pooled connection came free within DB_POOL_TIMEOUT"""
+
+
+class ConnectionPool:
+    """Bounded per-process pool; idle connections are reused newest first"""
+
+    def __init__(self, connect, size, timeout, max_idle):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._slots = threading.BoundedSemaphore(size)
+        # (connection, returned_at); LIFO keeps the warm ones busy and lets the rest age out
+        self._idle = queue.LifoQueue()
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection free within {self.timeout}s (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    conn, returned_at = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not conn.closed and time.monotonic() - returned_at < self.max_idle:
+                    return conn
+                conn.close()
+            return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                conn.close()
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections (ones in use are closed when released)"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
 class DatabaseConnection:
     """PostgreSQL database connection handler"""
 
@@ -27,79 +93,78 @@ class DatabaseConnection:
         logger.info("Connecting to PostgreSQL at %s:%s db=%s user=%s",
                      self.db_config['host'], self.db_config['port'],
                      self.db_config['database'], self.db_config['user'])
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _connect(self):
+        if not cooperative():
+            return psycopg2.connect(**self.db_config)
+        # libpq ignores connect_timeout for the async connect the wait callback drives
+        import gevent
+        timeout = self.db_config['connect_timeout']
+        with gevent.Timeout(timeout, psycopg2.OperationalError(f"Connection timed out after {timeout}s")):
+            return psycopg2.connect(**self.db_config)
+
+    @property
+    def pool(self):
+        """This process's ConnectionPool, or None when pooling is off"""
+        if self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool_pid != os.getpid():
+                    size = int(os.getenv('DB_POOL_SIZE', '20' if cooperative() else '0'))
+                    self._pool = ConnectionPool(
+                        self._connect, size,
+                        timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+                        max_idle=float(os.getenv('DB_POOL_MAX_IDLE', '60')),
+                    ) if size > 0 else None
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def close_pool(self):
+        """Close this process's idle pooled connections (the master calls this before forking)"""
+        if self._pool_pid == os.getpid() and self._pool is not None:
+            self._pool.close()
 
     @contextmanager
     def get_connection(self):
         """Get a database connection (context manager)"""
-        conn = psycopg2.connect(**self.db_config)
+        pool = self.pool
+        started = time.perf_counter()
+        with span('db.connect'):
+            conn = pool.acquire() if pool else self._connect()
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - started)
+        # Anything short of a clean commit or rollback (a greenlet killed mid-query) isn't reusable
+        broken = True
         try:
             yield conn
             conn.commit()
+            broken = False
         except Exception as e:
-            conn.rollback()
+            try:
+                conn.rollback()
+                broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            except psycopg2.Error:
+                pass
             raise e
         finally:
-            conn.close()
-
-    def init_tables(self):
-        """Initialize database tables"""
-        logger.info("Creating tables if they don't exist")
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Weather cache table
-            logger.info("Creating hourly_cache table")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS hourly_cache (
-                    id SERIAL PRIMARY KEY,
-                    location VARCHAR(255) UNIQUE NOT NULL,
-                    data JSONB NOT NULL,
-                    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    phone_number VARCHAR(20) UNIQUE NOT NULL,
-                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # User sessions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                    session_token VARCHAR(255) UNIQUE NOT NULL,
-                    expires_at TIMESTAMP NOT NULL,
-                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Create indexes
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_hourly_cache_location
-                ON hourly_cache(location)
-            ''')
-
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_user_sessions_token
-                ON user_sessions(session_token)
-            ''')
+            if pool:
+                pool.release(conn, broken)
+            else:
+                conn.close()
 
     def execute_query(self, query, params=None, fetch=False):
         """Execute a query and optionally fetch results"""
         with self.get_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, params or ())
-
-            if fetch:
-                return cursor.fetchall()
-
-            return cursor.rowcount
+            started = time.perf_counter()
+            try:
+                cursor.execute(query, params or ())
+                if fetch:
+                    return cursor.fetchall()
+                return cursor.rowcount
+            finally:
+                DB_QUERY_SECONDS.observe(time.perf_counter() - started)
 
 
 # Global database instance
@@ -116,15 +181,20 @@ def get_cached_data(location):
         WHERE location = %s
     '''
 
-    result = db.execute_query(query, (location,), fetch=True)
+    with span('cache.read'):
+        result = db.execute_query(query, (location,), fetch=True)
 
     if result:
         data, timestamp = result[0]['data'], result[0]['timestamp']
 
         # Check if cache is less than 1 hour old
         if datetime.now() - timestamp < timedelta(hours=1):
+            FORECAST_CACHE_LOOKUPS.labels('hit').inc()
             return data
+        FORECAST_CACHE_LOOKUPS.labels('stale').inc()
+        return None
 
+    FORECAST_CACHE_LOOKUPS.labels('miss').inc()
     return None
 
 
@@ -142,4 +212,190 @@ def cache_data(location, data):
 
     # Use psycopg2's Json adapter for JSONB column
     params = (location, Json(data), datetime.now())
+    with span('cache.write', hours=len(data)):
+        db.execute_query(query, params)
+
+
+def save_job(job_id, queue_name, status, result=None, error=None):
+    """Insert or update background job state"""
+    from psycopg2.extras import Json
+
+    query = '''
+        INSERT INTO jobs (id, queue, status, result, error)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (id)
+        DO UPDATE SET status = EXCLUDED.status, result = EXCLUDED.result,
+                      error = EXCLUDED.error, updated_at = CURRENT_TIMESTAMP
+    '''
+
+    params = (job_id, queue_name, status, Json(result) if result is not None else None, error)
     db.execute_query(query, params)
+
+
+def get_job(job_id):
+    """Retrieve background job state"""
+    query = '''
+        SELECT id, status, result, error
+        FROM jobs
+        WHERE id = %s
+    '''
+
+    result = db.execute_query(query, (job_id,), fetch=True)
+    return dict(result[0]) if result else None
+
+
+def purge_jobs(max_age_hours=24):
+    """Delete finished job rows older than max_age_hours"""
+    query = '''
+        DELETE FROM jobs
+        WHERE updated_at < NOW() - make_interval(hours => %s)
+    '''
+
+    return db.execute_query(query, (max_age_hours,))
+
+
+def top_requested_locations(days=7, limit=50):
+    """Most requested locations over the last `days` days with their cached forecast"""
+    query = '''
+        SELECT r.location, SUM(r.hits) AS hits, c.data
+        FROM location_requests r
+        JOIN hourly_cache c ON c.location = r.location
+        WHERE r.day >= CURRENT_DATE - %s
+        GROUP BY r.location, c.data
+        ORDER BY hits DESC
+        LIMIT %s
+    '''
+
+    return db.execute_query(query, (days, limit), fetch=True)
+
+
+def get_outfit_guidance(max_age_days=None):
+    """All precomputed guidance rows, optionally only those newer than max_age_days"""
+    query = '''
+        SELECT bucket, guidance, model, updated_at
+        FROM outfit_guidance
+        WHERE %s IS NULL OR updated_at >= NOW() - make_interval(days => %s)
+    '''
+
+    return db.execute_query(query, (max_age_days, max_age_days), fetch=True)
+
+
+def save_outfit_guidance(rows):
+    """Upsert (bucket, guidance, model) rows"""
+    from psycopg2.extras import Json, execute_values
+
+    query = '''
+        INSERT INTO outfit_guidance (bucket, guidance, model)
+        VALUES %s
+        ON CONFLICT (bucket)
+        DO UPDATE SET guidance = EXCLUDED.guidance, model = EXCLUDED.model,
+                      updated_at = CURRENT_TIMESTAMP
+    '''
+
+    with db.get_connection() as conn:
+        execute_values(conn.cursor(), query, [(b, Json(g), m) for b, g, m in rows])
+
+
+def save_otp_code(phone_number, code_hash, ttl_seconds):
+    """Store (or replace) the pending code for a phone number"""
+    query = '''
+        INSERT INTO otp_codes (phone_number, code_hash, expires_at)
+        VALUES (%s, %s, NOW() + make_interval(secs => %s))
+        ON CONFLICT (phone_number)
+        DO UPDATE SET code_hash = EXCLUDED.code_hash, expires_at = EXCLUDED.expires_at,
+                      created_at = CURRENT_TIMESTAMP
+    '''
+
+    db.execute_query(query, (phone_number, code_hash, ttl_seconds))
+
+
+def get_otp_code(phone_number):
+    """Pending code for a phone number with an `expired` flag, or None"""
+    query = '''
+        SELECT code_hash, expires_at <= NOW() AS expired
+        FROM otp_codes
+        WHERE phone_number = %s
+    '''
+
+    result = db.execute_query(query, (phone_number,), fetch=True)
+    return dict(result[0]) if result else None
+
+
+def consume_otp_code(phone_number, code_hash=None):
+    """Delete a pending code; with code_hash, only if it still matches. Returns True if a row was deleted"""
+    query = '''
+        DELETE FROM otp_codes
+        WHERE phone_number = %s AND (%s IS NULL OR code_hash = %s)
+    '''
+
+    return db.execute_query(query, (phone_number, code_hash, code_hash)) > 0
+
+
+def create_user_session(phone_number, session_token, ttl_seconds):
+    """Upsert the user and insert a session row in one statement"""
+    query = '''
+        WITH u AS (
+            INSERT INTO users (phone_number)
+            VALUES (%s)
+            ON CONFLICT (phone_number) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+            RETURNING id
+        )
+        INSERT INTO user_sessions (user_id, session_token, expires_at)
+        SELECT id, %s, NOW() + make_interval(secs => %s) FROM u
+    '''
+
+    db.execute_query(query, (phone_number, session_token, ttl_seconds))
+
+
+def get_user_session(session_token):
+    """Live session for a token with its phone number and remaining seconds, or None"""
+    query = '''
+        SELECT u.phone_number, EXTRACT(EPOCH FROM s.expires_at - NOW()) AS ttl_seconds
+        FROM user_sessions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.session_token = %s AND s.expires_at > NOW()
+    '''
+
+    result = db.execute_query(query, (session_token,), fetch=True)
+    return dict(result[0]) if result else None
+
+
+def delete_user_session(session_token):
+    """Delete a session row"""
+    query = '''
+        DELETE FROM user_sessions
+        WHERE session_token = %s
+    '''
+
+    return db.execute_query(query, (session_token,))
+
+
+def sweep_expired(table, batch_size=1000, max_batches=50):
+    """
+    Delete expired rows from otp_codes, user_sessions or rate_events in small batches
+
+    Each batch is its own short transaction so the sweep never holds locks
+    on a large range of the table.
+
+    Returns:
+        int: Rows deleted
+    """
+    if table not in ('otp_codes', 'user_sessions', 'rate_events'):
+        raise ValueError(f"Unsupported table for sweep: {table}")
+
+    query = f'''
+        DELETE FROM {table}
+        WHERE ctid IN (
+            SELECT ctid FROM {table}
+            WHERE expires_at <= NOW()
+            LIMIT %s
+        )
+    '''
+
+    deleted = 0
+    for _ in range(max_batches):
+        count = db.execute_query(query, (batch_size,))
+        deleted += count
+        if count < batch_size:
+            break
+    return deleted
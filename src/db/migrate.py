@@ -0,0 +1,241 @@
+"""
+Schema Migration Runner
+Applies the numbered SQL files in db/migrations in order and records each
+version in schema_version. A session advisory lock makes sure only one
+process migrates at a time; the others skip (at startup) or wait (CLI).
+
+Migration files are NNNN_description.sql. Statements end with ';' at the end
+of a line. A file whose first line is '-- migrate: no-transaction' runs
+statement by statement outside a transaction, which CREATE/DROP INDEX
+CONCURRENTLY needs; an invalid index left by an interrupted concurrent build
+is dropped and rebuilt on the next run.
+
+Usage (from src/):
+    python -m db.migrate [--status] [--target N]
+"""
+
+import os
+import re
+import sys
+import logging
+import argparse
+from collections import namedtuple
+
+import psycopg2
+
+from db.connection import db
+
+logger = logging.getLogger('weather-app.db.migrate')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+LOCK_KEY = 'weather-app-schema'
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+# DDL must not queue behind a long transaction and block every query behind it
+DDL_LOCK_TIMEOUT = os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')
+
+CONCURRENT_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.I)
+FILE_NAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+Migration = namedtuple('Migration', ['version', 'name', 'statements', 'transactional'])
+
+
+def split_statements(sql):
+    """Split a migration file into statements, dropping comment lines"""
+    statements, current = [], []
+    for line in sql.splitlines():
+        if line.strip().startswith('--'):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if '\n'.join(current).strip():
+        raise ValueError("Migration has a statement without a terminating ';'")
+    return statements
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """All migrations in directory, ordered by version"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = FILE_NAME.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            sql = f.read()
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            statements=split_statements(sql),
+            transactional=not sql.lstrip().startswith(NO_TRANSACTION_MARKER),
+        ))
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+class MigrationRunner:
+    """Apply pending migrations under an advisory lock"""
+
+    def __init__(self, database=None, directory=MIGRATIONS_DIR):
+        self.database = database or db
+        self.migrations = load_migrations(directory)
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def applied_versions(self):
+        """Set of applied versions (empty for a database that has never migrated)"""
+        with self.database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT to_regclass('schema_version')")
+            if cursor.fetchone()[0] is None:
+                return set()
+            cursor.execute("SELECT version FROM schema_version")
+            return {row[0] for row in cursor.fetchall()}
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [m for m in self.migrations if m.version not in applied]
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.database.db_config)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        # Concurrent index builds on big tables outlast the app's 5s statement timeout
+        cursor.execute("SET statement_timeout = 0")
+        return conn, cursor
+
+    def _ensure_version_table(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("ALTER TABLE schema_version ADD COLUMN IF NOT EXISTS name VARCHAR(255)")
+
+    def _drop_invalid_index(self, cursor, index_name):
+        cursor.execute('''
+            SELECT 1 FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        ''', (index_name,))
+        if cursor.fetchone():
+            logger.warning("Dropping invalid index %s left by an interrupted build", index_name)
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    def _apply(self, cursor, migration):
+        logger.info("Applying migration %04d_%s (%d statements%s)", migration.version, migration.name,
+                    len(migration.statements), '' if migration.transactional else ', no transaction')
+        if migration.transactional:
+            cursor.execute("BEGIN")
+            try:
+                for statement in migration.statements:
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                               (migration.version, migration.name))
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            return
+
+        # Each statement must be idempotent (IF [NOT] EXISTS) so a failed run can be retried
+        for statement in migration.statements:
+            match = CONCURRENT_INDEX.match(statement)
+            if match:
+                self._drop_invalid_index(cursor, match.group(1))
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                       (migration.version, migration.name))
+
+    def run(self, target=None, wait=True):
+        """
+        Apply pending migrations up to target
+
+        Args:
+            target (int, optional): Stop after this version (default: latest)
+            wait (bool): Wait for another process's migration to finish;
+                if False, return immediately when the lock is taken
+
+        Returns:
+            list: Versions applied by this call, or None if the lock was busy
+        """
+        conn, cursor = self._connect()
+        try:
+            if wait:
+                cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", (LOCK_KEY,))
+            else:
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (LOCK_KEY,))
+                if not cursor.fetchone()[0]:
+                    logger.info("Another process is migrating; skipping")
+                    return None
+            try:
+                cursor.execute("SET lock_timeout = %s", (DDL_LOCK_TIMEOUT,))
+                self._ensure_version_table(cursor)
+                cursor.execute("SELECT version FROM schema_version")
+                done = {row[0] for row in cursor.fetchall()}
+
+                applied = []
+                for migration in self.migrations:
+                    if migration.version in done or (target is not None and migration.version > target):
+                        continue
+                    self._apply(cursor, migration)
+                    applied.append(migration.version)
+                return applied
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (LOCK_KEY,))
+        finally:
+            conn.close()
+
+
+def migrate_on_startup():
+    """
+    Boot-time schema check: one cheap query when the schema is current.
+
+    Pending migrations run here unless MIGRATE_ON_STARTUP=false (then run the
+    CLI, e.g. as a deploy Job). Workers that find another process migrating
+    carry on without waiting.
+    """
+    runner = MigrationRunner()
+    pending = runner.pending()
+    if not pending:
+        logger.info("Database schema is current (version %d)", runner.latest_version)
+        return
+    if os.getenv('MIGRATE_ON_STARTUP', 'true').lower() != 'true':
+        logger.warning("Database has %d pending migration(s); run python -m db.migrate", len(pending))
+        return
+    applied = runner.run(wait=False)
+    if applied:
+        logger.info("Applied migrations %s", applied)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument('--status', action='store_true', help="Show applied and pending versions and exit")
+    parser.add_argument('--target', type=int, help="Migrate up to this version")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    runner = MigrationRunner()
+    if args.status:
+        applied = runner.applied_versions()
+        for migration in runner.migrations:
+            state = 'applied' if migration.version in applied else 'pending'
+            print(f"{migration.version:04d}_{migration.name:40} {state}")
+        return 0
+
+    applied = runner.run(target=args.target)
+    logger.info("Applied %d migration(s): %s", len(applied), applied)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
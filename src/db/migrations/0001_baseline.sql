@@ -0,0 +1,110 @@
+-- Baseline: the schema init_tables() created on every boot (schema version 1).
+-- Every statement is idempotent so databases created before migrations existed
+-- can run it safely.
+
+-- Weather cache table
+CREATE TABLE IF NOT EXISTS hourly_cache (
+    id SERIAL PRIMARY KEY,
+    location VARCHAR(255) UNIQUE NOT NULL,
+    data JSONB NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    phone_number VARCHAR(20) UNIQUE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- User sessions table
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    session_token VARCHAR(255) UNIQUE NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Pending SMS one-time codes (Twilio provider without Verify)
+CREATE TABLE IF NOT EXISTS otp_codes (
+    phone_number VARCHAR(20) PRIMARY KEY,
+    code_hash VARCHAR(64) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Sliding-window rate limit events (OTP sends per phone and IP)
+CREATE TABLE IF NOT EXISTS rate_events (
+    id BIGSERIAL PRIMARY KEY,
+    key VARCHAR(128) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Background job state (fashion suggestions)
+CREATE TABLE IF NOT EXISTS jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    queue VARCHAR(64) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- LLM usage ledger (one row per Anthropic call, UTC timestamps)
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP NOT NULL,
+    endpoint VARCHAR(64) NOT NULL,
+    model VARCHAR(64) NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+    wall_ms INTEGER NOT NULL,
+    tool_turns INTEGER NOT NULL DEFAULT 0,
+    user_ref VARCHAR(64),
+    session_ref VARCHAR(255),
+    request_id VARCHAR(32)
+);
+
+-- Daily request counts per location (feeds batch precomputation)
+CREATE TABLE IF NOT EXISTS location_requests (
+    location VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (location, day)
+);
+
+-- Precomputed outfit guidance keyed by weather bucket
+CREATE TABLE IF NOT EXISTS outfit_guidance (
+    bucket VARCHAR(64) PRIMARY KEY,
+    guidance JSONB NOT NULL,
+    model VARCHAR(64),
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_hourly_cache_location
+ON hourly_cache(location);
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_token
+ON user_sessions(session_token);
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_expires
+ON user_sessions(expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_otp_codes_expires
+ON otp_codes(expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_rate_events_key_created
+ON rate_events(key, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_rate_events_expires
+ON rate_events(expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_llm_usage_endpoint_created
+ON llm_usage(endpoint, created_at);
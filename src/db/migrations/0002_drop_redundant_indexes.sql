@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- hourly_cache.location and user_sessions.session_token are UNIQUE, so each
+-- already has an index; the extra ones only doubled the write cost of every
+-- cache_data upsert and session insert.
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_hourly_cache_location;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_sessions_token;
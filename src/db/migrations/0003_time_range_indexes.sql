@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+-- Indexes for the time-range queries that otherwise scan whole tables:
+-- purge_jobs() deletes by updated_at, the usage summaries filter llm_usage by
+-- created_at alone, and top_requested_locations() filters by day.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_jobs_updated
+ON jobs(updated_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_llm_usage_created
+ON llm_usage(created_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_location_requests_day
+ON location_requests(day);
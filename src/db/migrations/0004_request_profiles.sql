@@ -0,0 +1,26 @@
+-- On-demand request profiling (utils/profiler.py): an armed session per
+-- route, and the collapsed stacks its sampled requests produced.
+
+CREATE TABLE IF NOT EXISTS profile_sessions (
+    id SERIAL PRIMARY KEY,
+    route VARCHAR(255) NOT NULL,
+    requested INTEGER NOT NULL,
+    remaining INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    interval_ms INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_profile_sessions_armed
+ON profile_sessions(route)
+WHERE remaining > 0;
+
+-- Stacks can be longer than a btree entry allows, so rows are keyed by their md5
+CREATE TABLE IF NOT EXISTS profile_samples (
+    session_id INTEGER NOT NULL REFERENCES profile_sessions(id) ON DELETE CASCADE,
+    stack_hash CHAR(32) NOT NULL,
+    stack TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (session_id, stack_hash)
+);
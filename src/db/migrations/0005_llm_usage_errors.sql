@@ -0,0 +1,4 @@
+-- Failed Anthropic calls get a ledger row too (zero tokens), tagged with the
+-- exception class, so latency and error figures include them.
+
+ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS error VARCHAR(64);
@@ -0,0 +1,74 @@
+"""
+Location Request Counter
+Counts /api/hourly-data requests per location in memory and folds them into
+the location_requests table periodically, so the hot path never writes
+"""
+
+import os
+import atexit
+import logging
+import threading
+from datetime import date
+
+from psycopg2.extras import execute_values
+
+from db.connection import db
+
+logger = logging.getLogger('weather-app.db.request_log')
+
+UPSERT_QUERY = '''
+    INSERT INTO location_requests (location, day, hits)
+    VALUES %s
+    ON CONFLICT (location, day)
+    DO UPDATE SET hits = location_requests.hits + EXCLUDED.hits
+'''
+
+
+class LocationCounter:
+    """Buffered per-location daily request counts"""
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval or float(os.getenv('REQUEST_LOG_FLUSH_INTERVAL', '30'))
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._counts = {}
+            threading.Thread(target=self._run, name='location-counter', daemon=True).start()
+
+    def hit(self, location):
+        """Count one request for a location"""
+        self._ensure_started()
+        key = (location, date.today())
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered counts in one statement"""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        try:
+            with db.get_connection() as conn:
+                execute_values(conn.cursor(), UPSERT_QUERY,
+                               [(loc, day, hits) for (loc, day), hits in counts.items()])
+        except Exception as e:
+            logger.error("Location counter flush failed, dropping %d keys: %s", len(counts), e)
+
+
+# Global location counter instance
+location_counter = LocationCounter()
+atexit.register(location_counter.flush)
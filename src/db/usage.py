@@ -0,0 +1,188 @@
+"""
+LLM Usage Ledger
+Buffers one row per Anthropic call (tokens, wall time, tool turns, user, and
+the error class for failed calls) and writes them to Postgres in batches from a background thread
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+
+from psycopg2.extras import execute_values
+
+from db.connection import db
+from utils.metrics import observe_anthropic
+
+logger = logging.getLogger('weather-app.db.usage')
+
+INSERT_QUERY = '''
+    INSERT INTO llm_usage (created_at, endpoint, model, input_tokens, output_tokens,
+                           cache_read_tokens, cache_creation_tokens, wall_ms, tool_turns,
+                           user_ref, session_ref, request_id, error)
+    VALUES %s
+'''
+
+
+def _usage_field(usage, name):
+    return (getattr(usage, name, None) or 0) if usage is not None else 0
+
+
+class UsageLedger:
+    """Buffered, batched writer for the llm_usage table"""
+
+    def __init__(self, flush_interval=None, batch_size=None, max_buffer=None):
+        self.flush_interval = flush_interval or float(os.getenv('USAGE_FLUSH_INTERVAL', '2.0'))
+        self.batch_size = batch_size or int(os.getenv('USAGE_BATCH_SIZE', '200'))
+        self.max_buffer = max_buffer or int(os.getenv('USAGE_MAX_BUFFER', '10000'))
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # The flusher thread is per process; start it after gunicorn forks
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='usage-ledger', daemon=True).start()
+
+    def record(self, endpoint, model, usage, wall_seconds, tool_turns=0,
+               user_ref=None, session_ref=None, request_id=None, error=None):
+        """
+        Queue a usage row; never blocks on the database
+
+        Args:
+            endpoint (str): App endpoint, e.g. 'chat' or 'fashion-suggestions'
+            model (str): Model that served the call
+            usage: Anthropic usage object (may be None for failed calls)
+            wall_seconds (float): Wall time of the call
+            tool_turns (int): Tool rounds completed before this call
+            user_ref (str, optional): User identifier (phone number)
+            session_ref (str, optional): Session identifier
+            request_id (str, optional): Groups the calls made by one request
+            error (str, optional): Exception class name when the call failed
+        """
+        row = (
+            time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+            endpoint,
+            model,
+            _usage_field(usage, 'input_tokens'),
+            _usage_field(usage, 'output_tokens'),
+            _usage_field(usage, 'cache_read_input_tokens'),
+            _usage_field(usage, 'cache_creation_input_tokens'),
+            int(wall_seconds * 1000),
+            tool_turns,
+            user_ref,
+            session_ref,
+            request_id,
+            error,
+        )
+        observe_anthropic(endpoint, model, wall_seconds, usage, error)
+        self._ensure_started()
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far, one batch at a time"""
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return
+            try:
+                with db.get_connection() as conn:
+                    execute_values(conn.cursor(), INSERT_QUERY, batch)
+            except Exception as e:
+                logger.error("Usage ledger flush failed, dropping %d rows: %s", len(batch), e)
+                self.dropped += len(batch)
+                return
+
+
+def usage_summary(window_hours=24, endpoint=None):
+    """
+    Latency percentiles and token totals per endpoint and model
+
+    Args:
+        window_hours (float): Look-back window
+        endpoint (str, optional): Restrict to one endpoint
+
+    Returns:
+        list: One dict per (endpoint, model)
+    """
+    query = '''
+        SELECT endpoint, model,
+               COUNT(*) AS calls,
+               COUNT(DISTINCT request_id) AS requests,
+               COUNT(error) AS errors,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY wall_ms) AS p50_ms,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY wall_ms) AS p95_ms,
+               percentile_cont(0.99) WITHIN GROUP (ORDER BY wall_ms) AS p99_ms,
+               SUM(input_tokens) AS input_tokens,
+               SUM(output_tokens) AS output_tokens,
+               SUM(cache_read_tokens) AS cache_read_tokens,
+               SUM(cache_creation_tokens) AS cache_creation_tokens
+        FROM llm_usage
+        WHERE created_at >= (NOW() AT TIME ZONE 'UTC') - make_interval(secs => %s)
+          AND (%s IS NULL OR endpoint = %s)
+        GROUP BY endpoint, model
+        ORDER BY endpoint, model
+    '''
+    return db.execute_query(query, (window_hours * 3600, endpoint, endpoint), fetch=True)
+
+
+def request_latency_summary(window_hours=24, endpoint='chat'):
+    """Percentiles of total LLM time per request (all tool turns summed)"""
+    query = '''
+        SELECT COUNT(*) AS requests,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY total_ms) AS p50_ms,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY total_ms) AS p95_ms,
+               AVG(turns) AS avg_tool_turns
+        FROM (
+            SELECT request_id, SUM(wall_ms) AS total_ms, MAX(tool_turns) AS turns
+            FROM llm_usage
+            WHERE created_at >= (NOW() AT TIME ZONE 'UTC') - make_interval(secs => %s)
+              AND endpoint = %s AND request_id IS NOT NULL
+            GROUP BY request_id
+        ) per_request
+    '''
+    result = db.execute_query(query, (window_hours * 3600, endpoint), fetch=True)
+    return result[0] if result else {}
+
+
+def tokens_per_user_per_day(days=7):
+    """Token totals per user per UTC day"""
+    query = '''
+        SELECT user_ref, date_trunc('day', created_at)::date AS day,
+               COUNT(*) AS calls,
+               SUM(input_tokens) AS input_tokens,
+               SUM(output_tokens) AS output_tokens
+        FROM llm_usage
+        WHERE created_at >= (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+        GROUP BY user_ref, day
+        ORDER BY day DESC, input_tokens DESC
+    '''
+    return db.execute_query(query, (days,), fetch=True)
+
+
+# Global usage ledger instance
+usage_ledger = UsageLedger()
+atexit.register(usage_ledger.flush)
@@ -0,0 +1,77 @@
+"""
+Gunicorn Settings
+Read automatically from the working directory. With preload_app the master
+imports the app (and, optionally, the provider SDKs) once per deploy and
+forks workers from it; post_fork drops anything that may hold sockets.
+
+Workers share Prometheus metrics through PROMETHEUS_MULTIPROC_DIR, which must
+be set before prometheus_client is imported, hence here. Bulkhead slots
+(utils.bulkhead) are shared the same way, through BULKHEAD_STATE_FILE.
+
+GUNICORN_WORKER_CLASS=gevent runs up to GUNICORN_WORKER_CONNECTIONS requests
+per worker as greenlets (see utils.green). The standard library is patched
+here, before preload imports the app and its locks, sockets and threads.
+"""
+
+import os
+import sys
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    from utils.green import install
+    install()
+
+# Import the lazily wrapped SDKs (anthropic, and boto3 or twilio for the configured
+# OTP provider) in the master so no worker pays for them on its first request
+warm_imports = preload_app and os.getenv('GUNICORN_WARM_IMPORTS', 'true').lower() == 'true'
+
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/weather-app-metrics')
+bulkhead_file = os.environ.setdefault('BULKHEAD_STATE_FILE', '/tmp/weather-app-bulkheads')
+
+# Done at config load because preload imports the app before any server hook runs.
+# Samples from a previous run would be summed into this one's, but a config
+# reload (HUP) in the same master must keep the live workers' files.
+if os.environ.get('WEATHER_APP_METRICS_OWNER') != str(os.getpid()):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    if os.path.exists(bulkhead_file):
+        os.remove(bulkhead_file)
+    os.environ['WEATHER_APP_METRICS_OWNER'] = str(os.getpid())
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if warm_imports:
+        from utils.lazy import warm_imports as warm
+        warm()
+        server.log.info("Provider SDKs imported in master")
+
+
+def pre_fork(server, worker):
+    # Pooled connections the master opened (startup migrations) must not be inherited
+    connection = sys.modules.get('db.connection')
+    if connection is not None:
+        connection.db.close_pool()
+
+
+def post_fork(server, worker):
+    # Clients built in the master (there shouldn't be any) would share its sockets
+    main = sys.modules.get('main')
+    if main is not None:
+        main.reinit_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+    # A worker killed mid-request (timeout, OOM) would otherwise keep its bulkhead slots
+    from utils.bulkhead import bulkheads
+    bulkheads.release_pid(worker.pid)
@@ -0,0 +1,169 @@
+"""
+Nightly Outfit Guidance Precomputation
+Finds the most frequent (location, weather bucket) pairs from request counts
+and the forecast cache, generates generic outfit guidance for each bucket
+through the Anthropic Message Batches API, and stores it in outfit_guidance
+
+Usage (from src/, e.g. from a nightly CronJob):
+    python -m jobs.precompute_guidance [--days 7] [--buckets 40] [--force]
+
+Set ANTHROPIC_BASE_URL to point at a local stub server when testing.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from collections import Counter
+
+import anthropic
+
+from chat.guidance import weather_bucket, describe_bucket
+from db.connection import top_requested_locations, get_outfit_guidance, save_outfit_guidance
+from utils.json_parser import compile_schema, extract_json_object
+
+logger = logging.getLogger('weather-app.jobs.guidance')
+
+GUIDANCE_MODEL = os.getenv('GUIDANCE_MODEL', 'claude-sonnet-4-5')
+
+GUIDANCE_SCHEMA = compile_schema({
+    "summary": str,
+    "layers": [str],
+    "accessories": [str],
+    "tips": [str],
+})
+
+PROMPT = """You are a practical clothing advisor. Give generic outfit guidance for this weather:
+{description}
+
+Respond with ONLY valid JSON in this exact format (no markdown, no code fences):
+{{
+  "summary": "One sentence outfit strategy for this weather.",
+  "layers": ["Base, mid and outer layers, most important first"],
+  "accessories": ["Accessories worth bringing"],
+  "tips": ["Short practical tip"]
+}}
+
+Keep layers to 2-4 items, accessories to 0-3 items and tips to 2-3 items."""
+
+
+def rank_buckets(rows):
+    """
+    Weight each bucket by how often its locations are requested
+
+    Args:
+        rows (list): (location, hits, data) rows from top_requested_locations
+
+    Returns:
+        Counter: bucket -> weighted frequency
+    """
+    weights = Counter()
+    for row in rows:
+        entries = row['data'] or []
+        if not entries:
+            continue
+        # Spread a location's hits over the hours it will be asked about
+        share = row['hits'] / len(entries)
+        for entry in entries:
+            bucket = weather_bucket(entry)
+            if bucket:
+                weights[bucket] += share
+    return weights
+
+
+def batch_request(bucket):
+    return {
+        "custom_id": bucket.replace('|', '_'),
+        "params": {
+            "model": GUIDANCE_MODEL,
+            "max_tokens": 600,
+            "messages": [{"role": "user", "content": PROMPT.format(description=describe_bucket(bucket))}],
+        },
+    }
+
+
+def parse_guidance(text):
+    """Parse the model's JSON reply; returns None if it isn't usable"""
+    data, _ = extract_json_object(text)
+    if not data or not data.get('summary'):
+        return None
+    guidance = GUIDANCE_SCHEMA(data)
+    return {
+        "summary": guidance["summary"],
+        "layers": guidance["layers"][:4],
+        "accessories": guidance["accessories"][:3],
+        "tips": guidance["tips"][:3],
+    }
+
+
+def run_batch(client, buckets, poll_seconds=30, timeout_seconds=24 * 3600):
+    """
+    Submit one message batch for the buckets and wait for it to finish
+
+    Returns:
+        list: (bucket, guidance, model) rows for the successful results
+    """
+    by_id = {bucket.replace('|', '_'): bucket for bucket in buckets}
+    batch = client.messages.batches.create(requests=[batch_request(b) for b in buckets])
+    logger.info("Submitted guidance batch id=%s requests=%d", batch.id, len(buckets))
+
+    deadline = time.monotonic() + timeout_seconds
+    while batch.processing_status != 'ended':
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Batch {batch.id} did not finish in {timeout_seconds}s")
+        time.sleep(poll_seconds)
+        batch = client.messages.batches.retrieve(batch.id)
+        logger.info("Batch id=%s status=%s counts=%s", batch.id, batch.processing_status, batch.request_counts)
+
+    rows = []
+    for result in client.messages.batches.results(batch.id):
+        bucket = by_id.get(result.custom_id)
+        if not bucket or result.result.type != 'succeeded':
+            logger.warning("Guidance request %s did not succeed: %s", result.custom_id, result.result.type)
+            continue
+        message = result.result.message
+        text = "".join(b.text for b in message.content if b.type == 'text')
+        guidance = parse_guidance(text)
+        if guidance:
+            rows.append((bucket, guidance, message.model))
+        else:
+            logger.warning("Unparseable guidance for bucket=%s", bucket)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute outfit guidance for frequent weather buckets")
+    parser.add_argument('--days', type=int, default=7, help="Request-count look-back window")
+    parser.add_argument('--locations', type=int, default=50, help="Most requested locations to scan")
+    parser.add_argument('--buckets', type=int, default=40, help="Buckets to generate per run")
+    parser.add_argument('--max-age-days', type=int, default=7, help="Regenerate guidance older than this")
+    parser.add_argument('--force', action='store_true', help="Regenerate even fresh buckets")
+    parser.add_argument('--poll-seconds', type=float, default=30)
+    parser.add_argument('--dry-run', action='store_true', help="Print the ranked buckets and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    weights = rank_buckets(top_requested_locations(args.days, args.locations))
+    fresh = set() if args.force else {row['bucket'] for row in get_outfit_guidance(args.max_age_days)}
+    buckets = [b for b, _ in weights.most_common() if b not in fresh][:args.buckets]
+
+    if args.dry_run:
+        for bucket in buckets:
+            print(f"{weights[bucket]:10.1f}  {bucket}  ({describe_bucket(bucket)})")
+        return 0
+    if not buckets:
+        logger.info("No buckets need guidance; nothing to do")
+        return 0
+
+    client = anthropic.Anthropic()
+    rows = run_batch(client, buckets, poll_seconds=args.poll_seconds)
+    if rows:
+        save_outfit_guidance(rows)
+    logger.info("Stored guidance for %d of %d buckets", len(rows), len(buckets))
+    return 0 if rows else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
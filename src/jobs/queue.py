@@ -0,0 +1,183 @@
+"""
+Background Job Queue
+Bounded in-process queue with a capped worker pool for slow LLM calls.
+Job state is mirrored to Postgres so any gunicorn worker can answer a poll.
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import deque
+
+from db.connection import save_job, get_job, purge_jobs
+
+logger = logging.getLogger('weather-app.jobs')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class JobQueue:
+    """Run submitted callables on a fixed pool of background threads"""
+
+    def __init__(self, name, workers=None, max_depth=None):
+        self.name = name
+        self.workers = workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.max_depth = max_depth or int(os.getenv('JOB_QUEUE_DEPTH', '16'))
+        self._queue = queue.Queue(maxsize=self.max_depth)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._in_flight = 0
+        # Recent queue waits (seconds) for the stats endpoint
+        self._waits = deque(maxlen=200)
+        self._started = False
+        self._pid = None
+        self._submitted = 0
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so start lazily in each gunicorn worker
+        if self._started and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._started and self._pid == os.getpid():
+                return
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started = True
+            self._pid = os.getpid()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Enqueue a job
+
+        Args:
+            func (callable): Work to run; its return value becomes the job result
+            *args, **kwargs: Passed to func
+
+        Returns:
+            str: Job id
+
+        Raises:
+            QueueFullError: The queue is at capacity
+        """
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'result': None,
+            'error': None,
+            'enqueued_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        if self._queue.full():
+            raise QueueFullError(f"{self.name} queue is full ({self.max_depth} jobs)")
+
+        # Persist before the job is visible to workers so 'queued' can't overwrite 'running'
+        self._persist(job)
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, func, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise QueueFullError(f"{self.name} queue is full ({self.max_depth} jobs)")
+
+        self._submitted += 1
+        if self._submitted % 100 == 0:
+            try:
+                purge_jobs()
+            except Exception as e:
+                logger.error("Job purge failed: %s", e, exc_info=True)
+        logger.info("Job enqueued queue=%s id=%s depth=%d", self.name, job_id, self._queue.qsize())
+        return job_id
+
+    def _persist(self, job):
+        try:
+            save_job(job['id'], self.name, job['status'], job['result'], job['error'])
+        except Exception as e:
+            logger.error("Job state write failed id=%s: %s", job['id'], e, exc_info=True)
+
+    def _run(self):
+        while True:
+            job_id, func, args, kwargs = self._queue.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                self._in_flight += 1
+                self._waits.append(job['started_at'] - job['enqueued_at'])
+            self._persist(job)
+
+            try:
+                job['result'] = func(*args, **kwargs)
+                job['status'] = 'done'
+            except Exception as e:
+                logger.error("Job failed queue=%s id=%s: %s", self.name, job_id, e, exc_info=True)
+                job['error'] = str(e)
+                job['status'] = 'failed'
+            finally:
+                job['finished_at'] = time.time()
+                with self._lock:
+                    self._in_flight -= 1
+                self._persist(job)
+                logger.info("Job finished queue=%s id=%s status=%s wait=%.2fs run=%.2fs",
+                            self.name, job_id, job['status'],
+                            job['started_at'] - job['enqueued_at'],
+                            job['finished_at'] - job['started_at'])
+                self._forget_finished()
+                self._queue.task_done()
+
+    def _forget_finished(self, keep_seconds=300):
+        """Drop finished jobs from memory; Postgres keeps them for polling"""
+        cutoff = time.time() - keep_seconds
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items()
+                           if job['finished_at'] and job['finished_at'] < cutoff]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        Job state from this process, or from Postgres if another worker owns it
+
+        Returns:
+            dict: id, status, result, error — or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        try:
+            return get_job(job_id)
+        except Exception as e:
+            logger.error("Job state read failed id=%s: %s", job_id, e, exc_info=True)
+            return None
+
+    def stats(self):
+        """Queue depth and wait times for this worker process"""
+        with self._lock:
+            waits = sorted(self._waits)
+            queued = [job['enqueued_at'] for job in self._jobs.values() if job['status'] == 'queued']
+            in_flight = self._in_flight
+        now = time.time()
+        return {
+            'queue': self.name,
+            'pid': os.getpid(),
+            'depth': self._queue.qsize(),
+            'capacity': self.max_depth,
+            'workers': self.workers,
+            'in_flight': in_flight,
+            'oldest_wait_seconds': round(now - min(queued), 2) if queued else 0.0,
+            'recent_wait_p50_seconds': round(waits[len(waits) // 2], 2) if waits else 0.0,
+            'recent_wait_max_seconds': round(waits[-1], 2) if waits else 0.0,
+        }
@@ -0,0 +1,260 @@
+"""
+Clothing Knowledge Vector Index
+Memory-mapped embedding matrix with batched top-k search, an optional IVF
+(coarse clustering) mode and int8 quantized storage for large corpora
+
+On-disk layout of an index directory:
+    meta.json       dim, row count, storage dtype, document count, IVF settings
+    vectors.bin     raw row-major embeddings (float32, or int8 when quantized)
+    scales.bin      per-row float32 scale factors (quantized only)
+    chunks.jsonl    one JSON object per row: text, source, title
+    df.npy          per-bucket document frequencies, for incremental appends
+    idf.npy         IDF weights used at ingest time
+    ivf.npz         IVF centroids and row assignments (IVF mode only)
+"""
+
+import os
+import json
+import logging
+import threading
+import numpy as np
+
+from knowledge.vectorizer import HashingVectorizer, idf_from_counts
+
+logger = logging.getLogger('weather-app.knowledge')
+
+DEFAULT_INDEX_DIR = os.getenv(
+    'KNOWLEDGE_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index'),
+)
+
+# Rows scored per block in flat search; bounds the scratch matrix size
+SEARCH_BLOCK_ROWS = 65536
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind='stable')]
+
+
+def _kmeans(vectors, nlist, iterations=12, seed=0):
+    """Spherical k-means; returns L2-normalized centroids"""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+    return centroids
+
+
+class VectorIndex:
+    """Embedding index stored in a directory and memory-mapped for search"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._load()
+
+    # -- construction -------------------------------------------------------
+
+    @classmethod
+    def create(cls, path, dim=1024, quantize=False):
+        """Create an empty index directory"""
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            'dim': dim,
+            'count': 0,
+            'dtype': 'int8' if quantize else 'float32',
+            'n_docs': 0,
+            'ivf': None,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        for name in ('vectors.bin', 'scales.bin', 'chunks.jsonl'):
+            open(os.path.join(path, name), 'wb').close()
+        np.save(os.path.join(path, 'df.npy'), np.zeros(dim, dtype=np.float64))
+        np.save(os.path.join(path, 'idf.npy'), np.ones(dim, dtype=np.float32))
+        return cls(path)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        with open(self._file('meta.json')) as f:
+            self.meta = json.load(f)
+        self.dim = self.meta['dim']
+        self.count = self.meta['count']
+        self.quantized = self.meta['dtype'] == 'int8'
+        self.vectorizer = HashingVectorizer(self.dim, idf=np.load(self._file('idf.npy')))
+
+        dtype = np.int8 if self.quantized else np.float32
+        if self.count:
+            self.vectors = np.memmap(self._file('vectors.bin'), dtype=dtype, mode='r',
+                                     shape=(self.count, self.dim))
+            self.scales = (np.fromfile(self._file('scales.bin'), dtype=np.float32)
+                           if self.quantized else None)
+        else:
+            self.vectors = np.empty((0, self.dim), dtype=dtype)
+            self.scales = np.empty(0, dtype=np.float32) if self.quantized else None
+
+        with open(self._file('chunks.jsonl')) as f:
+            self.chunks = [json.loads(line) for line in f if line.strip()]
+
+        self.ivf = None
+        if self.meta.get('ivf') and os.path.exists(self._file('ivf.npz')):
+            data = np.load(self._file('ivf.npz'))
+            self._set_ivf(data['centroids'], data['assign'])
+
+    def _set_ivf(self, centroids, assign):
+        # Rows grouped by list so a probe reads one contiguous slice of row ids
+        order = np.argsort(assign, kind='stable')
+        offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        self.ivf = {'centroids': centroids, 'assign': assign, 'order': order, 'offsets': offsets}
+
+    def _save_meta(self):
+        tmp = self._file('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._file('meta.json'))
+
+    def append(self, texts, chunks):
+        """
+        Embed and append chunks to the index. IDF weights are fitted on the
+        first batch and kept afterwards so existing rows stay comparable;
+        document counts keep accumulating for a later rebuild.
+
+        Args:
+            texts (list): Text to embed for each chunk
+            chunks (list): Metadata dicts stored alongside each row
+
+        Returns:
+            int: New row count
+        """
+        with self._lock:
+            vectorizer = self.vectorizer
+            df = np.load(self._file('df.npy')) + vectorizer.document_frequencies(texts)
+            n_docs = self.meta['n_docs'] + len(texts)
+            np.save(self._file('df.npy'), df)
+            if self.count == 0:
+                vectorizer.idf = idf_from_counts(df, n_docs)
+                np.save(self._file('idf.npy'), vectorizer.idf)
+
+            embeddings = vectorizer.transform(texts)
+            if self.quantized:
+                scales = np.abs(embeddings).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                stored = np.round(embeddings / scales[:, None]).astype(np.int8)
+                with open(self._file('scales.bin'), 'ab') as f:
+                    f.write(scales.astype(np.float32).tobytes())
+            else:
+                stored = embeddings
+
+            with open(self._file('vectors.bin'), 'ab') as f:
+                f.write(stored.tobytes())
+            with open(self._file('chunks.jsonl'), 'a') as f:
+                for chunk in chunks:
+                    f.write(json.dumps(chunk) + "\n")
+
+            # New rows join their nearest existing IVF list
+            if self.ivf is not None:
+                assign = np.concatenate([
+                    self.ivf['assign'],
+                    np.argmax(embeddings @ self.ivf['centroids'].T, axis=1).astype(np.int32),
+                ])
+                np.savez(self._file('ivf.npz'), centroids=self.ivf['centroids'], assign=assign)
+
+            self.meta['count'] += len(texts)
+            self.meta['n_docs'] = n_docs
+            self._save_meta()
+            self._load()
+            return self.count
+
+    def build_ivf(self, nlist, iterations=12):
+        """Cluster the stored rows into nlist inverted lists"""
+        with self._lock:
+            vectors = self._dense(np.arange(self.count))
+            centroids = _kmeans(vectors, nlist, iterations)
+            assign = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+            np.savez(self._file('ivf.npz'), centroids=centroids, assign=assign)
+            self.meta['ivf'] = {'nlist': len(centroids)}
+            self._save_meta()
+            self._load()
+
+    # -- search -------------------------------------------------------------
+
+    def _dense(self, rows):
+        """Float32 copies of the given rows"""
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.quantized:
+            vectors *= self.scales[rows, None]
+        return vectors
+
+    def _score_block(self, queries, start, stop):
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        scores = queries @ block.T
+        if self.quantized:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def _search_flat(self, queries, top_k):
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, self.count)
+            scores = np.concatenate([best_scores, self._score_block(queries, start, stop)], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            keep = np.stack([_top_k(s, top_k) for s in scores])
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_rows = np.take_along_axis(rows, keep, axis=1)
+        return best_rows, best_scores
+
+    def _search_ivf(self, queries, top_k, nprobe):
+        ivf = self.ivf
+        probes = np.argsort(-(queries @ ivf['centroids'].T), axis=1)[:, :nprobe]
+        all_rows, all_scores = [], []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([ivf['order'][ivf['offsets'][c]:ivf['offsets'][c + 1]] for c in lists])
+            rows.sort()
+            scores = self._dense(rows) @ query
+            keep = _top_k(scores, top_k)
+            all_rows.append(rows[keep])
+            all_scores.append(scores[keep])
+        return all_rows, all_scores
+
+    def search(self, queries, top_k=3, nprobe=None):
+        """
+        Batched top-k cosine search
+
+        Args:
+            queries (list): Query strings
+            top_k (int): Results per query
+            nprobe (int, optional): IVF lists to scan per query (IVF mode only)
+
+        Returns:
+            list: Per query, a list of (chunk dict, score) best first
+        """
+        if not self.count or not queries:
+            return [[] for _ in queries]
+
+        embedded = self.vectorizer.transform(queries)
+        if self.ivf is not None:
+            nprobe = nprobe or int(os.getenv('KNOWLEDGE_IVF_NPROBE', '4'))
+            rows, scores = self._search_ivf(embedded, top_k, nprobe)
+        else:
+            rows, scores = self._search_flat(embedded, top_k)
+
+        return [
+            [(self.chunks[r], float(s)) for r, s in zip(row_ids, row_scores) if s > 0]
+            for row_ids, row_scores in zip(rows, scores)
+        ]
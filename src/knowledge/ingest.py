@@ -0,0 +1,119 @@
+"""
+Clothing Knowledge Ingestion CLI
+Chunks a corpus of markdown/text files and writes them to a vector index
+
+Usage (from src/):
+    python -m knowledge.ingest knowledge/corpus
+    python -m knowledge.ingest extra_docs/ --append
+    python -m knowledge.ingest big_corpus/ --ivf 256 --quantize
+"""
+
+import os
+import re
+import sys
+import shutil
+import logging
+import argparse
+
+from knowledge.index import DEFAULT_INDEX_DIR, VectorIndex
+
+logger = logging.getLogger('weather-app.knowledge.ingest')
+
+HEADING_RE = re.compile(r'^#{1,6}\s+(.*)$')
+
+
+def chunk_document(text, source, chunk_words=120, overlap=30):
+    """
+    Split a document into overlapping word windows that respect headings
+
+    Args:
+        text (str): Document text (markdown or plain)
+        source (str): Source file name stored with each chunk
+        chunk_words (int): Target words per chunk
+        overlap (int): Words repeated between consecutive chunks of a section
+
+    Returns:
+        list: Chunk dicts with text, source and title
+    """
+    sections = []
+    title, lines = os.path.splitext(os.path.basename(source))[0].replace('-', ' ').title(), []
+    for line in text.splitlines():
+        match = HEADING_RE.match(line)
+        if match:
+            if lines:
+                sections.append((title, " ".join(lines)))
+            title, lines = match.group(1).strip(), []
+        elif line.strip():
+            lines.append(line.strip())
+    if lines:
+        sections.append((title, " ".join(lines)))
+
+    chunks = []
+    step = max(chunk_words - overlap, 1)
+    for section_title, body in sections:
+        words = body.split()
+        for start in range(0, max(len(words) - overlap, 1), step):
+            chunks.append({
+                'text': " ".join(words[start:start + chunk_words]),
+                'source': os.path.basename(source),
+                'title': section_title,
+            })
+    return chunks
+
+
+def iter_corpus(path):
+    """Yield (file path, text) for every .md/.txt file under path"""
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if name.endswith(('.md', '.txt'))
+        )
+    for file_path in files:
+        with open(file_path, encoding='utf-8') as f:
+            yield file_path, f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the clothing knowledge index")
+    parser.add_argument('corpus', help="Corpus file or directory of .md/.txt files")
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    parser.add_argument('--append', action='store_true', help="Append to an existing index")
+    parser.add_argument('--dim', type=int, default=1024, help="Embedding width for a new index")
+    parser.add_argument('--chunk-words', type=int, default=120)
+    parser.add_argument('--overlap', type=int, default=30)
+    parser.add_argument('--quantize', action='store_true', help="Store int8 embeddings (pair with --ivf; flat int8 scans dequantize every row)")
+    parser.add_argument('--ivf', type=int, default=0, metavar='NLIST',
+                        help="Cluster into NLIST inverted lists (large corpora)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    chunks = []
+    for file_path, text in iter_corpus(args.corpus):
+        chunks.extend(chunk_document(text, file_path, args.chunk_words, args.overlap))
+    if not chunks:
+        logger.error("No .md or .txt content found under %s", args.corpus)
+        return 1
+
+    if args.append and os.path.exists(os.path.join(args.index_dir, 'meta.json')):
+        index = VectorIndex(args.index_dir)
+    else:
+        if os.path.exists(args.index_dir):
+            shutil.rmtree(args.index_dir)
+        index = VectorIndex.create(args.index_dir, dim=args.dim, quantize=args.quantize)
+
+    # Title is embedded with the text so section context helps retrieval
+    count = index.append([f"{c['title']}. {c['text']}" for c in chunks], chunks)
+    if args.ivf:
+        index.build_ivf(args.ivf)
+
+    logger.info("Indexed %d chunks (total=%d) into %s", len(chunks), count, args.index_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Clothing Knowledge Retriever
+Lazily opens the local vector index and answers search_clothing_knowledge queries
+"""
+
+import os
+import logging
+import threading
+from functools import lru_cache
+
+from knowledge.index import DEFAULT_INDEX_DIR, VectorIndex
+
+logger = logging.getLogger('weather-app.knowledge')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Open the index on first use; returns None when it hasn't been built"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not os.path.exists(os.path.join(DEFAULT_INDEX_DIR, 'meta.json')):
+                    logger.warning("Knowledge index not found at %s", DEFAULT_INDEX_DIR)
+                    return None
+                _index = VectorIndex(DEFAULT_INDEX_DIR)
+                logger.info("Knowledge index loaded: rows=%d dim=%d ivf=%s",
+                            _index.count, _index.dim, bool(_index.ivf))
+    return _index
+
+
+@lru_cache(maxsize=1024)
+def _search(query, top_k):
+    return tuple(
+        (chunk['title'], chunk['source'], chunk['text'], round(score, 3))
+        for chunk, score in get_index().search([query], top_k)[0]
+    )
+
+
+def search_knowledge(query, top_k=3):
+    """
+    Search the clothing knowledge base
+
+    Args:
+        query (str): Natural-language question
+        top_k (int): Number of passages to return
+
+    Returns:
+        dict: Tool result with a list of passages
+    """
+    if get_index() is None:
+        return {
+            "results": [],
+            "note": "Knowledge base not yet indexed. Answer from general knowledge for now.",
+        }
+
+    # Normalized so trivially different phrasings share a cache entry
+    hits = _search(" ".join(query.lower().split()), max(1, min(int(top_k), 5)))
+    return {
+        "results": [
+            {"title": title, "source": source, "text": text, "score": score}
+            for title, source, text, score in hits
+        ]
+    }
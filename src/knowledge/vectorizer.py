@@ -0,0 +1,84 @@
+"""
+Hashing TF-IDF Vectorizer
+Turns text into fixed-width, L2-normalized embeddings without a vocabulary or
+network access, so the index can be built offline and queried in-process
+"""
+
+import re
+import zlib
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its
+me my of on or so than that the their them then there these they this to too was
+we what when where which while who why will with you your
+""".split())
+
+
+class HashingVectorizer:
+    """Signed feature hashing over unigrams and bigrams with optional IDF weights"""
+
+    def __init__(self, dim=1024, idf=None):
+        self.dim = dim
+        self.idf = idf
+
+    def features(self, text):
+        """Unigram and bigram features for a piece of text"""
+        tokens = [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def _hash(self, feature):
+        h = zlib.crc32(feature.encode('utf-8'))
+        return h % self.dim, 1.0 if h & 0x80000000 else -1.0
+
+    def counts(self, text):
+        """Hashed bucket -> signed term frequency for a text"""
+        buckets = {}
+        for feature in self.features(text):
+            idx, sign = self._hash(feature)
+            buckets[idx] = buckets.get(idx, 0.0) + sign
+        return buckets
+
+    def document_frequencies(self, texts):
+        """Number of texts touching each hashed bucket"""
+        df = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            for idx in self.counts(text):
+                df[idx] += 1
+        return df
+
+    def fit(self, texts):
+        """Compute IDF weights from a corpus"""
+        df = self.document_frequencies(texts)
+        self.idf = idf_from_counts(df, len(texts))
+        return self
+
+    def transform(self, texts):
+        """
+        Embed texts
+
+        Args:
+            texts (list): Strings to embed
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim), rows L2-normalized
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for idx, tf in self.counts(text).items():
+                # Sublinear TF keeps long chunks from dominating
+                out[row, idx] = np.sign(tf) * (1.0 + np.log(abs(tf))) if tf else 0.0
+
+        if self.idf is not None:
+            out *= self.idf
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        out /= norms
+        return out
+
+
+def idf_from_counts(df, n_docs):
+    """Smoothed IDF weights from per-bucket document frequencies"""
+    return (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
@@ -1,46 +1,79 @@
 import os
 import json
+import hmac
+import math
+import time
+import uuid
 import logging
 import base64
 import traceback
 from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, redirect, url_for, session, request
-import anthropic
-from authlib.integrations.flask_client import OAuth
+from flask import Flask, render_template, jsonify, redirect, url_for, session, request, g
 from api.client import ApiClient
+from utils.lazy import lazy_import, LazyResource, reset_resources
+from utils.log import configure_logging
 from utils.data_processor import get_hourly_data
+from utils.forecast import forecast_store, SingleFlight
+from utils.json_parser import compile_schema, extract_json_object
+from utils import metrics
+from utils.metrics import OTP_SENDS
+from utils.tracing import span, tracer
+from utils.profiler import request_profiler
+from utils.bulkhead import bulkheads, BulkheadFull
+from assets.manifest import asset_manifest
+from chat.history import history_manager
+from chat.tools import CHAT_TOOLS, ChatToolSession, load_forecast
+from chat.rules import rules_engine
+from chat.guidance import guidance_store
+from chat.routing import model_router, extract_features
+from jobs.queue import JobQueue, QueueFullError
+from auth.middleware import AuthMiddleware, login_required
+from auth.rate_limit import send_limiter, ALLOWED, COOLDOWN
 
 # Import database connection
-from db.connection import db, get_cached_data, cache_data
-
-# Configure structured logging for k8s
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s [%(name)s] %(message)s',
-    datefmt='%Y-%m-%dT%H:%M:%S%z'
-)
+from db.connection import get_cached_data, cache_data
+from db.migrate import MigrationRunner, migrate_on_startup
+from db.request_log import location_counter
+from db.usage import usage_ledger, usage_summary, request_latency_summary, tokens_per_user_per_day
+
+# Structured JSON logging for k8s, written off the request thread (see utils.log)
+configure_logging()
 logger = logging.getLogger('weather-app')
 
-# Import OTP auth based on provider
+# Provider SDKs import on first use, not at worker boot (see utils.lazy)
+anthropic = lazy_import('anthropic')
+
+# OTP auth provider; its SDK (twilio or boto3) is imported when first needed
 OTP_PROVIDER = os.getenv('OTP_PROVIDER', 'cognito').lower()
 
-if OTP_PROVIDER == 'twilio':
-    from auth.twilio_otp import TwilioOTPAuth
-    AuthProvider = TwilioOTPAuth
-elif OTP_PROVIDER == 'cognito':
-    from auth.cognito_otp import CognitoOTPAuth
-    AuthProvider = CognitoOTPAuth
-else:
+if OTP_PROVIDER not in ('twilio', 'cognito'):
     raise ValueError(f"Invalid OTP_PROVIDER: {OTP_PROVIDER}. Must be 'cognito' or 'twilio'")
 
+# Registered so a preloading master warms the configured provider's SDK too
+otp_sdk = lazy_import('twilio.rest' if OTP_PROVIDER == 'twilio' else 'boto3')
+
+
+def create_otp_auth():
+    """Build the configured OTP provider"""
+    if OTP_PROVIDER == 'twilio':
+        from auth.twilio_otp import TwilioOTPAuth
+        return TwilioOTPAuth()
+    from auth.cognito_otp import CognitoOTPAuth
+    return CognitoOTPAuth()
+
 
 app = Flask(__name__, template_folder='templates')
 app.config['SERVER_NAME'] = os.environ.get('SERVER_NAME', 'localhost:8080')
 app.secret_key = os.environ.get('APP_SECRET_KEY') or 'fallback-dev-key' 
 
+admin_token = os.getenv('ADMIN_TOKEN')
+
 api_key = os.getenv('API_KEY')
 base_url = os.getenv('API_BASE_URL')
 location = os.getenv('LOCATION', 'grand%20rapids%20mi')
+# Hours kept in hourly_cache; the chart shows the first CHART_HOURS, chat tools can look further
+FORECAST_HOURS = int(os.getenv('FORECAST_HOURS', '72'))
+CHART_HOURS = 24
 authority = os.getenv('AWS_OAUTH_AUTHORITY')
 client_id = os.getenv('AWS_OAUTH_CLIENT_ID')
 client_secret = os.getenv('AWS_OAUTH_CLIENT_SECRET')
@@ -49,30 +82,76 @@ metadata_url = os.getenv('AWS_OAUTH_METADATA_URL')
 # Initialize API client
 api_client = ApiClient(api_key=api_key, base_url=base_url)
 
-# Initialize Anthropic client
+# Initialize Anthropic client (built per process on first use; its HTTP pool isn't fork-safe)
 anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
 if anthropic_api_key:
-    anthropic_client = anthropic.Anthropic(api_key=anthropic_api_key)
+    anthropic_client = LazyResource('Anthropic client', lambda: anthropic.Anthropic(api_key=anthropic_api_key))
 else:
     anthropic_client = None
 
-# Initialize OTP Auth based on provider
-try:
-    otp_auth = AuthProvider()
-    logger.info("OTP provider initialized: %s", OTP_PROVIDER)
-except ValueError as e:
-    logger.warning("OTP authentication not configured: %s", e)
-    otp_auth = None
+# Background queue for slow vision calls (async fashion suggestions)
+fashion_jobs = JobQueue('fashion-suggestions')
+
+# Verification codes are delivered off the request path
+sms_jobs = JobQueue('sms-dispatch',
+                    workers=int(os.getenv('SMS_DISPATCH_WORKERS', '4')),
+                    max_depth=int(os.getenv('SMS_QUEUE_DEPTH', '64')))
+
+# Concurrent Visual Crossing fetches for one location share a single call
+forecast_fetches = SingleFlight()
+
+# Pod-wide concurrency caps (see utils.bulkhead); 0 = uncapped but still counted.
+# By default LLM calls may hold at most half the request slots, forecasts all but
+# one, so neither kind of traffic can take every slot from the other. A sync
+# worker is one slot; a gevent worker is GUNICORN_WORKER_CONNECTIONS
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', '4'))
+if os.getenv('GUNICORN_WORKER_CLASS', 'sync') == 'gevent':
+    REQUEST_SLOTS = GUNICORN_WORKERS * int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+else:
+    REQUEST_SLOTS = GUNICORN_WORKERS
+bulkheads.register('llm', int(os.getenv('BULKHEAD_LLM_LIMIT', max(1, REQUEST_SLOTS // 2))), retry_after=5)
+bulkheads.register('chat', int(os.getenv('BULKHEAD_CHAT_LIMIT', '0')), retry_after=5)
+bulkheads.register('fashion', int(os.getenv('BULKHEAD_FASHION_LIMIT', max(1, REQUEST_SLOTS // 4))),
+                   retry_after=10)
+bulkheads.register('forecast', int(os.getenv('BULKHEAD_FORECAST_LIMIT', max(1, REQUEST_SLOTS - 1))),
+                   retry_after=1)
+# Async fashion jobs wait this long for an LLM slot instead of being shed
+FASHION_JOB_SLOT_WAIT = float(os.getenv('FASHION_JOB_SLOT_WAIT', '30'))
+
+# Initialize OTP Auth based on provider; falsy when its settings are missing
+otp_auth = LazyResource(f"OTP provider ({OTP_PROVIDER})", create_otp_auth, unavailable_errors=(ValueError,))
+
+# Resolve the signed-in user once per API request (g.user)
+AuthMiddleware(app, otp_auth)
+
+# Per-route latency histograms and /metrics (scraped in-cluster; nginx hides it)
+metrics.init_app(app)
+
+# Server-Timing and span logs for TRACE_SAMPLE_RATE of requests, and for every admin request
+tracer.init_app(app, force=lambda: admin_authorized())
+
+# Stack sampling for admin-armed routes (PROFILER_ENABLED); see /api/admin/profiles
+request_profiler.init_app(app)
+
+# A full bulkhead answers 503 with Retry-After instead of queueing
+bulkheads.init_app(app)
 
-# Initialize database
+# asset_url() in templates links the fingerprinted files from assets.build
+asset_manifest.init_app(app)
+
+# Seconds a readiness result is reused, so kubelet probes don't each open a connection
+READY_CACHE_SECONDS = float(os.getenv('READY_CACHE_SECONDS', '5'))
+_readiness = {'checked_at': 0.0, 'database': None}
+
+# Initialize database; migrations only run when schema_version is behind
 try:
-    db.init_tables()
-    logger.info("Database tables initialized successfully")
+    migrate_on_startup()
 except Exception as e:
     logger.error("Database initialization failed: %s", e, exc_info=True)
     logger.warning("Running without database. Some features may not work.")
 
 # app.secret_key = os.urandom(24)  # Use a secure random key in production
+# from authlib.integrations.flask_client import OAuth
 # oauth = OAuth(app)
 
 # oauth.register(
@@ -86,6 +165,105 @@ except Exception as e:
 
 # Database functions are now imported from db.connection
 
+
+def reinit_after_fork():
+    """Per-process state for a worker forked from a preloaded master"""
+    reset_resources()
+    api_client.reset()
+
+
+def admin_authorized():
+    """True when the request carries the configured X-Admin-Token"""
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and hmac.compare_digest(supplied, admin_token)
+
+
+def client_ip():
+    """Client address; the nginx proxy overwrites X-Real-IP on every request"""
+    return request.headers.get('X-Real-IP') or request.remote_addr
+
+
+def deliver_code(send, phone_number):
+    """Background job: send a code and fail the job if the provider refuses"""
+    result = send(phone_number)
+    OTP_SENDS.labels(OTP_PROVIDER, 'delivered' if result['success'] else 'failed').inc()
+    if not result['success']:
+        raise RuntimeError(f"Code delivery failed: {result.get('error_message')}")
+    return {"status": result.get('status', 'sent')}
+
+
+def dispatch_code(send, phone_number, decision):
+    """
+    Queue a code delivery
+
+    Returns:
+        Response tuple if the dispatch queue is full, otherwise None
+    """
+    try:
+        sms_jobs.submit(deliver_code, send, phone_number)
+    except QueueFullError as e:
+        OTP_SENDS.labels(OTP_PROVIDER, 'rejected').inc()
+        logger.warning("Code delivery rejected: %s", e)
+        # Nothing was sent, so don't count it against the user's limits
+        send_limiter.release(decision['event_ids'])
+        response = jsonify({"error": "We're busy right now. Please try again shortly."})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    OTP_SENDS.labels(OTP_PROVIDER, 'queued').inc()
+    return None
+
+
+def send_refused(decision, phone_number):
+    """Response for a code send the limiter didn't allow"""
+    OTP_SENDS.labels(OTP_PROVIDER, decision['outcome']).inc()
+    if decision['outcome'] == COOLDOWN and session.get('pending_phone') == phone_number:
+        # Same browser asking again within the cool-down; the code it has is still good
+        return jsonify({
+            "success": True,
+            "requires_verification": True,
+            "message": "A code was just sent. Please check your messages."
+        }), 200
+    response = jsonify({"error": "Too many code requests. Please wait before trying again."})
+    response.headers['Retry-After'] = str(decision['retry_after'])
+    return response, 429
+
+def database_readiness():
+    """DB reachability and pending migrations, cached for READY_CACHE_SECONDS"""
+    now = time.monotonic()
+    if _readiness['database'] is None or now - _readiness['checked_at'] >= READY_CACHE_SECONDS:
+        try:
+            pending = MigrationRunner().pending()
+            status = {'ok': not pending, 'pending_migrations': [m.version for m in pending]}
+        except Exception as e:
+            logger.warning("Readiness database check failed: %s", e)
+            status = {'ok': False, 'error': 'database unreachable'}
+        _readiness.update(checked_at=now, database=status)
+    return _readiness['database']
+
+
+@app.route('/ready')
+def ready():
+    """
+    Readiness probe: 200 only when this worker can serve real traffic.
+
+    Unlike nginx's static /health, this checks the database (and that the
+    schema is current) and the Visual Crossing config every page needs.
+    Job queue saturation and the Anthropic key only affect the LLM
+    endpoints, so they are reported but don't take the pod out of rotation.
+    """
+    checks = {
+        'database': database_readiness(),
+        'config': {'ok': bool(api_key and base_url)},
+    }
+    healthy = checks['database']['ok'] and checks['config']['ok']
+    checks['queues'] = {}
+    for q in (fashion_jobs, sms_jobs):
+        depth = q.stats()['depth']
+        checks['queues'][q.name] = {'depth': depth, 'max_depth': q.max_depth, 'saturated': depth >= q.max_depth}
+    checks['anthropic'] = {'configured': bool(anthropic_api_key)}
+    return jsonify({'ready': healthy, 'checks': checks}), 200 if healthy else 503
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -134,20 +312,24 @@ def otp_login():
     if not phone_number:
         return jsonify({"error": "Phone number is required"}), 400
 
+    # Every path below can send an SMS; throttle per phone and per IP first
+    decision = send_limiter.hit(phone_number, client_ip())
+    if decision['outcome'] != ALLOWED:
+        return send_refused(decision, phone_number)
+
     # Handle Twilio vs Cognito differently
     if OTP_PROVIDER == 'twilio':
-        # Twilio: Just send OTP
-        result = otp_auth.send_otp(phone_number)
+        # Twilio: Send OTP in the background; delivery failures are logged on the job
+        busy = dispatch_code(otp_auth.send_otp, phone_number, decision)
+        if busy:
+            return busy
 
-        if result['success']:
-            session['pending_phone'] = phone_number
-            return jsonify({
-                "success": True,
-                "requires_verification": True,
-                "message": "Verification code sent to your phone"
-            }), 200
-        else:
-            return jsonify({"error": result.get('error_message', 'Failed to send OTP')}), 400
+        session['pending_phone'] = phone_number
+        return jsonify({
+            "success": True,
+            "requires_verification": True,
+            "message": "Verification code sent to your phone"
+        }), 200
 
     else:
         # Cognito: Sign in with password
@@ -318,18 +500,23 @@ def otp_resend():
     if not phone_number:
         return jsonify({"error": "No pending verification"}), 400
 
+    decision = send_limiter.hit(phone_number, client_ip())
+    if decision['outcome'] != ALLOWED:
+        response = jsonify({"error": "Please wait before requesting another code."})
+        response.headers['Retry-After'] = str(decision['retry_after'])
+        return response, 429
+
     if OTP_PROVIDER == 'twilio':
-        result = otp_auth.resend_otp(phone_number)
+        busy = dispatch_code(otp_auth.resend_otp, phone_number, decision)
     else:
-        result = otp_auth.resend_confirmation_code(phone_number)
+        busy = dispatch_code(otp_auth.resend_confirmation_code, phone_number, decision)
+    if busy:
+        return busy
 
-    if result['success']:
-        return jsonify({
-            "success": True,
-            "message": "Verification code resent"
-        }), 200
-    else:
-        return jsonify({"error": result['error_message']}), 400
+    return jsonify({
+        "success": True,
+        "message": "Verification code resent"
+    }), 200
 
 
 @app.route('/otp/logout')
@@ -349,7 +536,24 @@ def otp_logout():
 # API
 
 ## Hourly Data Endpoint
+def fetch_forecast(query_location):
+    """Fetch a location from Visual Crossing, process it and write it to the cache"""
+    endpoint = f'{query_location}?unitGroup=us&include=days%2Chours%2Calerts%2Ccurrent'
+    data = api_client.fetch_data(endpoint)
+    with span('process'):
+        hourly_data_result = get_hourly_data(data, datetime, hours=FORECAST_HOURS)
+    forecast_store.put(query_location, hourly_data_result)
+
+    # Cache the result (non-fatal if it fails)
+    try:
+        cache_data(query_location, hourly_data_result)
+    except Exception as e:
+        logger.error("Cache write failed for location=%s: %s", query_location, e, exc_info=True)
+    return hourly_data_result
+
+
 @app.route('/api/hourly-data')
+@bulkheads.guard('forecast')
 def hourly_data():
     from flask import request
     import requests
@@ -363,28 +567,22 @@ def hourly_data():
         # Use default location
         query_location = location
 
+    location_counter.hit(query_location)
+
     # Check cache first
     try:
         cached = get_cached_data(query_location)
         if cached:
             logger.info("Cache hit for location=%s", query_location)
-            return jsonify(cached)
+            forecast_store.put(query_location, cached)
+            return jsonify(cached[:CHART_HOURS])
     except Exception as e:
         logger.error("Cache read failed for location=%s: %s", query_location, e, exc_info=True)
 
     # Fetch from API if not cached
     try:
-        endpoint = f'{query_location}?unitGroup=us&include=days%2Chours%2Calerts%2Ccurrent'
-        data = api_client.fetch_data(endpoint)
-        hourly_data_result = get_hourly_data(data, datetime)
-
-        # Cache the result (non-fatal if it fails)
-        try:
-            cache_data(query_location, hourly_data_result)
-        except Exception as e:
-            logger.error("Cache write failed for location=%s: %s", query_location, e, exc_info=True)
-
-        return jsonify(hourly_data_result)
+        hourly_data_result = forecast_fetches.do(query_location, lambda: fetch_forecast(query_location))
+        return jsonify(hourly_data_result[:CHART_HOURS])
     except requests.exceptions.HTTPError as e:
         logger.error("Weather API HTTP error for location=%s status=%s: %s",
                       query_location, e.response.status_code, e, exc_info=True)
@@ -395,19 +593,21 @@ def hourly_data():
         logger.error("Unexpected error for location=%s: %s", query_location, e, exc_info=True)
         return jsonify({"error": "An unexpected error occurred. Please try again."}), 500
 
+SUGGESTIONS_SCHEMA = compile_schema({
+    "summary": str,
+    "outfit": [{"item": str, "description": str, "reason": str}],
+    "accessories": [{"item": str, "reason": str}],
+    "tips": [str],
+})
+
+
 def parse_claude_suggestions(raw_response):
     """Parse Claude's response into a clean suggestions object.
-    Handles markdown code fences and validates the expected structure."""
-    cleaned = raw_response.strip()
-
-    # Strip markdown code fences
-    if cleaned.startswith("```"):
-        cleaned = cleaned.split("\n", 1)[1]
-        cleaned = cleaned.rsplit("```", 1)[0].strip()
+    Finds the JSON inside prose or code fences, recovers output truncated at
+    max_tokens, and normalizes it to the expected structure."""
+    data, recovered = extract_json_object(raw_response)
 
-    try:
-        data = json.loads(cleaned)
-    except json.JSONDecodeError:
+    if data is None:
         logger.warning("Claude returned non-JSON response")
         return {
             "summary": raw_response,
@@ -416,69 +616,15 @@ def parse_claude_suggestions(raw_response):
             "tips": []
         }
 
-    # Normalize into a consistent shape
-    return {
-        "summary": data.get("summary", ""),
-        "outfit": [
-            {
-                "item": item.get("item", ""),
-                "description": item.get("description", ""),
-                "reason": item.get("reason", "")
-            }
-            for item in data.get("outfit", [])
-        ],
-        "accessories": [
-            {
-                "item": acc.get("item", ""),
-                "reason": acc.get("reason", "")
-            }
-            for acc in data.get("accessories", [])
-        ],
-        "tips": data.get("tips", [])
-    }
-
-
-## Fashion Suggestions Endpoint
-@app.route('/api/fashion-suggestions', methods=['POST'])
-def fashion_suggestions():
-    from flask import request
-    from werkzeug.utils import secure_filename
-
-    if not anthropic_client:
-        return jsonify({"error": "Claude API not configured. Please set ANTHROPIC_API_KEY environment variable."}), 500
-
-    if 'image' not in request.files:
-        return jsonify({"error": "No image part in the request"}), 400
-
-    file = request.files['image']
-    if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
-
-    # Get weather data from form
-    weather_data_str = request.form.get('weather_data')
-    if not weather_data_str:
-        return jsonify({"error": "No weather data provided"}), 400
-
-    try:
-        weather_data = json.loads(weather_data_str)
-    except json.JSONDecodeError:
-        return jsonify({"error": "Invalid weather data format"}), 400
+    if recovered:
+        logger.info("Recovered truncated Claude suggestions response")
 
-    # Read and encode the image
-    image_data = file.read()
-    image_base64 = base64.standard_b64encode(image_data).decode('utf-8')
+    # Normalize into a consistent shape
+    return SUGGESTIONS_SCHEMA(data)
 
-    # Determine media type
-    file_extension = file.filename.rsplit('.', 1)[-1].lower()
-    media_type_map = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'webp': 'image/webp'
-    }
-    media_type = media_type_map.get(file_extension, 'image/jpeg')
 
+def get_fashion_suggestions(image_base64, media_type, weather_data, user_ref=None):
+    """Ask Claude for an outfit from a closet photo; returns parsed suggestions"""
     # Create weather summary
     weather_summary = f"""
 Current Weather Conditions:
@@ -492,9 +638,11 @@ Current Weather Conditions:
 """
 
     # Call Claude API with vision
+    model = "claude-sonnet-4-5"
+    started = time.perf_counter()
     try:
         message = anthropic_client.messages.create(
-            model="claude-sonnet-4-5",
+            model=model,
             max_tokens=2048,
             messages=[
                 {
@@ -546,83 +694,139 @@ Rules:
                 }
             ],
         )
+    except Exception as e:
+        usage_ledger.record('fashion-suggestions', model, None, time.perf_counter() - started,
+                            user_ref=user_ref, error=type(e).__name__)
+        raise
+
+    usage_ledger.record('fashion-suggestions', message.model, message.usage,
+                        time.perf_counter() - started, user_ref=user_ref)
+    logger.info("Claude API response received, usage=%s", message.usage)
+    if message.stop_reason == "max_tokens":
+        logger.warning("Fashion suggestions hit max_tokens; attempting truncation recovery")
+    raw_response = message.content[0].text
+
+    return parse_claude_suggestions(raw_response)
+
+
+def run_fashion_job(image_base64, media_type, weather_data, user_ref=None):
+    """
+    Job body for the async mode; result is what the sync endpoint returns.
+
+    Holds the same llm/fashion slots as the sync path so job threads stay under
+    the pod-wide cap, waiting up to FASHION_JOB_SLOT_WAIT seconds for one; if
+    none frees up the job fails without calling the model.
+    """
+    try:
+        with bulkheads.slot('llm', 'fashion', wait=FASHION_JOB_SLOT_WAIT):
+            suggestions = get_fashion_suggestions(image_base64, media_type, weather_data, user_ref)
+    except BulkheadFull:
+        raise RuntimeError("we're busy right now, please try again shortly")
+    return {
+        "suggestions": suggestions,
+        "weather": weather_data
+    }
+
+
+## Fashion Suggestions Endpoint
+@app.route('/api/fashion-suggestions', methods=['POST'])
+def fashion_suggestions():
+    from flask import request
+    from werkzeug.utils import secure_filename
+
+    if not anthropic_client:
+        return jsonify({"error": "Claude API not configured. Please set ANTHROPIC_API_KEY environment variable."}), 500
+
+    if 'image' not in request.files:
+        return jsonify({"error": "No image part in the request"}), 400
+
+    file = request.files['image']
+    if file.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    # Get weather data from form
+    weather_data_str = request.form.get('weather_data')
+    if not weather_data_str:
+        return jsonify({"error": "No weather data provided"}), 400
+
+    try:
+        weather_data = json.loads(weather_data_str)
+    except json.JSONDecodeError:
+        return jsonify({"error": "Invalid weather data format"}), 400
 
-        logger.info("Claude API response received, usage=%s", message.usage)
-        raw_response = message.content[0].text
+    # Read and encode the image
+    image_data = file.read()
+    image_base64 = base64.standard_b64encode(image_data).decode('utf-8')
 
-        suggestions = parse_claude_suggestions(raw_response)
+    # Determine media type
+    file_extension = file.filename.rsplit('.', 1)[-1].lower()
+    media_type_map = {
+        'jpg': 'image/jpeg',
+        'jpeg': 'image/jpeg',
+        'png': 'image/png',
+        'gif': 'image/gif',
+        'webp': 'image/webp'
+    }
+    media_type = media_type_map.get(file_extension, 'image/jpeg')
+    user_ref = (g.user or {}).get('phone_number')
 
+    # Job mode: enqueue and let the client poll, so no sync worker waits on the vision call
+    if request.args.get('mode') == 'async':
+        try:
+            job_id = fashion_jobs.submit(run_fashion_job, image_base64, media_type, weather_data, user_ref)
+        except QueueFullError as e:
+            logger.warning("Fashion job rejected: %s", e)
+            response = jsonify({"error": "We're busy right now. Please try again shortly."})
+            response.headers['Retry-After'] = '10'
+            return response, 503
         return jsonify({
-            "suggestions": suggestions,
-            "weather": weather_data
-        }), 200
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": url_for('fashion_job_status', job_id=job_id)
+        }), 202
 
-    except Exception as e:
-        logger.error("Claude API call failed: %s", e, exc_info=True)
-        return jsonify({"error": f"Failed to get fashion suggestions: {str(e)}"}), 500
+    with bulkheads.slot('llm', 'fashion'):
+        try:
+            suggestions = get_fashion_suggestions(image_base64, media_type, weather_data, user_ref)
 
+            return jsonify({
+                "suggestions": suggestions,
+                "weather": weather_data
+            }), 200
 
-## Polar Wear Chat Endpoint
+        except Exception as e:
+            logger.error("Claude API call failed: %s", e, exc_info=True)
+            return jsonify({"error": f"Failed to get fashion suggestions: {str(e)}"}), 500
 
-CHAT_TOOLS = [
-    {
-        "name": "get_forecast",
-        "description": (
-            "Get the weather forecast for the user's saved location at a specific hour offset. "
-            "Use this when the user asks about conditions later today, tonight, or tomorrow."
-        ),
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "hours_ahead": {
-                    "type": "integer",
-                    "description": "Hours from now. 0 = right now, 3 = 3 hours from now, 24 = same time tomorrow.",
-                    "minimum": 0,
-                    "maximum": 48,
-                }
-            },
-            "required": ["hours_ahead"],
-        },
-    },
-    {
-        "name": "search_clothing_knowledge",
-        "description": (
-            "Semantic search over a knowledge base of clothing, fabrics, layering, and activity-specific gear. "
-            "Use for questions where basic rules aren't enough: fabric breathability, cold-weather running gear, "
-            "wet-weather layering, sport-specific recommendations, etc."
-        ),
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "Natural-language question about clothing, fabrics, or gear.",
-                },
-                "top_k": {"type": "integer", "default": 3, "minimum": 1, "maximum": 5},
-            },
-            "required": ["query"],
-        },
-    },
-]
-
-
-def dispatch_chat_tool(name, tool_input, zipcode):
-    if name == "get_forecast":
-        hours_ahead = int(tool_input.get("hours_ahead", 0))
-        cached = get_cached_data(zipcode) if zipcode else None
-        if not cached:
-            return {"error": "No forecast data available. The user may need to refresh the page."}
-        idx = min(hours_ahead, len(cached) - 1)
-        return cached[idx]
-
-    if name == "search_clothing_knowledge":
-        return {
-            "results": [],
-            "note": "Knowledge base not yet indexed. Answer from general knowledge for now.",
-        }
 
-    return {"error": f"Unknown tool: {name}"}
+@app.route('/api/fashion-suggestions/jobs/<job_id>')
+def fashion_job_status(job_id):
+    job = fashion_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
 
+    if job['status'] == 'done':
+        return jsonify({"status": "done", **(job['result'] or {})}), 200
+    if job['status'] == 'failed':
+        return jsonify({"status": "failed", "error": f"Failed to get fashion suggestions: {job['error']}"}), 500
+    return jsonify({"status": job['status']}), 202
+
+
+@app.route('/api/fashion-suggestions/queue')
+def fashion_queue_stats():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(fashion_jobs.stats())
+
+
+@app.route('/api/bulkheads')
+def bulkhead_stats():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(bulkheads.stats())
+
+
+## Polar Wear Chat Endpoint
 
 def build_chat_system_prompt(weather, suggestions):
     parts = [
@@ -653,13 +857,21 @@ def build_chat_system_prompt(weather, suggestions):
                 "Reference this outfit when relevant — don't re-suggest a whole new one unless asked."
             )
 
+    guidance = guidance_store.for_entry(weather)
+    if guidance:
+        parts.append(
+            "\nGeneral guidance for these conditions (precomputed):\n"
+            f"- {guidance.get('summary', '')}\n"
+            f"- Layers: {', '.join(guidance.get('layers', []))}\n"
+            f"- Tips: {' '.join(guidance.get('tips', []))}"
+        )
+
     return "\n".join(parts)
 
 
 @app.route('/api/chat', methods=['POST'])
+@login_required
 def chat():
-    if not session.get('logged_in'):
-        return jsonify({"error": "Login required"}), 401
     if not anthropic_client:
         return jsonify({"error": "Claude API not configured."}), 500
 
@@ -672,47 +884,171 @@ def chat():
     if not history or history[-1].get('role') != 'user':
         return jsonify({"error": "Last message must be from user"}), 400
 
+    # Simple questions are answered from the forecast without calling Claude
+    try:
+        with span('chat.rules'):
+            forecast = load_forecast(zipcode)
+            fast_reply = rules_engine.answer(history[-1].get('content'), forecast,
+                                             guidance_lookup=guidance_store.for_entry)
+        if fast_reply:
+            return jsonify({"reply": fast_reply})
+    except Exception as e:
+        logger.error("Rules fast path failed, falling back to Claude: %s", e, exc_info=True)
+
     system_prompt = build_chat_system_prompt(weather, suggestions)
     messages = [{"role": m["role"], "content": m["content"]} for m in history]
 
+    # Only the Claude path holds an LLM slot; rules answers above stay cheap
+    with bulkheads.slot('llm', 'chat'):
+        try:
+            MAX_TURNS = 6
+            response = None
+            tool_session = ChatToolSession(zipcode)
+            # Tier is picked once per chat turn; tool-result turns stay on it so
+            # thinking blocks remain valid across the tool loop
+            tier = model_router.choose(extract_features(history))
+            user = session.get('user') or {}
+            request_id = uuid.uuid4().hex
+            for tool_turns in range(MAX_TURNS):
+                # Keep the transcript under the token budget; older turns become a summary
+                with span('chat.compact'):
+                    turn_system, turn_messages = history_manager.compact(system_prompt, messages)
+                with span('llm.turn', turn=tool_turns) as s:
+                    # The router writes a usage ledger row for every attempt, failed ones included
+                    response, tier = model_router.create(
+                        anthropic_client,
+                        tier,
+                        usage_context={'endpoint': 'chat', 'tool_turns': tool_turns,
+                                       'user_ref': user.get('phone_number'),
+                                       'session_ref': user.get('session_token'), 'request_id': request_id},
+                        system=turn_system,
+                        tools=CHAT_TOOLS,
+                        messages=turn_messages,
+                    )
+                    s.set(model=response.model, stop_reason=response.stop_reason,
+                          input_tokens=response.usage.input_tokens, output_tokens=response.usage.output_tokens)
+                messages.append({"role": "assistant", "content": response.content})
+
+                if response.stop_reason != "tool_use":
+                    break
+
+                tool_uses = [block for block in response.content if block.type == "tool_use"]
+                with span('chat.tools', tools=[block.name for block in tool_uses]):
+                    tool_results = tool_session.run(tool_uses)
+                messages.append({"role": "user", "content": tool_results})
+
+            reply = "".join(b.text for b in response.content if b.type == "text")
+            logger.info("Polar Wear chat reply, tier=%s usage=%s", tier, response.usage)
+            return jsonify({"reply": reply})
+
+        except anthropic.APIStatusError as e:
+            logger.error("Claude chat API error status=%s: %s", e.status_code, e, exc_info=True)
+            return jsonify({"error": "Chat failed. Please try again."}), 500
+        except Exception as e:
+            logger.error("Unexpected chat error: %s", e, exc_info=True)
+            return jsonify({"error": "Chat failed."}), 500
+
+
+@app.route('/api/chat/routing-stats')
+def chat_routing_stats():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "models": model_router.stats(),
+        "rules_fast_path": rules_engine.stats,
+    })
+
+
+## LLM Usage Endpoints (admin)
+@app.route('/api/usage/summary')
+def usage_summary_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
     try:
-        MAX_TURNS = 6
-        response = None
-        for _ in range(MAX_TURNS):
-            response = anthropic_client.messages.create(
-                model="claude-opus-4-7",
-                max_tokens=2048,
-                thinking={"type": "adaptive"},
-                system=system_prompt,
-                tools=CHAT_TOOLS,
-                messages=messages,
-            )
-            messages.append({"role": "assistant", "content": response.content})
-
-            if response.stop_reason != "tool_use":
-                break
-
-            tool_results = []
-            for block in response.content:
-                if block.type == "tool_use":
-                    result = dispatch_chat_tool(block.name, block.input, zipcode)
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": json.dumps(result),
-                    })
-            messages.append({"role": "user", "content": tool_results})
-
-        reply = "".join(b.text for b in response.content if b.type == "text")
-        logger.info("Polar Wear chat reply, usage=%s", response.usage)
-        return jsonify({"reply": reply})
-
-    except anthropic.APIStatusError as e:
-        logger.error("Claude chat API error status=%s: %s", e.status_code, e, exc_info=True)
-        return jsonify({"error": "Chat failed. Please try again."}), 500
+        hours = float(request.args.get('hours', 24))
+        if not math.isfinite(hours):
+            raise ValueError(hours)
+        hours = min(max(hours, 1), 720)
+    except ValueError:
+        return jsonify({"error": "hours must be a number"}), 400
+    endpoint = request.args.get('endpoint')
+    try:
+        return jsonify({
+            "window_hours": hours,
+            "by_model": usage_summary(hours, endpoint),
+            "chat_requests": request_latency_summary(hours),
+            "unflushed_dropped": usage_ledger.dropped,
+        })
+    except Exception as e:
+        logger.error("Usage summary query failed: %s", e, exc_info=True)
+        return jsonify({"error": "Usage summary unavailable"}), 500
+
+
+@app.route('/api/usage/users')
+def usage_users_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 90)
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    try:
+        return jsonify({"days": days, "rows": tokens_per_user_per_day(days)})
+    except Exception as e:
+        logger.error("Usage per-user query failed: %s", e, exc_info=True)
+        return jsonify({"error": "Usage summary unavailable"}), 500
+
+
+## Profiling Endpoints (admin)
+@app.route('/api/admin/profiles', methods=['GET', 'POST'])
+def profiles_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    if not request_profiler.enabled:
+        return jsonify({"error": "Profiler is disabled (set PROFILER_ENABLED=true)"}), 404
+
+    try:
+        if request.method == 'GET':
+            return jsonify({"sessions": request_profiler.sessions()})
+
+        data = request.get_json(silent=True) or {}
+        route = data.get('route')
+        if route not in {rule.rule for rule in app.url_map.iter_rules()}:
+            return jsonify({"error": f"Unknown route: {route}"}), 400
+        try:
+            requests_wanted = min(max(int(data.get('requests', 20)), 1), 500)
+            interval_ms = min(max(int(data.get('interval_ms', 5)), 1), 100)
+            ttl_minutes = min(max(int(data.get('ttl_minutes', 30)), 1), 1440)
+        except (TypeError, ValueError):
+            return jsonify({"error": "requests, interval_ms and ttl_minutes must be integers"}), 400
+
+        profile = request_profiler.arm(route, requests_wanted, interval_ms, ttl_minutes)
+        logger.info("Profiling armed for %s: %d requests every %dms", route, requests_wanted, interval_ms)
+        return jsonify(profile), 201
+    except Exception as e:
+        logger.error("Profiler request failed: %s", e, exc_info=True)
+        return jsonify({"error": "Profiler unavailable"}), 500
+
+
+@app.route('/api/admin/profiles/<int:session_id>/stacks')
+def profile_stacks_endpoint(session_id):
+    """Collapsed stacks for flamegraph.pl or speedscope"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    if not request_profiler.enabled:
+        return jsonify({"error": "Profiler is disabled (set PROFILER_ENABLED=true)"}), 404
+
+    try:
+        profile = request_profiler.collapsed(session_id)
     except Exception as e:
-        logger.error("Unexpected chat error: %s", e, exc_info=True)
-        return jsonify({"error": "Chat failed."}), 500
+        logger.error("Profile download failed for session %s: %s", session_id, e, exc_info=True)
+        return jsonify({"error": "Profiler unavailable"}), 500
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return app.response_class(profile, mimetype='text/plain', headers={
+        'Content-Disposition': f'attachment; filename="profile-{session_id}.folded"'})
 
 
 if __name__ == '__main__':
@@ -158,17 +158,19 @@ async function handleFormSubmit(event) {
     formData.append('weather_data', JSON.stringify(currentWeatherData[0]));
 
     try {
-        const response = await fetch(fashionApiUrl, {
+        const response = await fetch(`${fashionApiUrl}?mode=async`, {
             method: 'POST',
             body: formData
         });
 
-        const result = await response.json();
+        const job = await response.json();
 
         if (!response.ok) {
-            throw new Error(result.error || 'Failed to get fashion suggestions');
+            throw new Error(job.error || 'Failed to get fashion suggestions');
         }
 
+        const result = await pollFashionJob(job.status_url);
+
         // Display suggestions
         displaySuggestions(result.suggestions);
     } catch (error) {
@@ -181,6 +183,25 @@ async function handleFormSubmit(event) {
     }
 }
 
+// Poll a queued fashion suggestions job until it finishes
+async function pollFashionJob(statusUrl, intervalMs = 1500, timeoutMs = 120000) {
+    const deadline = Date.now() + timeoutMs;
+
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+
+        const response = await fetch(statusUrl);
+        const result = await response.json();
+
+        if (result.status === 'done') return result;
+        if (!response.ok && response.status !== 202) {
+            throw new Error(result.error || 'Failed to get fashion suggestions');
+        }
+    }
+
+    throw new Error('Fashion suggestions are taking too long. Please try again.');
+}
+
 // Display fashion suggestions
 function displaySuggestions(suggestions) {
     const container = document.getElementById('suggestions-container');
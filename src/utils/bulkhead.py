@@ -0,0 +1,238 @@
+"""
+Bulkheads
+Concurrency caps per capacity pool ('llm', 'forecast') and per route, so slow
+Anthropic calls can't occupy every gunicorn worker while forecast requests,
+normally a millisecond cache hit, queue behind them. A request that would go
+over a cap is shed straight away with 503 and Retry-After instead of waiting.
+
+Sync workers serve one request each, so a per-process semaphore would never
+refuse anything: the count has to be pod-wide. Every admitted request holds
+a slot in a small table in a shared file (BULKHEAD_STATE_FILE, set per master
+in gunicorn.conf.py); each process maps it and takes an flock around the
+check-and-claim. Slots left by a worker that died mid-request are cleared by
+gunicorn's child_exit hook, and re-checked whenever a cap looks full.
+
+In-flight counts and rejections are exported as Prometheus metrics.
+"""
+
+import os
+import time
+import fcntl
+import mmap
+import struct
+import logging
+import tempfile
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from flask import jsonify
+
+from utils.metrics import BULKHEAD_IN_FLIGHT, BULKHEAD_REJECTIONS
+
+logger = logging.getLogger('weather-app.bulkhead')
+
+# pid, bitmask of the bulkheads held, wall-clock admission time
+SLOT = struct.Struct('<iId')
+# Admitted requests the table can hold pod-wide; room for the gevent worker's concurrency
+MAX_SLOTS = int(os.getenv('BULKHEAD_SLOTS', '1024'))
+MAX_BULKHEADS = 32
+# How often slot(wait=...) re-checks a full bulkhead
+WAIT_POLL_SECONDS = 0.5
+
+
+class BulkheadFull(Exception):
+    """Raised on admission when a bulkhead is at its limit"""
+
+    def __init__(self, name, limit, retry_after):
+        super().__init__(f"Bulkhead '{name}' is full ({limit} in flight)")
+        self.name = name
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class Bulkheads:
+    """Named concurrency limits shared by every process using the same state file"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('BULKHEAD_STATE_FILE') or os.path.join(
+            tempfile.gettempdir(), f"weather-app-bulkheads-{os.getpid()}")
+        self._limits = {}
+        self._pid = None
+        self._fd = None
+        self._map = None
+        # flock doesn't exclude threads sharing one descriptor
+        self._lock = threading.Lock()
+
+    def register(self, name, limit, retry_after=5):
+        """
+        Declare a bulkhead
+
+        Args:
+            name: Pool or route name
+            limit: Most requests holding it at once across the pod (0 = uncapped, still counted)
+            retry_after: Seconds suggested to shed clients
+        """
+        if name not in self._limits and len(self._limits) >= MAX_BULKHEADS:
+            raise ValueError(f"At most {MAX_BULKHEADS} bulkheads")
+        index = self._limits[name]['index'] if name in self._limits else len(self._limits)
+        self._limits[name] = {'index': index, 'limit': max(0, int(limit)), 'retry_after': int(retry_after)}
+
+    def _ensure_open(self):
+        # Each process needs its own descriptor; an flock on an inherited one is shared with the parent
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = SLOT.size * MAX_SLOTS
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._ensure_open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _records(self):
+        return list(SLOT.iter_unpack(self._map[:SLOT.size * MAX_SLOTS]))
+
+    def _counts(self, records):
+        counts = {}
+        for name, spec in self._limits.items():
+            bit = 1 << spec['index']
+            counts[name] = sum(1 for pid, mask, _ in records if pid and mask & bit)
+        return counts
+
+    def _over(self, names, counts):
+        for name in names:
+            spec = self._limits[name]
+            if spec['limit'] and counts[name] >= spec['limit']:
+                return name
+        return None
+
+    def _clear(self, records, dead):
+        for i, (pid, _, _) in enumerate(records):
+            if pid in dead:
+                SLOT.pack_into(self._map, i * SLOT.size, 0, 0, 0.0)
+        return [(0, 0, 0.0) if r[0] in dead else r for r in records]
+
+    def _prune(self, records):
+        """Free slots whose process is gone (caller holds the lock)"""
+        dead = set()
+        for pid in {pid for pid, _, _ in records if pid}:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                dead.add(pid)
+            except PermissionError:
+                pass
+        if dead:
+            logger.warning("Freed bulkhead slots held by exited pids %s", sorted(dead))
+            records = self._clear(records, dead)
+        return records
+
+    def _acquire(self, names):
+        mask = 0
+        for name in names:
+            mask |= 1 << self._limits[name]['index']
+        with self._locked():
+            records = self._records()
+            full = self._over(names, self._counts(records))
+            if full:
+                records = self._prune(records)
+                full = self._over(names, self._counts(records))
+            free = next((i for i, (pid, _, _) in enumerate(records) if not pid), None)
+            if free is None:
+                full = full or names[0]
+            if full:
+                spec = self._limits[full]
+                raise BulkheadFull(full, spec['limit'] or MAX_SLOTS, spec['retry_after'])
+            SLOT.pack_into(self._map, free * SLOT.size, os.getpid(), mask, time.time())
+        return free
+
+    def _release(self, index):
+        with self._locked():
+            SLOT.pack_into(self._map, index * SLOT.size, 0, 0, 0.0)
+
+    def release_pid(self, pid):
+        """Free every slot a process held; for gunicorn's child_exit"""
+        with self._locked():
+            self._clear(self._records(), {pid})
+
+    @contextmanager
+    def slot(self, *names, wait=0):
+        """
+        Hold one slot in each named bulkhead for the duration of the block
+
+        Args:
+            *names: Bulkheads to hold a slot in
+            wait (float): Seconds to keep retrying while one is full. Requests
+                are shed at once (0); background jobs have no client to shed to
+
+        Raises:
+            BulkheadFull: If any of them is still at its limit; nothing is held
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                index = self._acquire(names)
+                break
+            except BulkheadFull as e:
+                if time.monotonic() + WAIT_POLL_SECONDS > deadline:
+                    BULKHEAD_REJECTIONS.labels(e.name).inc()
+                    # INFO so a spike of rejections is rate-limited in the log pipe
+                    logger.info("Shed request: %s", e)
+                    raise
+            time.sleep(WAIT_POLL_SECONDS)
+        for name in names:
+            BULKHEAD_IN_FLIGHT.labels(name).inc()
+        try:
+            yield
+        finally:
+            self._release(index)
+            for name in names:
+                BULKHEAD_IN_FLIGHT.labels(name).dec()
+
+    def guard(self, *names):
+        """Decorator form of slot() for a whole view"""
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                with self.slot(*names):
+                    return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+    def stats(self):
+        """Pod-wide in-flight count, limit and oldest admission age per bulkhead"""
+        with self._locked():
+            records = self._records()
+        now = time.time()
+        stats = {}
+        for name, spec in self._limits.items():
+            bit = 1 << spec['index']
+            held = [since for pid, mask, since in records if pid and mask & bit]
+            stats[name] = {
+                'in_flight': len(held),
+                'limit': spec['limit'],
+                'oldest_seconds': round(now - min(held), 1) if held else None,
+            }
+        return stats
+
+    def init_app(self, app):
+        """Turn BulkheadFull into a fast 503 with Retry-After"""
+
+        @app.errorhandler(BulkheadFull)
+        def _shed(e):
+            response = jsonify({"error": "We're busy right now. Please try again shortly."})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+
+
+# Global bulkheads instance
+bulkheads = Bulkheads()
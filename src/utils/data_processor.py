@@ -1,9 +1,15 @@
+import logging
+
+logger = logging.getLogger('weather-app.data')
+
+
 ## If its 2025-12-14 19:40, only return hours from 2025-12-14 20:00 to 2025-12-15 19:00
-def get_hourly_data(data, current_date):
-        """Extract hourly data from Visual Crossing API response"""
+def get_hourly_data(data, current_date, hours=24):
+        """Extract the next `hours` hours from Visual Crossing API response"""
         from datetime import datetime, timezone, timedelta
 
         hourly_list = []
+        skipped = 0
 
         # Get timezone offset from API response
         tzoffset = data.get('tzoffset', 0)
@@ -32,25 +38,30 @@ def get_hourly_data(data, current_date):
 
                             # Skip hours up to and including current datetime
                             if full_datetime <= current_datetime:
-                                print(f"Skipping past hour: {full_datetime}")
+                                skipped += 1
                                 continue
 
 
-                        # Stop once we have 24 hours
-                        if len(hourly_list) >= 24:
+                        # Stop once we have enough hours
+                        if len(hourly_list) >= hours:
                             break
 
                         # print(f"Adding hour: day_date={day_date}, hour_time={hour_time}")
                         hourly_list.append({
                             'datetime': hour.get('datetime'),
+                            'datetimeEpoch': hour.get('datetimeEpoch'),
                             'temp': hour.get('temp'),
                             'humidity': hour.get('humidity'),
                             'conditions': hour.get('conditions'),
                             'windspeed': hour.get('windspeed'),
-                            'precip': hour.get('precip')
+                            'precip': hour.get('precip'),
+                            'precipprob': hour.get('precipprob'),
+                            'feelslike': hour.get('feelslike'),
+                            'uvindex': hour.get('uvindex')
                         })
-                if len(hourly_list) >= 24:
+                if len(hourly_list) >= hours:
                     break
 
+        logger.debug("Extracted %d hours, skipped %d past hours", len(hourly_list), skipped)
         return hourly_list
 
@@ -0,0 +1,216 @@
+"""
+Hourly Forecast Accessor
+Looks up cached hourly entries by absolute epoch hour and summarizes ranges,
+served from process memory so chat tool calls don't hit the database.
+
+Loads are coalesced per location (SingleFlight): under the gevent worker many
+requests for one location can miss at once, and only the first should go to
+the database or Visual Crossing while the rest wait for its result.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+SECONDS_PER_HOUR = 3600
+
+# Numeric fields summarized by HourlyForecast.summarize
+SUMMARY_FIELDS = ('temp', 'humidity', 'windspeed', 'precip')
+
+
+class HourlyForecast:
+    """Hourly entries from get_hourly_data indexed by epoch hour"""
+
+    def __init__(self, entries):
+        self.entries = entries or []
+        self.by_hour = {}
+        for entry in self.entries:
+            epoch = entry.get('datetimeEpoch')
+            if epoch is not None:
+                self.by_hour[int(epoch) // SECONDS_PER_HOUR] = entry
+        self.hours = sorted(self.by_hour)
+        # Entries cached before datetimeEpoch was stored can only be read positionally
+        self.positional = not self.hours and bool(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _target_hour(self, hours_ahead, now):
+        return int(now if now is not None else time.time()) // SECONDS_PER_HOUR + hours_ahead
+
+    def at(self, hours_ahead, now=None):
+        """
+        Entry for the hour that is hours_ahead from now
+
+        Args:
+            hours_ahead (int): Hours from now; 0 is the current hour
+            now (float, optional): Epoch seconds to resolve against
+
+        Returns:
+            dict: The forecast entry, or None when the hour isn't covered
+        """
+        if self.positional:
+            return self.entries[hours_ahead] if 0 <= hours_ahead < len(self.entries) else None
+
+        target = self._target_hour(hours_ahead, now)
+        entry = self.by_hour.get(target)
+        # The current hour is skipped at ingest, so "right now" maps to the next one
+        if entry is None and self.hours and target < self.hours[0] and self.hours[0] - target <= 1:
+            entry = self.by_hour[self.hours[0]]
+        return entry
+
+    def window(self, hours_ahead, count, now=None):
+        """Entries for count consecutive hours starting hours_ahead from now"""
+        if self.positional:
+            return self.entries[max(hours_ahead, 0):max(hours_ahead, 0) + count]
+
+        start = self._target_hour(hours_ahead, now)
+        if self.hours and start < self.hours[0] and self.hours[0] - start <= 1:
+            start = self.hours[0]
+        return [self.by_hour[h] for h in range(start, start + count) if h in self.by_hour]
+
+    def summarize(self, hours_ahead, count, now=None):
+        """
+        Min/max/mean of the numeric fields over a window, in one pass
+
+        Args:
+            hours_ahead (int): Hours from now where the window starts
+            count (int): Window length in hours
+            now (float, optional): Epoch seconds to resolve against
+
+        Returns:
+            dict: Per-field stats, conditions seen and the covered span,
+                or None when no hour in the window is covered
+        """
+        stats = {field: [None, None, 0.0, 0] for field in SUMMARY_FIELDS}
+        conditions = []
+        entries = self.window(hours_ahead, count, now)
+        for entry in entries:
+            for field in SUMMARY_FIELDS:
+                value = entry.get(field)
+                if value is None:
+                    continue
+                s = stats[field]
+                s[0] = value if s[0] is None or value < s[0] else s[0]
+                s[1] = value if s[1] is None or value > s[1] else s[1]
+                s[2] += value
+                s[3] += 1
+            condition = entry.get('conditions')
+            if condition and condition not in conditions:
+                conditions.append(condition)
+
+        if not entries:
+            return None
+
+        return {
+            'from': entries[0].get('datetime'),
+            'to': entries[-1].get('datetime'),
+            'hours': len(entries),
+            'conditions': conditions,
+            **{
+                field: {'min': s[0], 'max': s[1], 'mean': round(s[2] / s[3], 1)}
+                for field, s in stats.items() if s[3]
+            },
+        }
+
+    @property
+    def horizon_hours(self):
+        """Number of future hours covered"""
+        if self.positional:
+            return len(self.entries)
+        return len(self.hours)
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one load; works for threads and greenlets"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, load):
+        """
+        Run load() unless a call for key is already running, then share its outcome
+
+        Args:
+            key: What is being loaded
+            load (callable): Zero-argument loader
+
+        Returns:
+            The loader's result (its exception is raised to every waiter)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = load()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+class ForecastStore:
+    """Per-process memory of HourlyForecast objects keyed by location"""
+
+    def __init__(self, ttl_seconds=None, max_items=None):
+        self.ttl_seconds = ttl_seconds or int(os.getenv('FORECAST_MEMORY_TTL', '300'))
+        self.max_items = max_items or int(os.getenv('FORECAST_MEMORY_MAX_ITEMS', '512'))
+        # Oldest put first; with one TTL for every entry that is also expiry order
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+
+    def put(self, location, entries):
+        """Remember the entries just read from or written to the cache"""
+        forecast = HourlyForecast(entries)
+        now = time.monotonic()
+        with self._lock:
+            self._items[location] = (forecast, now + self.ttl_seconds)
+            self._items.move_to_end(location)
+            # Locations are user-supplied, so drop expired entries and cap the rest
+            while self._items:
+                oldest = next(iter(self._items.values()))
+                if oldest[1] > now and len(self._items) <= self.max_items:
+                    break
+                self._items.popitem(last=False)
+        return forecast
+
+    def get(self, location, loader=None):
+        """
+        Forecast for a location, loading it through loader on a miss
+
+        Args:
+            location (str): Cache key, same as hourly_cache.location
+            loader (callable, optional): Returns the cached entries or None
+
+        Returns:
+            HourlyForecast: The forecast, or None when nothing is cached
+        """
+        with self._lock:
+            item = self._items.get(location)
+        if item and item[1] > time.monotonic():
+            return item[0]
+
+        entries = self._loads.do(location, loader) if loader else None
+        if not entries:
+            return None
+        return self.put(location, entries)
+
+
+# Global forecast store instance
+forecast_store = ForecastStore()
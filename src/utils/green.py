@@ -0,0 +1,58 @@
+"""
+Cooperative Worker Support
+Under GUNICORN_WORKER_CLASS=gevent one worker serves hundreds of requests as
+greenlets, switching whenever a request waits on a socket. gunicorn.conf.py
+monkey-patches the standard library before the app is imported, which makes
+requests, httpx (Anthropic), urllib3 (boto3) and twilio cooperative, along
+with the app's locks, queues and background threads.
+
+psycopg2 is a C extension that waits inside libpq, so it needs a wait
+callback to yield to other greenlets while a query runs; install() sets one.
+Code that has to size itself for greenlet concurrency checks cooperative().
+"""
+
+import logging
+
+logger = logging.getLogger('weather-app.green')
+
+
+def cooperative():
+    """True when the socket module is gevent-patched in this process"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback: poll the connection, yielding to the hub while libpq waits"""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def install():
+    """
+    Make psycopg2 cooperative; call once, after monkey-patching
+
+    Returns:
+        bool: Whether the wait callback was installed
+    """
+    if not cooperative():
+        return False
+    from psycopg2 import extensions
+    extensions.set_wait_callback(gevent_wait_callback)
+    logger.info("psycopg2 wait callback installed for gevent")
+    return True
@@ -0,0 +1,165 @@
+"""
+Tolerant JSON Parsing for Model Output
+Finds the JSON object inside prose or code fences, recovers truncated output
+(max_tokens hit mid-object), and normalizes it against a compiled schema
+"""
+
+import json
+
+_decoder = json.JSONDecoder()
+
+# Give up after this many candidate '{' positions in noisy text
+MAX_CANDIDATES = 8
+# Truncation repair tries this many cut points, latest first
+MAX_REPAIR_ATTEMPTS = 4
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _prune_empty(value):
+    """Drop objects left with no keys (a cut just after '{') from arrays"""
+    if isinstance(value, dict):
+        return {key: _prune_empty(v) for key, v in value.items()}
+    if isinstance(value, list):
+        items = [_prune_empty(v) for v in value]
+        return [v for v in items if v != {}]
+    return value
+
+
+def _repair_truncated(text):
+    """
+    Close a truncated JSON document at its last complete value
+
+    Scans once, remembering each point where everything before it is a
+    complete prefix (after a value-terminating comma, a closing bracket or an
+    opening bracket) together with the bracket stack at that point.
+
+    Cutting just after an opening '{' leaves an empty object (an outfit of
+    [{}] would render as a blank card), so those are dropped from arrays.
+
+    Returns:
+        object: The parsed value, or None if no cut point parses
+    """
+    stack = []
+    safe = []
+    in_string = escape = False
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append(ch)
+            safe.append((i + 1, ''.join(stack)))
+        elif ch in '}]':
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                # Complete document; raw_decode would have handled it
+                return None
+            safe.append((i + 1, ''.join(stack)))
+        elif ch == ',' and stack:
+            safe.append((i, ''.join(stack)))
+
+    for cut, open_brackets in reversed(safe[-MAX_REPAIR_ATTEMPTS:]):
+        candidate = text[:cut].rstrip().rstrip(',') + ''.join(_CLOSERS[b] for b in reversed(open_brackets))
+        try:
+            return _prune_empty(json.loads(candidate))
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def extract_json_object(text):
+    """
+    Find the first JSON object in text
+
+    Args:
+        text (str): Raw model output, possibly wrapped in prose or fences
+
+    Returns:
+        tuple: (dict or None, recovered) where recovered is True when the
+            object had to be repaired after truncation
+    """
+    start = text.find('{')
+    attempts = 0
+    while start != -1 and attempts < MAX_CANDIDATES:
+        attempts += 1
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            # An empty {} carries nothing; keep looking past it
+            if isinstance(value, dict) and value:
+                return value, False
+        except json.JSONDecodeError:
+            # Only an object that never closes is repaired; a closed but
+            # malformed one is prose or garbage and the search moves on
+            value = _repair_truncated(text[start:].rstrip().rstrip('`'))
+            if isinstance(value, dict) and value:
+                return value, True
+        start = text.find('{', start + 1)
+    return None, False
+
+
+def _coerce_str(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    return ""
+
+
+def compile_schema(spec):
+    """
+    Compile a shape spec into a normalizing function
+
+    The spec is built from str (a string field), [spec] (a list of spec),
+    and {key: spec} (an object with those keys). The compiled function never
+    raises: missing fields become "" or [], wrong types are coerced or dropped.
+
+    Args:
+        spec: Shape spec
+
+    Returns:
+        callable: value -> normalized value
+    """
+    if spec is str:
+        return _coerce_str
+
+    if isinstance(spec, list):
+        item = compile_schema(spec[0])
+        item_is_object = isinstance(spec[0], dict)
+
+        def normalize_list(value):
+            if not isinstance(value, list):
+                return []
+            if item_is_object:
+                return [item(v) for v in value if isinstance(v, (dict, str))]
+            return [item(v) for v in value if v is not None]
+        return normalize_list
+
+    if isinstance(spec, dict):
+        fields = [(key, compile_schema(sub)) for key, sub in spec.items()]
+        first_key = fields[0][0]
+
+        def normalize_object(value):
+            if isinstance(value, str):
+                # A bare string where an object was expected names the first field
+                value = {first_key: value}
+            elif not isinstance(value, dict):
+                value = {}
+            # Every normalizer maps a missing (None) field to its empty default
+            return {key: normalize(value.get(key)) for key, normalize in fields}
+        return normalize_object
+
+    raise ValueError(f"Unsupported schema spec: {spec!r}")
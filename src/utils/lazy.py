@@ -0,0 +1,110 @@
+"""
+Lazy Imports and Per-Process Resources
+Provider SDKs (anthropic, boto3, twilio) are slow to import and their
+clients hold connection pools that must not be shared across a fork. Modules
+wrapped here import on first attribute access; resources are built on first
+use in each process and rebuilt after gunicorn forks a worker.
+"""
+
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+
+logger = logging.getLogger('weather-app.lazy')
+
+_modules = []
+_resources = []
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        _modules.append(self)
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    logger.info("Imported %s in %.0fms", self._name, (time.perf_counter() - started) * 1000)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def lazy_import(name):
+    """Return a LazyModule for name (the real module if it is already imported)"""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+class LazyResource:
+    """
+    Object built by factory on first use in each process
+
+    Truthiness builds the resource, so `if not resource:` keeps working as a
+    'not configured' check: a factory that raises one of unavailable_errors
+    (or returns None) leaves the resource falsy instead of failing the request.
+    """
+
+    def __init__(self, name, factory, unavailable_errors=()):
+        self.name = name
+        self._factory = factory
+        self._unavailable_errors = tuple(unavailable_errors)
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _resources.append(self)
+
+    def get(self):
+        """The resource for this process, or None if it can't be built"""
+        if self._pid == os.getpid():
+            return self._value
+        with self._lock:
+            if self._pid != os.getpid():
+                try:
+                    self._value = self._factory()
+                    logger.info("%s initialized (pid=%s)", self.name, os.getpid())
+                except self._unavailable_errors as e:
+                    logger.warning("%s not configured: %s", self.name, e)
+                    self._value = None
+                self._pid = os.getpid()
+        return self._value
+
+    def reset(self):
+        """Drop the resource so the next use builds a fresh one"""
+        with self._lock:
+            self._value = None
+            self._pid = None
+
+    def __bool__(self):
+        return self.get() is not None
+
+    def __getattr__(self, attr):
+        value = self.get()
+        if value is None:
+            raise RuntimeError(f"{self.name} is not configured")
+        return getattr(value, attr)
+
+
+def warm_imports():
+    """Import every lazily wrapped module now (e.g. in a preloading master)"""
+    for module in _modules:
+        try:
+            module.load()
+        except ImportError as e:
+            logger.warning("Could not preload %s: %s", module._name, e)
+
+
+def reset_resources():
+    """Forget every per-process resource; call in a freshly forked worker"""
+    for resource in _resources:
+        resource.reset()
@@ -0,0 +1,168 @@
+"""
+Application Logging
+Request threads never write to stdout: records go onto a bounded in-memory
+queue and a per-process writer thread formats and writes them, so a slow
+stdout (a throttled k8s log pipe) can't add request latency. When the queue
+is full, records are dropped and counted rather than blocking.
+
+INFO and DEBUG records are rate-limited per call site, so a hot-path message
+can't flood the pipe; the next record let through carries how many were
+suppressed. Warnings and errors are never limited.
+
+Settings:
+    LOG_LEVEL        root level (default INFO)
+    LOG_FORMAT       json (default) or text
+    LOG_QUEUE_SIZE   records buffered before dropping (default 10000)
+    LOG_RATE_LIMIT   INFO/DEBUG records per call site per LOG_RATE_WINDOW (default 50; 0 = off)
+    LOG_RATE_WINDOW  seconds (default 10)
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'suppressed'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields become top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` INFO/DEBUG records per call site through each window"""
+
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.limit:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (started, count, suppressed + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+        record.suppressed = suppressed
+        return True
+
+
+class BackgroundHandler(logging.Handler):
+    """Hands records to a per-process writer thread; never blocks the caller"""
+
+    def __init__(self, target, max_queue=10000):
+        super().__init__()
+        self.target = target
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # A queue and writer inherited across a fork belong to the parent; build new ones
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name='log-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def emit(self, record):
+        self._ensure_started()
+        try:
+            # Resolve args and tracebacks now; they may change before the writer gets to them
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self, records):
+        while True:
+            record = records.get()
+            if record is None:
+                return
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                self.target.handle(logging.makeLogRecord({
+                    'name': 'weather-app.log', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Log queue full; dropped {dropped} records"}))
+            self.target.handle(record)
+
+    def close(self):
+        """Write out what's queued (up to 2s) and stop the writer"""
+        if self._pid == os.getpid() and self._thread is not None:
+            try:
+                self._queue.put(None, timeout=0.5)
+                self._thread.join(timeout=2)
+            except queue.Full:
+                pass
+        super().close()
+
+
+def configure_logging():
+    """
+    Route all application logging through a BackgroundHandler
+
+    Returns:
+        BackgroundHandler: The installed handler
+    """
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s',
+                                              datefmt='%Y-%m-%dT%H:%M:%S%z'))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    handler = BackgroundHandler(stream, max_queue=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    handler.addFilter(RateLimitFilter(int(os.getenv('LOG_RATE_LIMIT', '50')),
+                                      float(os.getenv('LOG_RATE_WINDOW', '10'))))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    atexit.register(handler.close)
+    return handler
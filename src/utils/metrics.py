@@ -0,0 +1,110 @@
+"""
+Prometheus Metrics
+Request latency per route, forecast cache outcomes, Visual Crossing and
+Anthropic call latency, database connect/query time, OTP send counts and
+bulkhead occupancy and rejections.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) switches
+prometheus_client to its multi-process mode: each worker writes its samples
+to mmapped files there and /metrics aggregates them, so a scrape sees the
+whole pod rather than whichever worker answered. Without it (flask run) the
+in-process registry is used.
+"""
+
+import os
+import time
+import logging
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+logger = logging.getLogger('weather-app.metrics')
+
+# Seconds; covers fast cache hits through multi-second LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Flask request latency by route',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS)
+
+FORECAST_CACHE_LOOKUPS = Counter(
+    'hourly_cache_lookups_total', 'hourly_cache lookups by outcome (hit, miss, stale)', ['result'])
+
+UPSTREAM_SECONDS = Histogram(
+    'upstream_request_duration_seconds', 'Outbound HTTP latency by upstream and status',
+    ['upstream', 'status'], buckets=LATENCY_BUCKETS)
+
+DB_CONNECT_SECONDS = Histogram(
+    'db_connect_duration_seconds', 'Time to obtain a Postgres connection', buckets=DB_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds', 'Postgres query time via execute_query', buckets=DB_BUCKETS)
+
+ANTHROPIC_SECONDS = Histogram(
+    'anthropic_request_duration_seconds', 'Anthropic call latency by endpoint and model',
+    ['endpoint', 'model'], buckets=LATENCY_BUCKETS)
+ANTHROPIC_TOKENS = Counter(
+    'anthropic_tokens_total', 'Anthropic tokens by endpoint, model and kind',
+    ['endpoint', 'model', 'kind'])
+ANTHROPIC_ERRORS = Counter(
+    'anthropic_errors_total', 'Failed Anthropic calls by endpoint, model and error class',
+    ['endpoint', 'model', 'error'])
+
+OTP_SENDS = Counter(
+    'otp_sends_total', 'Verification code send attempts by outcome', ['provider', 'outcome'])
+
+# livesum: a dead worker's in-flight requests stop counting
+BULKHEAD_IN_FLIGHT = Gauge(
+    'bulkhead_in_flight', 'Requests holding a bulkhead slot', ['bulkhead'], multiprocess_mode='livesum')
+BULKHEAD_REJECTIONS = Counter(
+    'bulkhead_rejections_total', 'Requests shed because a bulkhead was full', ['bulkhead'])
+
+
+def observe_anthropic(endpoint, model, wall_seconds, usage, error=None):
+    """Record one Anthropic call (called from the usage ledger)"""
+    ANTHROPIC_SECONDS.labels(endpoint, model).observe(wall_seconds)
+    if error:
+        ANTHROPIC_ERRORS.labels(endpoint, model, error).inc()
+    if usage is None:
+        return
+    for kind, field in (('input', 'input_tokens'), ('output', 'output_tokens'),
+                        ('cache_read', 'cache_read_input_tokens'),
+                        ('cache_write', 'cache_creation_input_tokens')):
+        count = getattr(usage, field, None) or 0
+        if count:
+            ANTHROPIC_TOKENS.labels(endpoint, model, kind).inc(count)
+
+
+def _registry():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_response():
+    """Prometheus text exposition for every worker in this pod"""
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Time every request and serve /metrics"""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            # The URL rule, not the path, keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
@@ -0,0 +1,250 @@
+"""
+On-Demand Request Profiler
+An admin arms a profiling session for a route; the next N requests to that
+route in any worker or pod are sampled and their stacks aggregated in
+Postgres, downloadable in collapsed (flamegraph.pl / speedscope) format.
+
+While a profiled request runs, a helper thread reads the request thread's
+stack via sys._current_frames() every interval_ms; no signals are involved,
+so it is safe in gunicorn's sync workers. Armed sessions are picked up by a
+per-worker poller thread, so requests to routes that aren't armed pay one
+dict lookup. With PROFILER_ENABLED unset nothing is installed at all.
+
+Settings:
+    PROFILER_ENABLED       install the hooks (default false)
+    PROFILER_POLL_SECONDS  how often workers look for armed sessions (default 5)
+"""
+
+import os
+import sys
+import hashlib
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from flask import g, request
+from psycopg2.extras import execute_values
+
+from db.connection import db
+from utils.green import cooperative
+
+logger = logging.getLogger('weather-app.profiler')
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_STACK_DEPTH = 96
+
+ARMED_QUERY = '''
+    SELECT route, id FROM profile_sessions
+    WHERE remaining > 0 AND expires_at > NOW()
+    ORDER BY id
+'''
+
+# Takes one request slot; SKIP LOCKED keeps concurrent claims from queueing
+CLAIM_QUERY = '''
+    UPDATE profile_sessions SET remaining = remaining - 1
+    WHERE id = (
+        SELECT id FROM profile_sessions
+        WHERE route = %s AND remaining > 0 AND expires_at > NOW()
+        ORDER BY id LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, interval_ms
+'''
+
+SAMPLES_UPSERT = '''
+    INSERT INTO profile_samples (session_id, stack_hash, stack, samples)
+    VALUES %s
+    ON CONFLICT (session_id, stack_hash)
+    DO UPDATE SET samples = profile_samples.samples + EXCLUDED.samples
+'''
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename):
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(SRC_DIR):
+        return os.path.relpath(filename, SRC_DIR)
+    return os.path.basename(filename)
+
+
+def collapse(frame):
+    """Frame and its callers as a root-first 'file:function;...' string"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{_short_path(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples one thread's stack until stopped, then saves the counts"""
+
+    def __init__(self, session_id, thread_id, interval_ms):
+        self.session_id = session_id
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.counts[collapse(frame)] += 1
+            del frame
+        save_samples(self.session_id, self.counts)
+
+
+def save_samples(session_id, counts):
+    """Add one request's stack counts to a session"""
+    rows = [(session_id, hashlib.md5(stack.encode()).hexdigest(), stack, n) for stack, n in counts.items()]
+    try:
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            if rows:
+                execute_values(cursor, SAMPLES_UPSERT, rows)
+            cursor.execute("UPDATE profile_sessions SET completed = completed + 1 WHERE id = %s", (session_id,))
+    except Exception as e:
+        logger.error("Saving profile samples for session %s failed: %s", session_id, e)
+
+
+class RequestProfiler:
+    """Arms, samples and reports per-route profiling sessions"""
+
+    def __init__(self, enabled=None, poll_seconds=None):
+        self.enabled = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true' if enabled is None else enabled
+        self.poll_seconds = poll_seconds or float(os.getenv('PROFILER_POLL_SECONDS', '5'))
+        # route -> session id; replaced wholesale by the poller, read without locking
+        self._armed = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def init_app(self, app):
+        """Install the request hooks (only when enabled)"""
+        if not self.enabled:
+            return
+        if cooperative():
+            # Greenlets share one OS thread, so sys._current_frames() can't see the request
+            logger.warning("Request profiler disabled: not supported under the gevent worker")
+            return
+
+        @app.before_request
+        def _maybe_profile():
+            self._ensure_started()
+            rule = request.url_rule
+            if rule is None or rule.rule not in self._armed:
+                return
+            claim = self._claim(rule.rule)
+            if claim:
+                g.profile_sampler = StackSampler(claim['id'], threading.get_ident(), claim['interval_ms']).start()
+
+        @app.teardown_request
+        def _stop_profile(exc):
+            sampler = g.pop('profile_sampler', None)
+            if sampler is not None:
+                sampler.stop()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._armed = {}
+            threading.Thread(target=self._run, name='profile-poller', daemon=True).start()
+
+    def _run(self):
+        stop = threading.Event()
+        while True:
+            self.refresh()
+            stop.wait(self.poll_seconds)
+
+    def refresh(self):
+        """Reload the armed routes from the database"""
+        try:
+            rows = db.execute_query(ARMED_QUERY, fetch=True)
+        except Exception as e:
+            logger.debug("Profiler poll failed: %s", e)
+            return
+        self._armed = {row['route']: row['id'] for row in rows}
+
+    def _claim(self, route):
+        try:
+            rows = db.execute_query(CLAIM_QUERY, (route,), fetch=True)
+        except Exception as e:
+            logger.warning("Profiler claim failed for %s: %s", route, e)
+            return None
+        if not rows:
+            # Used up or expired since the last poll
+            self._armed = {r: sid for r, sid in self._armed.items() if r != route}
+            return None
+        logger.info("Profiling %s %s (session %s)", request.method, request.path, rows[0]['id'])
+        return rows[0]
+
+    def arm(self, route, requests=20, interval_ms=5, ttl_minutes=30):
+        """
+        Profile the next requests to a route
+
+        Args:
+            route (str): Flask URL rule, e.g. '/api/hourly-data'
+            requests (int): How many requests to sample
+            interval_ms (int): Sampling interval
+            ttl_minutes (int): Give up if the requests haven't arrived by then
+
+        Returns:
+            dict: The new session
+        """
+        rows = db.execute_query('''
+            INSERT INTO profile_sessions (route, requested, remaining, interval_ms, expires_at)
+            VALUES (%s, %s, %s, %s, NOW() + make_interval(mins => %s))
+            RETURNING id, route, requested, remaining, interval_ms, created_at, expires_at
+        ''', (route, requests, requests, interval_ms, ttl_minutes), fetch=True)
+        session = rows[0]
+        self._armed = dict(self._armed, **{route: session['id']})
+        return session
+
+    def sessions(self, limit=50):
+        """Recent sessions with their sample totals"""
+        return db.execute_query('''
+            SELECT s.id, s.route, s.requested, s.remaining, s.completed, s.interval_ms,
+                   s.created_at, s.expires_at, COALESCE(SUM(p.samples), 0) AS samples
+            FROM profile_sessions s
+            LEFT JOIN profile_samples p ON p.session_id = s.id
+            GROUP BY s.id
+            ORDER BY s.id DESC
+            LIMIT %s
+        ''', (limit,), fetch=True)
+
+    def collapsed(self, session_id):
+        """
+        A session's stacks in collapsed format ('frame;frame;frame count' per line)
+
+        Returns:
+            str: The profile, or None if the session doesn't exist
+        """
+        if not db.execute_query("SELECT 1 FROM profile_sessions WHERE id = %s", (session_id,), fetch=True):
+            return None
+        rows = db.execute_query('''
+            SELECT stack, samples FROM profile_samples
+            WHERE session_id = %s
+            ORDER BY samples DESC
+        ''', (session_id,), fetch=True)
+        return ''.join(f"{row['stack']} {row['samples']}\n" for row in rows)
+
+
+# Global profiler instance
+request_profiler = RequestProfiler()
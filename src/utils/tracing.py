@@ -0,0 +1,221 @@
+"""
+Request Tracing
+Lightweight spans for a sampled fraction of requests. A sampled request gets
+a Server-Timing header (total time per span name, visible in the browser's
+network panel), an X-Trace-Id header and one 'weather-app.trace' log line
+with every span; spans can also be shipped to a collector over HTTP.
+
+Unsampled requests pay one context-variable read per span() call. Spans
+opened outside a request, or in a thread the request handed work to, are
+no-ops.
+
+Settings:
+    TRACE_SAMPLE_RATE      fraction of requests traced (default 0.05)
+    TRACE_EXPORT_URL       POST finished traces here as JSON (optional)
+    TRACE_EXPORT_INTERVAL  seconds between export batches (default 5)
+"""
+
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+
+import requests
+from flask import g, request
+
+logger = logging.getLogger('weather-app.trace')
+
+_current = contextvars.ContextVar('weather_app_trace', default=None)
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    __slots__ = ('trace_id', 'name', 'started', 'spans', '_stack')
+
+    def __init__(self, name, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self._stack = []
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Server-Timing header value: summed duration per span name, then the total"""
+        totals = {}
+        for s in self.spans:
+            totals[s['name']] = totals.get(s['name'], 0.0) + s.get('duration_ms', 0.0)
+        parts = [f"{name};dur={duration:.1f}" for name, duration in totals.items()]
+        parts.append(f"app;dur={self.elapsed_ms():.1f}")
+        return ', '.join(parts)
+
+    def to_dict(self, **extra):
+        return dict(trace_id=self.trace_id, name=self.name, duration_ms=round(self.elapsed_ms(), 2),
+                    spans=self.spans, **extra)
+
+
+class Span:
+    """Timed section of a trace; use via span()"""
+
+    __slots__ = ('_trace', '_record', '_started')
+
+    def __init__(self, trace, name, attrs):
+        self._trace = trace
+        self._record = {'name': name, 'parent': trace._stack[-1] if trace._stack else None}
+        if attrs:
+            self._record['attrs'] = attrs
+
+    def set(self, **attrs):
+        """Attach attributes learned while the span runs (status, model, ...)"""
+        self._record.setdefault('attrs', {}).update(attrs)
+
+    def __enter__(self):
+        trace = self._trace
+        self._record['id'] = len(trace.spans)
+        trace.spans.append(self._record)
+        trace._stack.append(self._record['id'])
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        now = time.perf_counter()
+        self._record['start_ms'] = round((self._started - self._trace.started) * 1000, 2)
+        self._record['duration_ms'] = round((now - self._started) * 1000, 2)
+        if exc_type is not None:
+            self._record['error'] = exc_type.__name__
+        self._trace._stack.pop()
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attrs):
+    """
+    Time a block in the current request's trace
+
+    Args:
+        name (str): Span name; spans with the same name are summed in Server-Timing
+        **attrs: Attributes stored with the span
+
+    Returns:
+        Context manager; a shared no-op when the request isn't sampled
+    """
+    trace = _current.get()
+    if trace is None:
+        return NOOP_SPAN
+    return Span(trace, name, attrs)
+
+
+class TraceExporter:
+    """Buffered background POSTs of finished traces to a collector"""
+
+    def __init__(self, url, interval=None, max_buffer=1000):
+        self.url = url
+        self.interval = interval or float(os.getenv('TRACE_EXPORT_INTERVAL', '5'))
+        self.max_buffer = max_buffer
+        self._buffer = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._pid = None
+        self.failures = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='trace-exporter', daemon=True).start()
+
+    def submit(self, trace_dict):
+        self._ensure_started()
+        # deque(maxlen) drops the oldest trace if the collector falls behind
+        self._buffer.append(trace_dict)
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        batch = []
+        while self._buffer:
+            batch.append(self._buffer.popleft())
+        if not batch:
+            return
+        try:
+            requests.post(self.url, json={'traces': batch}, timeout=2).raise_for_status()
+        except requests.RequestException as e:
+            self.failures += 1
+            logger.warning("Trace export of %d traces failed: %s", len(batch), e)
+
+
+class Tracer:
+    """Per-request sampling, Server-Timing and span logs for a Flask app"""
+
+    def __init__(self, sample_rate=None, export_url=None):
+        self.sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '0.05')) if sample_rate is None else sample_rate
+        export_url = export_url or os.getenv('TRACE_EXPORT_URL')
+        self.exporter = TraceExporter(export_url) if export_url else None
+
+    def init_app(self, app, force=None):
+        """
+        Trace a sampled share of app's requests
+
+        Args:
+            app: Flask app
+            force (callable, optional): Returns True to trace the current
+                request regardless of the sample rate (e.g. for admins)
+        """
+
+        @app.before_request
+        def _start_trace():
+            if random.random() < self.sample_rate or (force is not None and force()):
+                g.trace_token = _current.set(Trace(f"{request.method} {request.path}"))
+
+        @app.after_request
+        def _finish_trace(response):
+            trace = _current.get()
+            if trace is not None:
+                response.headers['Server-Timing'] = trace.server_timing()
+                response.headers['X-Trace-Id'] = trace.trace_id
+                self.emit(trace.to_dict(status=response.status_code))
+            return response
+
+        @app.teardown_request
+        def _clear_trace(exc):
+            token = g.pop('trace_token', None)
+            if token is not None:
+                _current.reset(token)
+
+    def emit(self, trace_dict):
+        # The JSON log formatter puts the whole trace under a 'trace' key
+        logger.info("trace %s %s %.1fms", trace_dict['trace_id'], trace_dict['name'], trace_dict['duration_ms'],
+                    extra={'trace': trace_dict})
+        if self.exporter is not None:
+            self.exporter.submit(trace_dict)
+
+
+# Global tracer instance
+tracer = Tracer()